@@ -0,0 +1,146 @@
+import asyncio
+import time
+from typing import Callable
+from google.genai import types
+from tool_executor import conflicts, get_access
+from history import HistoryManager, estimate_tokens
+from tracing import Tracer, append_message, record_usage
+
+
+class AsyncAgentRunner:
+    """
+    An asyncio implementation of the --agent loop built on the async Gemini client (client.aio).
+
+    Model output is streamed: text is printed as it arrives and every function call starts on a
+    worker thread as soon as the chunk containing it is received, so tool I/O overlaps with the
+    rest of the stream. Calls keep the ordering rules of ToolExecutor, and tool responses are
+    appended to the history in the original call order.
+    """
+
+    def __init__(
+            self,
+            client,
+            call_function: Callable,
+            model: str,
+            config: types.GenerateContentConfig,
+            verbose: bool = False,
+            max_workers: int = 4,
+            history_manager: HistoryManager | None = None,
+            tracer: Tracer | None = None):
+        self.client = client
+        self.call_function = call_function
+        self.model = model
+        self.config = config
+        self.verbose = verbose
+        self.max_workers = max_workers
+        self.history_manager = history_manager
+        self.tracer = tracer if tracer is not None else Tracer()
+
+    async def run(self, messages: list[types.Content], iter_limit: int = 20) -> str | None:
+        """
+        Run the agent loop until the model answers without function calls.
+        Args:
+            messages: The conversation so far; assistant turns and tool responses are appended to it.
+            iter_limit: The maximum number of model calls.
+        Returns:
+            The final text response, or None if the iteration limit was reached first.
+        """
+        for i in range(iter_limit):
+            print(f"\n--- Iteration {i + 1} ---")
+            if self.history_manager is not None:
+                with self.tracer.span("compact_history", "history") as span_attributes:
+                    compaction = self.history_manager.compact(messages)
+                    span_attributes.update(compaction)
+                if self.verbose and compaction["tokens_after"] < compaction["tokens_before"]:
+                    print(f"History compacted: ~{compaction['tokens_before']} -> ~{compaction['tokens_after']} tokens (saved ~{compaction['tokens_before'] - compaction['tokens_after']})")
+            assistant_content, tool_response_contents = await self.run_turn(messages)
+            if assistant_content is None:
+                print("No candidates received from model. Exiting.")
+                return None
+
+            append_message(self.tracer, messages, assistant_content)
+            if not tool_response_contents:
+                print("\nFinal response from assistant (no further function calls):")
+                final_text = "".join(part.text for part in assistant_content.parts if part.text)
+                print(final_text.strip())
+                return final_text
+            for tool_response_content in tool_response_contents:
+                append_message(self.tracer, messages, tool_response_content)
+            if self.verbose:
+                print(f"Current messages count: {len(messages)}")
+        return None
+
+    async def run_turn(self, messages: list[types.Content]) -> tuple[types.Content | None, list[types.Content]]:
+        """
+        Stream one model response and execute its function calls while the stream is still arriving.
+        Args:
+            messages: The conversation to send to the model.
+        Returns:
+            The assembled assistant turn (None if the model returned no candidates) and the tool responses.
+        """
+        semaphore = asyncio.Semaphore(self.max_workers)
+        parts: list[types.Part] = []
+        tasks: list[asyncio.Task] = []
+        accesses: list[tuple[str, str | None]] = []
+        received_candidate = False
+
+        with self.tracer.span(
+                "generate_content_stream",
+                "model",
+                messages=len(messages),
+                history_tokens=estimate_tokens(messages)) as span_attributes:
+            start = time.perf_counter()
+            stream = await self.client.aio.models.generate_content_stream(
+                model=self.model,
+                contents=messages,
+                config=self.config,
+            )
+            async for chunk in stream:
+                if "first_chunk_ms" not in span_attributes:
+                    span_attributes["first_chunk_ms"] = (time.perf_counter() - start) * 1000
+                if chunk.usage_metadata is not None:
+                    # Every chunk repeats the running totals; the last one wins.
+                    record_usage(span_attributes, chunk)
+                if not chunk.candidates or not chunk.candidates[0].content:
+                    continue
+                received_candidate = True
+                for part in chunk.candidates[0].content.parts or []:
+                    if part.text:
+                        print(part.text, end="", flush=True)
+                        if parts and parts[-1].text:
+                            parts[-1] = types.Part.from_text(text=parts[-1].text + part.text)
+                        else:
+                            parts.append(part)
+                    if part.function_call:
+                        parts.append(part)
+                        fc = part.function_call
+                        if self.verbose:
+                            print(f"\n  Function Call Requested: {fc.name}({dict(fc.args or {})})")
+                        access = get_access(fc)
+                        dependencies = [task for task, other in zip(tasks, accesses) if conflicts(access, other)]
+                        tasks.append(asyncio.create_task(self._call_tool(fc, dependencies, semaphore)))
+                        accesses.append(access)
+            span_attributes["function_calls"] = len(tasks)
+
+        if not received_candidate:
+            return None, []
+        if any(part.text for part in parts):
+            print()
+        tool_response_contents = list(await asyncio.gather(*tasks))
+        if self.verbose:
+            for tool_response_content in tool_response_contents:
+                fr_part = tool_response_content.parts[0].function_response
+                print("Tool response added to messages:")
+                print(f"  Function Executed: {fr_part.name}")
+                print(f"  Response Data: {fr_part.response}")
+        return types.Content(role="model", parts=parts), tool_response_contents
+
+    async def _call_tool(
+            self,
+            fc: types.FunctionCall,
+            dependencies: list[asyncio.Task],
+            semaphore: asyncio.Semaphore) -> types.Content:
+        if dependencies:
+            await asyncio.wait(dependencies)
+        async with semaphore:
+            return await asyncio.to_thread(self.call_function, fc, verbose=self.verbose)
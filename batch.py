@@ -0,0 +1,233 @@
+import asyncio
+import functools
+import json
+import os
+import shutil
+import sys
+import time
+from google.genai import types
+import main
+from async_agent import AsyncAgentRunner
+from functions.path_index import drop_path_index
+from functions.run_tests import drop_test_index
+from functions.search_code import drop_search_index
+from history import HistoryManager
+from tool_cache import ToolCache
+from tracing import Tracer
+
+# Never copied from a template into a task's working directory.
+TEMPLATE_IGNORED = shutil.ignore_patterns(".git", "__pycache__", ".agent_cache")
+
+
+def load_tasks(input_path: str) -> list[dict]:
+    """
+    Read the batch tasks from a JSONL file.
+    Each line is an object with a "prompt", and optionally an "id" (defaults to the line number) and a
+    "template" directory copied into the task's working directory before it runs.
+    Args:
+        input_path: The path to the JSONL file.
+    Returns:
+        The tasks, in file order.
+    """
+    tasks = []
+    with open(input_path, "r") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            task = json.loads(line)
+            if not task.get("prompt"):
+                raise ValueError(f"Task on line {line_number} has no prompt.")
+            task.setdefault("id", str(line_number))
+            tasks.append(task)
+    ids = [str(task["id"]) for task in tasks]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Task ids must be unique.")
+    return tasks
+
+
+def prepare_working_directory(workspace: str, task: dict, template: str | None = None) -> str:
+    """
+    Create the isolated working directory of a task, copying its template into it.
+    Args:
+        workspace: The directory holding one working directory per task.
+        task: The task; its "template" overrides the batch-wide template.
+        template: The directory copied into every task's working directory, if any.
+    Returns:
+        The path to the task's working directory.
+    """
+    task_id = str(task["id"])
+    if os.path.basename(task_id) != task_id or task_id in ("", ".", ".."):
+        raise ValueError(f'Task id "{task_id}" cannot be used as a directory name.')
+    working_directory = os.path.join(workspace, task_id)
+    if os.path.exists(working_directory):
+        shutil.rmtree(working_directory)
+    template = task.get("template", template)
+    if template:
+        shutil.copytree(template, working_directory, ignore=TEMPLATE_IGNORED)
+    else:
+        os.makedirs(working_directory)
+    return working_directory
+
+
+async def run_task(
+        client,
+        task: dict,
+        workspace: str,
+        template: str | None = None,
+        iter_limit: int = 20,
+        max_workers: int = 4,
+        history_budget: int | None = 32000,
+        use_cache: bool = True,
+        verbose: bool = False) -> dict:
+    """
+    Run one task through the agent loop in its own working directory.
+    Args:
+        client: The genai client shared by every task.
+        task: The task, with its "id" and "prompt".
+        workspace: The directory holding one working directory per task.
+        template: The directory copied into the task's working directory, if any.
+        iter_limit: The maximum number of model calls.
+        max_workers: The maximum number of concurrent function calls of one model turn.
+        history_budget: The token budget of the history; None disables compaction.
+        use_cache: Whether the task's tool results are cached.
+        verbose: Whether to print verbose output.
+    Returns:
+        The task result: status, final response or error, and token and latency stats.
+    """
+    start = time.perf_counter()
+    task_tracer = Tracer()
+    result = {"id": task["id"], "prompt": task["prompt"]}
+    working_directory = None
+    try:
+        working_directory = prepare_working_directory(workspace, task, template)
+        result["working_directory"] = working_directory
+        runner = AsyncAgentRunner(
+            client,
+            functools.partial(
+                main.call_function,
+                working_directory=working_directory,
+                cache=ToolCache(working_directory=working_directory) if use_cache else None,
+                call_tracer=task_tracer,
+            ),
+            model=main.gemini_model,
+            config=main.get_generate_content_config(),
+            verbose=verbose,
+            max_workers=max_workers,
+            history_manager=HistoryManager(token_budget=history_budget) if history_budget else None,
+            tracer=task_tracer,
+        )
+        messages = [types.Content(role="user", parts=[types.Part.from_text(text=task["prompt"])])]
+        response = await runner.run(messages, iter_limit=iter_limit)
+        result["status"] = "ok" if response is not None else "no_response"
+        result["response"] = response
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if working_directory is not None:
+            # The working directory is not used again: do not keep its indexes for the rest of the batch.
+            drop_path_index(working_directory)
+            drop_search_index(working_directory)
+            drop_test_index(working_directory)
+    result.update(get_task_stats(task_tracer))
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def get_task_stats(task_tracer: Tracer) -> dict:
+    """
+    Sum the token counts and durations of a task's spans.
+    """
+    stats = {
+        "model_calls": 0,
+        "tool_calls": 0,
+        "prompt_tokens": 0,
+        "response_tokens": 0,
+        "model_ms": 0.0,
+        "tool_ms": 0.0,
+    }
+    for span in task_tracer.spans:
+        if span["category"] == "model":
+            stats["model_calls"] += 1
+            stats["model_ms"] += span["duration_ms"]
+            stats["prompt_tokens"] += span["attributes"].get("prompt_tokens") or 0
+            stats["response_tokens"] += span["attributes"].get("response_tokens") or 0
+        elif span["category"] == "tool":
+            stats["tool_calls"] += 1
+            stats["tool_ms"] += span["duration_ms"]
+    stats["model_ms"] = round(stats["model_ms"], 1)
+    stats["tool_ms"] = round(stats["tool_ms"], 1)
+    return stats
+
+
+async def run_batch(
+        client,
+        tasks: list[dict],
+        output_path: str,
+        concurrency: int = 8,
+        **task_options) -> list[dict]:
+    """
+    Run tasks concurrently, at most concurrency at a time, over one shared client.
+    Each result is appended to output_path as soon as its task finishes, so a partial run keeps its results.
+    Args:
+        client: The genai client shared by every task.
+        tasks: The tasks to run.
+        output_path: The JSONL file the results are written to.
+        concurrency: The maximum number of tasks running at once.
+        task_options: Passed on to run_task.
+    Returns:
+        The results, in task order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    with open(output_path, "w") as output:
+
+        async def run_bounded(task: dict) -> dict:
+            async with semaphore:
+                result = await run_task(client, task, **task_options)
+            output.write(json.dumps(result, default=str) + "\n")
+            output.flush()
+            print(f"[{result['status']}] task {result['id']} ({result['latency_ms']:.0f} ms, {result['prompt_tokens']} prompt tokens)")
+            return result
+
+        return list(await asyncio.gather(*(run_bounded(task) for task in tasks)))
+
+
+def batch_main():
+    command_line_args = sys.argv
+    if len(command_line_args) < 3 or command_line_args[1][0] == "-" or command_line_args[2][0] == "-":
+        print("usage: python batch.py <prompts.jsonl> <results.jsonl> [--concurrency=N] [--workspace=DIR] [--template=DIR] ...")
+        sys.exit(1)
+    input_path, output_path = command_line_args[1], command_line_args[2]
+    workspace: str = main.get_str_cli_arg(command_line_args, "workspace", "batch_runs")
+    os.makedirs(workspace, exist_ok=True)
+    if "--no-cache" in command_line_args:
+        main.tool_cache = None
+    warm_workers: int = main.get_int_cli_arg(command_line_args, "warm-workers", 0)
+    if warm_workers:
+        preload: str = main.get_str_cli_arg(command_line_args, "preload", "")
+        main.start_worker_pool(size=warm_workers, preload=[module for module in preload.split(",") if module])
+    main.configure_output_capture(max_bytes=main.get_int_cli_arg(command_line_args, "max-output-bytes", 10 * 1024 * 1024))
+    main.configure_resource_limits(main.get_resource_limits(command_line_args))
+
+    tasks = load_tasks(input_path)
+    start = time.perf_counter()
+    results = asyncio.run(run_batch(
+        main.get_client(),
+        tasks,
+        output_path,
+        concurrency=main.get_int_cli_arg(command_line_args, "concurrency", 8),
+        workspace=workspace,
+        template=main.get_str_cli_arg(command_line_args, "template"),
+        iter_limit=main.get_int_cli_arg(command_line_args, "iter-limit", 20),
+        max_workers=main.get_int_cli_arg(command_line_args, "max-workers", 4),
+        history_budget=None if "--no-compaction" in command_line_args else main.get_int_cli_arg(command_line_args, "history-budget", 32000),
+        use_cache="--no-cache" not in command_line_args,
+        verbose="--verbose" in command_line_args,
+    ))
+    main.stop_worker_pool()
+    succeeded = sum(1 for result in results if result["status"] == "ok")
+    print(f"{succeeded}/{len(results)} tasks succeeded in {time.perf_counter() - start:.1f} s; results written to {output_path}")
+
+
+if __name__ == "__main__":
+    batch_main()
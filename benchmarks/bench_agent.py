@@ -0,0 +1,144 @@
+# bench_agent.py
+# Drives full --agent runs offline by replaying a model recording, and reports the time spent outside the model:
+# tool dispatch, history compaction and bookkeeping, plus how the history grows per iteration.
+# Usage (from the repository root): python -m benchmarks.bench_agent [runs] [recording.jsonl] [max_overhead_ms]
+# Without a recording, a scripted scenario (tree listing, search, reads, a write and a script run) is replayed in a
+# scratch project. Recordings made with `main.py ... --agent --record=PATH` replay their function calls in the
+# current directory. With max_overhead_ms the benchmark exits with status 1 when the mean per-iteration overhead
+# exceeds it, so it can gate CI.
+
+import contextlib
+import functools
+import io
+import os
+import sys
+import tempfile
+import time
+from google.genai import types
+import main
+from history import HistoryManager
+from model_backend import ReplayBackend, write_recording
+from tool_executor import ToolExecutor
+from tracing import Tracer
+
+PROJECT = {
+    "pkg/__init__.py": "",
+    "pkg/geometry.py": "import math\n\n\ndef area(r):\n    return math.pi * r * r\n" + "\n# padding\n" * 200,
+    "pkg/units.py": "def to_cm(m):\n    return m * 100\n" * 50,
+    "app.py": "from pkg.geometry import area\n\nprint(area(2))\n",
+    "README.md": "A scratch project.\n" * 100,
+}
+
+
+def call(name: str, **args) -> types.Part:
+    return types.Part.from_function_call(name=name, args=args)
+
+
+def response(*parts: types.Part, prompt_tokens: int = 1000) -> types.GenerateContentResponse:
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(content=types.Content(role="model", parts=list(parts)))],
+        usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=prompt_tokens, candidates_token_count=20),
+    )
+
+
+def scripted_responses() -> list[types.GenerateContentResponse]:
+    return [
+        response(call("get_files_tree", directory=".", max_depth=3)),
+        response(call("search_code", query="def area"), call("get_files_info", directory="pkg")),
+        response(call("get_file_content", file_path="pkg/geometry.py"), call("get_file_content", file_path="pkg/units.py")),
+        response(call("read_file_range", file_path="README.md", start_line=1, end_line=20)),
+        response(call("write_file", file_path="pkg/geometry.py", content="import math\n\n\ndef area(r):\n    return round(math.pi * r * r, 2)\n")),
+        response(call("run_python_file", file_path="app.py")),
+        response(call("get_file_content", file_path="pkg/geometry.py")),
+        response(types.Part.from_text(text="area() now rounds its result to two decimals.")),
+    ]
+
+
+def write_project(working_directory: str) -> None:
+    for path, content in PROJECT.items():
+        os.makedirs(os.path.join(working_directory, os.path.dirname(path)), exist_ok=True)
+        with open(os.path.join(working_directory, path), "w") as f:
+            f.write(content)
+
+
+def run_once(recording_path: str, working_directory: str) -> tuple[float, Tracer]:
+    """
+    Replay one agent run.
+    Returns:
+        The wall time of the run in milliseconds, and its trace.
+    """
+    run_tracer = Tracer()
+    main.tracer = run_tracer
+    main.model_backend = ReplayBackend(recording_path)
+    tool_executor = ToolExecutor(functools.partial(main.call_function, working_directory=working_directory, cache=None), max_workers=4)
+    messages = [types.Content(role="user", parts=[types.Part.from_text(text="Make area() round to two decimals.")])]
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        main.run_agent(messages, iter_limit=50, tool_executor=tool_executor, history_manager=HistoryManager())
+    wall_ms = (time.perf_counter() - start) * 1000
+    tool_executor.shutdown()
+    return wall_ms, run_tracer
+
+
+def busy_ms(spans: list[dict]) -> float:
+    """
+    The wall time covered by spans; concurrent tool calls overlap, so their durations cannot simply be summed.
+    """
+    busy = 0.0
+    end = float("-inf")
+    for span in sorted(spans, key=lambda span: span["start_ms"]):
+        span_end = span["start_ms"] + span["duration_ms"]
+        if span_end > end:
+            busy += span_end - max(end, span["start_ms"])
+            end = span_end
+    return busy
+
+
+def main_bench():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    recording_path = sys.argv[2] if len(sys.argv) > 2 and sys.argv[2] != "-" else None
+    max_overhead_ms = float(sys.argv[3]) if len(sys.argv) > 3 else None
+
+    with tempfile.TemporaryDirectory() as scratch:
+        use_scratch_project = recording_path is None
+        if use_scratch_project:
+            recording_path = os.path.join(scratch, "recording.jsonl")
+            write_recording(recording_path, scripted_responses(), model=main.gemini_model)
+        walls, overheads, tool_totals, iterations = [], [], [], 0
+        history_growth: list[int] = []
+        for _ in range(runs):
+            working_directory = "."
+            if use_scratch_project:
+                working_directory = os.path.join(scratch, "project")
+                write_project(working_directory)
+            wall, run_tracer = run_once(recording_path, working_directory)
+            spans = run_tracer.spans
+            model_ms = sum(span["duration_ms"] for span in spans if span["category"] == "model")
+            tool_ms = busy_ms([span for span in spans if span["category"] == "tool"])
+            iterations = sum(1 for span in spans if span["category"] == "model")
+            history_growth = [span["attributes"]["history_tokens"] for span in spans if span["category"] == "model"]
+            walls.append(wall)
+            tool_totals.append(tool_ms)
+            overheads.append((wall - model_ms - tool_ms) / iterations)
+
+    print(f"agent replay x {runs} ({iterations} iterations per run)")
+    report("end-to-end", walls, "ms per run")
+    report("per iteration", [wall / iterations for wall in walls], "ms")
+    report("tool time", tool_totals, "ms per run")
+    report("overhead", overheads, "ms per iteration (loop, dispatch, compaction)")
+    print(f"history growth (estimated tokens sent per iteration): {history_growth}")
+
+    mean_overhead = sum(overheads) / len(overheads)
+    if max_overhead_ms is not None and mean_overhead > max_overhead_ms:
+        print(f"FAIL: mean overhead {mean_overhead:.2f} ms per iteration exceeds {max_overhead_ms} ms")
+        sys.exit(1)
+
+
+def report(label: str, values: list[float], unit: str) -> None:
+    values = sorted(values)
+    mean = sum(values) / len(values)
+    print(f"{label:<14} mean={mean:8.2f}  p50={values[len(values) // 2]:8.2f}  max={values[-1]:8.2f}  {unit}")
+
+
+if __name__ == "__main__":
+    main_bench()
@@ -0,0 +1,93 @@
+# bench_calculator.py
+# Measures Calculator throughput on batches built from a few shapes like the expression files fed to the calculator:
+# - Calculator.evaluate called in a loop against Calculator.evaluate_many, on distinct expressions, on a batch
+#   repeating a few hundred expressions and on expressions using one variable value per expression;
+# - one expression evaluated over and over through evaluate, through its compile() callable and as a native lambda.
+# Usage (from the repository root): python -m benchmarks.bench_calculator [expressions] [runs]
+# evaluate_many uses NumPy when it is installed; the "no NumPy" rows evaluate compiled expressions one by one.
+
+import random
+import sys
+import time
+from calculator.pkg import calculator as calculator_module
+from calculator.pkg.calculator import Calculator
+
+SHAPES = [
+    "{} + {} * {}",
+    "{} * {} - {} / {}",
+    "{} - {}",
+    "{} / {} + {} * {} - {}",
+    "x * {} + {}",
+]
+
+
+def build_expressions(count: int, distinct: int | None = None, shapes: list[str] = SHAPES) -> list[str]:
+    rng = random.Random(0)
+    expressions = [
+        shapes[i % len(shapes)].format(*(rng.randint(1, 999) for _ in range(shapes[i % len(shapes)].count("{}"))))
+        for i in range(distinct or count)
+    ]
+    return [expressions[i % len(expressions)] for i in range(count)]
+
+
+def best_time(call, runs: int) -> float:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        call()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def report(scenario: str, count: int, timings: dict[str, float]) -> None:
+    baseline = next(iter(timings.values()))
+    for label, seconds in timings.items():
+        print(f"{scenario:<10} {label:<26} {seconds * 1000:9.1f} ms  {count / seconds:12.0f} expressions/s  x{baseline / seconds:.1f}")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    xs = [float(i % 100) for i in range(count)]
+    print(f"{count} expressions, best of {runs} runs, NumPy {'available' if calculator_module.load_numpy() else 'not installed'}")
+
+    scenarios = {
+        "distinct": build_expressions(count),
+        "repeated": build_expressions(count, 500),
+        "variables": build_expressions(count, shapes=["x * {} + {}", "x / {} - x * {}"]),
+    }
+    for scenario, expressions in scenarios.items():
+        # A fresh Calculator per run, so no run benefits from the previous run's compile cache.
+        def looped():
+            calculator = Calculator()
+            return [calculator.evaluate(expression, {"x": x}) for expression, x in zip(expressions, xs)]
+
+        def batched():
+            return Calculator().evaluate_many(expressions, {"x": xs})
+
+        assert looped() == batched()
+        timings = {"evaluate loop": best_time(looped, runs), "evaluate_many": best_time(batched, runs)}
+        original = calculator_module.load_numpy
+        calculator_module.load_numpy = lambda: None
+        try:
+            timings["evaluate_many (no NumPy)"] = best_time(batched, runs)
+        finally:
+            calculator_module.load_numpy = original
+        report(scenario, count, timings)
+
+    calculator = Calculator()
+    expression = "2 * 3 - 8 / 2 + 5 * 7"
+    compiled = calculator.compile(expression)
+    # The same arithmetic written by hand, reading its numbers from a tuple so Python cannot fold them.
+    numbers = (2.0, 3.0, 8.0, 2.0, 5.0, 7.0)
+    native = lambda: numbers[0] * numbers[1] - numbers[2] / numbers[3] + numbers[4] * numbers[5]
+    assert calculator.evaluate(expression) == compiled() == native()
+    report("single", count, {
+        "evaluate": best_time(lambda: [calculator.evaluate(expression) for _ in range(count)], runs),
+        "compile() callable": best_time(lambda: [compiled() for _ in range(count)], runs),
+        "native lambda": best_time(lambda: [native() for _ in range(count)], runs),
+    })
+
+
+if __name__ == "__main__":
+    main()
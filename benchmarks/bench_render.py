@@ -0,0 +1,28 @@
+# bench_render.py
+# Compares rendering a report of calculator results by calling render once per result and joining the boxes with
+# render_many, which computes the widths once and writes every line to one buffer, in each of its styles.
+# Usage (from the repository root): python -m benchmarks.bench_render [results] [runs]
+
+import sys
+from benchmarks.bench_calculator import best_time, build_expressions, report
+from calculator.pkg.calculator import Calculator
+from calculator.pkg.render import render, render_many
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    expressions = build_expressions(count, shapes=["{} + {} * {}", "{} * {} - {} / {}", "{} - {}"])
+    pairs = list(zip(expressions, Calculator().evaluate_many(expressions)))
+    print(f"{count} results, best of {runs} runs")
+    report("render", count, {
+        "render loop": best_time(lambda: "\n".join([render(expression, result) for expression, result in pairs]), runs),
+        "render_many grid": best_time(lambda: render_many(pairs, "grid", columns=1), runs),
+        "render_many grid x4": best_time(lambda: render_many(pairs, "grid"), runs),
+        "render_many table": best_time(lambda: render_many(pairs, "table"), runs),
+        "render_many plain": best_time(lambda: render_many(pairs, "plain"), runs),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+# bench_run_python.py
+# Compares run_python_file with a cold `python` spawn per call against the warm worker pool.
+# Usage (from the repository root): python -m benchmarks.bench_run_python [runs] [preload,modules] [interval_seconds]
+# In the agent loop runs are separated by a model round-trip, which is when the pool replaces used workers;
+# interval_seconds (default 0.5, not included in the timings) simulates that gap.
+
+import os
+import sys
+import tempfile
+import time
+from functions.run_python import run_python_file
+from functions.python_worker_pool import start_worker_pool, stop_worker_pool
+
+SCRIPT = """import json, unittest
+print(json.dumps({"ok": True}))
+"""
+
+
+def time_runs(working_directory: str, file_path: str, runs: int, interval: float) -> list[float]:
+    durations = []
+    for _ in range(runs):
+        time.sleep(interval)
+        start = time.perf_counter()
+        run_python_file(working_directory, file_path)
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def report(label: str, durations: list[float]) -> None:
+    durations = sorted(durations)
+    mean = sum(durations) / len(durations)
+    print(f"{label:<12} mean={mean * 1000:8.1f} ms  p50={durations[len(durations) // 2] * 1000:8.1f} ms  max={durations[-1] * 1000:8.1f} ms")
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    preload = [module for module in sys.argv[2].split(",") if module] if len(sys.argv) > 2 else ["json", "unittest"]
+    interval = float(sys.argv[3]) if len(sys.argv) > 3 else 0.5
+    with tempfile.TemporaryDirectory() as working_directory:
+        with open(os.path.join(working_directory, "script.py"), "w") as f:
+            f.write(SCRIPT)
+
+        cold = time_runs(working_directory, "script.py", runs, interval)
+
+        start_worker_pool(size=2, preload=preload)
+        warm = time_runs(working_directory, "script.py", runs, interval)
+        stop_worker_pool()
+
+    print(f"run_python_file x {runs} (preload: {', '.join(preload) or 'none'})")
+    report("cold spawn", cold)
+    report("warm pool", warm)
+    print(f"speedup: {sum(cold) / sum(warm):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
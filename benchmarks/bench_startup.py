@@ -0,0 +1,49 @@
+# bench_startup.py
+# Measures the wall time of fresh interpreters running the CLI paths that never call the model, next to a bare
+# interpreter, and checks that they do not import the genai SDK.
+# Usage (from the repository root): python -m benchmarks.bench_startup [runs] [max_ms]
+# With max_ms the benchmark exits with status 1 when any path's mean time on top of the bare interpreter exceeds it.
+
+import subprocess
+import sys
+import time
+
+COMMANDS = {
+    "bare python": [sys.executable, "-c", "pass"],
+    "main.py --help": [sys.executable, "main.py", "--help"],
+    "import main": [sys.executable, "-c", "import main"],
+    "import tests": [sys.executable, "-c", "import tests"],
+}
+SDK_CHECK = "import sys, main, tests; print(sorted(name for name in sys.modules if name.startswith('google.genai')))"
+
+
+def time_command(command: list[str], runs: int) -> list[float]:
+    durations = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        durations.append((time.perf_counter() - start) * 1000)
+    return durations
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    max_ms = float(sys.argv[2]) if len(sys.argv) > 2 else None
+
+    means = {}
+    for label, command in COMMANDS.items():
+        durations = sorted(time_command(command, runs))
+        means[label] = sum(durations) / len(durations)
+        print(f"{label:<16} mean={means[label]:7.1f} ms  p50={durations[len(durations) // 2]:7.1f} ms  max={durations[-1]:7.1f} ms")
+
+    sdk_modules = subprocess.run([sys.executable, "-c", SDK_CHECK], capture_output=True, text=True, check=True).stdout.strip()
+    print(f"genai modules imported by main and tests: {sdk_modules}")
+
+    over = {label: mean - means["bare python"] for label, mean in means.items() if label != "bare python"}
+    if max_ms is not None and (sdk_modules != "[]" or max(over.values()) > max_ms):
+        print(f"FAIL: startup on top of the bare interpreter: {', '.join(f'{label} {ms:.1f} ms' for label, ms in over.items())}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# bench_tokenizer.py
+# Compares the Calculator tokenizer (one NUMBER.split pass separating the numbers from the shape of the expression)
+# with the previous str.split tokenizer, which needed spaces around every token, and with the regex pre-processing
+# that had to run before str.split on unspaced input. Also times Calculator.evaluate end to end on both inputs.
+# Usage (from the repository root): python -m benchmarks.bench_tokenizer [expressions] [runs]
+
+import re
+import sys
+from benchmarks.bench_calculator import best_time, build_expressions, report
+from calculator.pkg.calculator import NUMBER, Calculator
+
+OPERATORS = {"+", "-", "*", "/"}
+# What callers ran on "3*4+5" so that str.split could tokenize it.
+SPACE_OPERATORS = re.compile(r"([-+*/])")
+SHAPES = ["{} + {} * {}", "{} * {} - {} / {}", "{} - {}", "{} / {} + {} * {} - {}"]
+
+
+def split_tokenize(expression: str) -> tuple[tuple, tuple]:
+    tokens = expression.split()
+    return (
+        tuple([token if token in OPERATORS else None for token in tokens]),
+        tuple([float(token) for token in tokens if token not in OPERATORS]),
+    )
+
+
+def preprocess_and_split_tokenize(expression: str) -> tuple[tuple, tuple]:
+    return split_tokenize(SPACE_OPERATORS.sub(r" \1 ", expression))
+
+
+def number_split_tokenize(expression: str) -> tuple[tuple, tuple]:
+    parts = NUMBER.split(expression)
+    return tuple(parts[::2]), tuple(map(float, parts[1::2]))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    spaced = build_expressions(count, shapes=SHAPES)
+    unspaced = [expression.replace(" ", "") for expression in spaced]
+    assert [split_tokenize(e)[1] for e in spaced[:100]] == [number_split_tokenize(e)[1] for e in unspaced[:100]]
+
+    print(f"{count} distinct expressions, best of {runs} runs")
+    report("tokenize", count, {
+        "str.split (spaced)": best_time(lambda: [split_tokenize(e) for e in spaced], runs),
+        "regex + str.split": best_time(lambda: [preprocess_and_split_tokenize(e) for e in unspaced], runs),
+        "NUMBER.split (spaced)": best_time(lambda: [number_split_tokenize(e) for e in spaced], runs),
+        "NUMBER.split (unspaced)": best_time(lambda: [number_split_tokenize(e) for e in unspaced], runs),
+    })
+
+    # A fresh Calculator per run, so every expression is compiled.
+    def evaluate_all(expressions):
+        calculator = Calculator()
+        return [calculator.evaluate(expression) for expression in expressions]
+
+    report("evaluate", count, {
+        "spaced": best_time(lambda: evaluate_all(spaced), runs),
+        "unspaced": best_time(lambda: evaluate_all(unspaced), runs),
+    })
+
+
+if __name__ == "__main__":
+    main()
@@ -3,6 +3,11 @@
 import sys
 from pkg.calculator import Calculator
 from pkg.render import render
+from pkg.stream import evaluate_stream
+
+STREAM_USAGE = "Usage: python main.py --stream [file] [--format=plain|csv] [--processes=N]"
+# The --name=value options of --stream.
+STREAM_OPTIONS = {"format", "processes"}
 
 
 def main():
@@ -11,6 +16,12 @@ def main():
         print("Calculator App")
         print('Usage: python main.py "<expression>"')
         print('Example: python main.py "3 + 5"')
+        print(STREAM_USAGE)
+        print("Example: python main.py --stream expressions.txt --format=csv > results.csv")
+        return
+
+    if sys.argv[1] == "--stream":
+        stream_main(sys.argv[2:])
         return
 
     expression = " ".join(sys.argv[1:])
@@ -22,5 +33,46 @@ def main():
         print(f"Error: {e}")
 
 
+def stream_main(args):
+    # Evaluate one expression per line of a file (or stdin when no file or "-" is given) and print one result
+    # per line.
+    paths = []
+    options = {}
+    for arg in args:
+        if not arg.startswith("--"):
+            paths.append(arg)
+            continue
+        name, _, value = arg[2:].partition("=")
+        if name not in STREAM_OPTIONS:
+            stream_usage_error(f"unknown option: {arg}")
+        if not value:
+            # "--format csv" would otherwise read a file named csv.
+            stream_usage_error(f"option --{name} needs a value, given as --{name}=value")
+        options[name] = value
+    if len(paths) > 1:
+        stream_usage_error(f"expected at most one input file, got {len(paths)}: {' '.join(paths)}")
+    try:
+        processes = int(options.get("processes", 1))
+        input_file = sys.stdin if not paths or paths[0] == "-" else open(paths[0], "r")
+    except (ValueError, OSError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    try:
+        evaluate_stream(input_file, sys.stdout, output_format=options.get("format", "plain"), processes=processes)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+    sys.stdout.flush()
+
+
+def stream_usage_error(message):
+    print(f"Error: {message}", file=sys.stderr)
+    print(STREAM_USAGE, file=sys.stderr)
+    sys.exit(1)
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,61 +1,288 @@
 # calculator.py
 
+import functools
+import math
+import operator
+import re
+import types
+from collections import OrderedDict
+
+# Groups of expressions sharing a shape smaller than this are evaluated one by one even when NumPy is available.
+MIN_VECTOR_BATCH = 16
+# Operators generated as Python infix operators; others call the function in Calculator.operators.
+INFIX_OPERATORS = {"+", "-", "*", "/"}
+# Operators grouping from the right: 2 ^ 3 ^ 2 is 2 ^ (3 ^ 2).
+RIGHT_ASSOCIATIVE = {"^"}
+# The program instruction of unary minus, which binds tighter than * and / but looser than ^: -2 ^ 2 is -4.
+UNARY_MINUS = "u-"
+# A number, including the words float() reads as numbers. Numbers are never part of a longer word such as x1 or 2x.
+NUMBER = re.compile(r"(?<![\w.])((?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|(?i:inf(?:inity)?|nan))(?![\w.])")
+# Any other token: an operator or parenthesis ("**" is the same as "^"), a variable name, or something invalid.
+TOKEN = re.compile(r"\s*(?:(\*\*|[-+*/^()])|([^\W\d]\w*)|([\w.]+|\S))")
+# The default variables of compiled expressions.
+NO_VARIABLES = types.MappingProxyType({})
+
+
+@functools.lru_cache(maxsize=None)
+def load_numpy():
+    # NumPy is optional and slow to import, so it is only imported once a batch is large enough to use it.
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
 class Calculator:
-    def __init__(self):
+    def __init__(self, max_cache_size=4096, number_type=float):
+        # number_type is float, or decimal.Decimal or fractions.Fraction for exact arithmetic; numbers are parsed
+        # from their text and variable values converted with it.
+        self.number_type = number_type
         self.operators = {
             "+": lambda a, b: a + b,
             "-": lambda a, b: a - b,
             "*": lambda a, b: a * b,
             "/": lambda a, b: a / b,
+            # math.pow raises on a negative base with a fractional exponent instead of returning a complex number.
+            "^": math.pow if number_type is float else operator.pow,
         }
         self.precedence = {
             "+": 1,
             "-": 1,
             "*": 2,
             "/": 2,
+            UNARY_MINUS: 3,
+            "^": 4,
         }
+        self.max_cache_size = max_cache_size
+        # expression -> (program, constants, function of the constants), least recently used first, see _compile
+        self._compiled = OrderedDict()
+        # shape -> (program, function taking the constants), see _compile_shape
+        self._programs = {}
 
-    def evaluate(self, expression):
+    def evaluate(self, expression, variables=None):
         if not expression or expression.isspace():
             return None
-        tokens = expression.strip().split()
-        return self._evaluate_infix(tokens)
+        _, constants, function = self._compile(expression)
+        return function(constants, variables or NO_VARIABLES)
 
-    def _evaluate_infix(self, tokens):
-        values = []
-        operators = []
+    def compile(self, expression):
+        # Compile an expression into a function of an optional dict of variable values, e.g.
+        # calculator.compile("x * 2 + 1")({"x": 3}). Compiled expressions are kept in a bounded LRU cache.
+        if not expression or expression.isspace():
+            raise ValueError("empty expression")
+        _, constants, function = self._compile(expression)
+        return functools.partial(function, constants)
+
+    def evaluate_many(self, expressions, variables=None):
+        # Evaluate a batch of expressions, returning their results in order (None for empty ones).
+        # variables maps a name either to one value for every expression or to a sequence of one value per
+        # expression. Each expression is compiled once. Expressions using per-expression values are grouped by
+        # shape (the same operators and variables, different numbers); with NumPy, each large group is evaluated
+        # at once on arrays of its constants and values.
+        expressions = list(expressions)
+        variables = variables or {}
+        sequences = {}
+        scalars = {}
+        for name, value in variables.items():
+            # A string is one value (evaluate() converts it with number_type), not a sequence of characters.
+            if not hasattr(value, "__len__") or isinstance(value, (str, bytes)):
+                scalars[name] = value
+            elif len(value) != len(expressions):
+                raise ValueError(f"variable {name} has {len(value)} values for {len(expressions)} expressions")
+            else:
+                sequences[name] = value
+        scalars = scalars or NO_VARIABLES
+
+        results = [None] * len(expressions)
+        # Programs are shared by every expression of a shape, so their identity identifies the shape. The caches
+        # may drop a program during the call and its id be reused, so uses_sequences keeps every program it saw.
+        uses_sequences = {}
+        groups = {}
+        for index, expression in enumerate(expressions):
+            if not expression or expression.isspace():
+                continue
+            program, constants, function = self._compile(expression)
+            if sequences:
+                seen = uses_sequences.get(id(program))
+                if seen is None:
+                    seen = uses_sequences[id(program)] = (program, not sequences.keys().isdisjoint(program))
+                if seen[1]:
+                    group = groups.get(id(program))
+                    if group is None:
+                        group = groups[id(program)] = (program, function, [], [])
+                    group[2].append(index)
+                    group[3].append(constants)
+                    continue
+            results[index] = function(constants, scalars)
+
+        for program, function, indices, constants in groups.values():
+            if len(indices) >= MIN_VECTOR_BATCH and self.number_type is float and load_numpy() is not None:
+                vector_results = self._run_vectorized(program, constants, indices, scalars, sequences)
+                if vector_results is not None:
+                    for index, result in zip(indices, vector_results):
+                        results[index] = result
+                    continue
+            for index, row_constants in zip(indices, constants):
+                row_variables = dict(scalars)
+                row_variables.update((name, value[index]) for name, value in sequences.items())
+                results[index] = function(row_constants, row_variables)
+        return results
 
+    def _compile(self, expression):
+        compiled = self._compiled.get(expression)
+        if compiled is not None:
+            self._compiled.move_to_end(expression)
+            return compiled
+
+        # One pass of NUMBER splits the expression into its numbers and the text around them. That text is the
+        # shape of the expression: expressions that only differ in their numbers share the program of their shape,
+        # which is only tokenized and parsed the first time it is seen.
+        parts = NUMBER.split(expression)
+        shape = tuple(parts[::2])
+        entry = self._programs.get(shape)
+        if entry is None:
+            program = self._parse(self._tokenize_shape(shape))
+            entry = (program, self._generate(program))
+            if len(self._programs) >= self.max_cache_size:
+                self._programs.clear()
+            self._programs[shape] = entry
+        program, function = entry
+        compiled = (program, tuple(map(self.number_type, parts[1::2])), function)
+        self._compiled[expression] = compiled
+        if len(self._compiled) > self.max_cache_size:
+            self._compiled.popitem(last=False)
+        return compiled
+
+    def _tokenize_shape(self, shape):
+        # The tokens of the text between numbers, with None for each number.
+        tokens = []
+        for index, text in enumerate(shape):
+            if index:
+                tokens.append(None)
+            for symbol, name, invalid in TOKEN.findall(text):
+                if invalid:
+                    raise ValueError(f"invalid token: {invalid}")
+                tokens.append("^" if symbol == "**" else symbol or name)
+        return tokens
+
+    def _parse(self, tokens):
+        # Shunting-yard over the tokens of a shape, producing its program in RPN: an int is the index of a
+        # constant, an operator symbol a binary operator, UNARY_MINUS a negation and any other string a variable.
+        program = []
+        operators = []
+        slot = 0
+        expect_operand = True
         for token in tokens:
-            if token in self.operators:
-                while (
-                    operators
-                    and operators[-1] in self.operators
-                    and self.precedence[operators[-1]] >= self.precedence[token]
+            if expect_operand:
+                if token == "(":
+                    operators.append(token)
+                    continue
+                if token == "-":
+                    operators.append(UNARY_MINUS)
+                    continue
+                if token in self.operators:
+                    raise ValueError(f"not enough operands for operator {token}")
+                if token == ")":
+                    raise ValueError("invalid expression")
+                if token is None:
+                    program.append(slot)
+                    slot += 1
+                else:
+                    program.append(token)
+                expect_operand = False
+            elif token == ")":
+                while operators and operators[-1] != "(":
+                    program.append(operators.pop())
+                if not operators:
+                    raise ValueError("unbalanced parentheses")
+                operators.pop()
+            elif token in self.operators:
+                precedence = self.precedence[token]
+                while operators and operators[-1] != "(" and (
+                    self.precedence[operators[-1]] > precedence
+                    or (self.precedence[operators[-1]] == precedence and token not in RIGHT_ASSOCIATIVE)
                 ):
-                    self._apply_operator(operators, values)
+                    program.append(operators.pop())
                 operators.append(token)
+                expect_operand = True
             else:
-                try:
-                    values.append(float(token))
-                except ValueError:
-                    raise ValueError(f"invalid token: {token}")
-
-        while operators:
-            self._apply_operator(operators, values)
+                # An operand or "(" right after an operand.
+                raise ValueError("invalid expression")
 
-        if len(values) != 1:
+        if expect_operand:
+            if operators and operators[-1] in self.operators:
+                raise ValueError(f"not enough operands for operator {operators[-1]}")
             raise ValueError("invalid expression")
+        while operators:
+            if operators[-1] == "(":
+                raise ValueError("unbalanced parentheses")
+            program.append(operators.pop())
+        return tuple(program)
 
-        return values[0]
-
-    def _apply_operator(self, operators, values):
-        if not operators:
-            return
-
-        operator = operators.pop()
-        if len(values) < 2:
-            raise ValueError(f"not enough operands for operator {operator}")
+    def _generate(self, program):
+        # Turn a program into straight-line Python code (one assignment per operator, so long expressions do not
+        # hit the parser's nesting limit) and compile it once; evaluating an expression is then a function call.
+        lines = []
+        slots = sum(isinstance(instruction, int) for instruction in program)
+        if slots:
+            lines.append(f"    {', '.join(f'c{slot}' for slot in range(slots))}, = constants")
+        names = {}
+        stack = []
+        for instruction in program:
+            if isinstance(instruction, int):
+                stack.append(f"c{instruction}")
+            elif instruction == UNARY_MINUS:
+                lines.append(f"    t{len(lines)} = -{stack.pop()}")
+                stack.append(f"t{len(lines) - 1}")
+            elif instruction in self.operators:
+                b = stack.pop()
+                a = stack.pop()
+                if instruction in INFIX_OPERATORS:
+                    lines.append(f"    t{len(lines)} = {a} {instruction} {b}")
+                else:
+                    lines.append(f"    t{len(lines)} = operators[{instruction!r}]({a}, {b})")
+                stack.append(f"t{len(lines) - 1}")
+            else:
+                if instruction not in names:
+                    # Variables get generated names, so any identifier (even a keyword) can be used.
+                    names[instruction] = f"v{len(names)}"
+                    lines.append(
+                        f"    try:\n        {names[instruction]} = number(variables[{instruction!r}])\n"
+                        f"    except KeyError:\n        raise ValueError({f'unknown variable: {instruction}'!r}) from None"
+                    )
+                stack.append(names[instruction])
+        lines.append(f"    return {stack[0]}")
+        namespace = {"operators": self.operators, "number": self.number_type, "NO_VARIABLES": NO_VARIABLES}
+        exec("def evaluate(constants, variables=NO_VARIABLES):\n" + "\n".join(lines), namespace)
+        return namespace["evaluate"]
 
-        b = values.pop()
-        a = values.pop()
-        values.append(self.operators[operator](a, b))
\ No newline at end of file
+    def _run_vectorized(self, program, constants, indices, scalars, sequences):
+        # Evaluate a group of same-shaped expressions on arrays. Returns None when NumPy flags a division by zero,
+        # an overflow or an invalid operation: the group is then evaluated one by one, so it gets the exact results
+        # and exceptions of evaluate() (ZeroDivisionError, OverflowError and ValueError from math.pow, inf from *).
+        numpy = load_numpy()
+        columns = numpy.array(constants, dtype=float).reshape(len(indices), -1)
+        values = []
+        with numpy.errstate(all="raise"):
+            try:
+                for instruction in program:
+                    if isinstance(instruction, int):
+                        values.append(columns[:, instruction])
+                    elif instruction == UNARY_MINUS:
+                        values.append(-values.pop())
+                    elif instruction in self.operators:
+                        b = values.pop()
+                        a = values.pop()
+                        values.append(numpy.power(a, b) if instruction == "^" else self.operators[instruction](a, b))
+                    elif instruction in sequences:
+                        # Values are converted with float() like evaluate() does, so None or a bad string raise.
+                        value = sequences[instruction]
+                        values.append(numpy.fromiter(map(float, map(value.__getitem__, indices)), float, len(indices)))
+                    elif instruction in scalars:
+                        values.append(float(scalars[instruction]))
+                    else:
+                        raise ValueError(f"unknown variable: {instruction}")
+            except FloatingPointError:
+                return None
+        return numpy.broadcast_to(values[0], (len(indices),)).tolist()
@@ -1,10 +1,16 @@
 # render.py
 
-def render(expression, result):
+import io
+
+
+def format_result(result):
     if isinstance(result, float) and result.is_integer():
-        result_str = str(int(result))
-    else:
-        result_str = str(result)
+        return str(int(result))
+    return str(result)
+
+
+def render(expression, result):
+    result_str = format_result(result)
 
     box_width = max(len(expression), len(result_str)) + 4
 
@@ -20,4 +26,80 @@ def render(expression, result):
         "│" + " " * 2 + result_str + " " * (box_width - len(result_str) - 2) + "│"
     )
     box.append("└" + "─" * box_width + "┘")
-    return "\n".join(box)
\ No newline at end of file
+    return "\n".join(box)
+
+RENDER_STYLES = ("table", "grid", "plain")
+# Rows formatted per buffer write by render_many.
+RENDER_BLOCK = 4096
+
+
+def render_many(pairs, style="table", columns=4, output=None):
+    # Render many (expression, result) pairs at once; a result may also be an exception, rendered as its error.
+    # - "table": one bordered table with an expression column and a right-aligned result column;
+    # - "grid": the boxes of render, all the same width, laid out columns boxes per row;
+    # - "plain": one "expression<TAB>result" line per pair, for machine consumption.
+    # Widths are computed once for the whole batch and turned into one format string per row layout, and rows
+    # are written in blocks to one buffer (output, a file-like object, when given; the rendered text is
+    # returned otherwise).
+    if style not in RENDER_STYLES:
+        raise ValueError(f"unknown render style: {style}")
+    if columns < 1:
+        raise ValueError(f"columns must be at least 1, got {columns}")
+    expressions = []
+    results = []
+    for expression, result in pairs:
+        expressions.append(expression)
+        if result.__class__ is float:
+            # format_result inlined for the common case.
+            results.append(str(int(result)) if result.is_integer() else repr(result))
+        elif isinstance(result, Exception):
+            results.append(f"Error: {result}")
+        else:
+            results.append("" if result is None else format_result(result))
+    buffer = io.StringIO() if output is None else output
+
+    if style == "plain":
+        _write_rows(buffer, "{}\t{}\n", 1, expressions, results)
+    elif style == "table":
+        expression_width = max(map(len, expressions), default=0)
+        result_width = max(map(len, results), default=0)
+        buffer.write(f"┌{'─' * (expression_width + 2)}┬{'─' * (result_width + 2)}┐\n")
+        _write_rows(buffer, f"│ {{:<{expression_width}}} │ {{:>{result_width}}} │\n", 1, expressions, results)
+        buffer.write(f"└{'─' * (expression_width + 2)}┴{'─' * (result_width + 2)}┘\n")
+    else:
+        width = max(max(map(len, expressions), default=0), max(map(len, results), default=0))
+        box_width = width + 4
+        box = [
+            f"┌{'─' * box_width}┐",
+            f"│  {{:<{width}}}  │",
+            f"│{' ' * box_width}│",
+            f"│  ={' ' * (box_width - 3)}│",
+            f"│{' ' * box_width}│",
+            f"│  {{:<{width}}}  │",
+            f"└{'─' * box_width}┘",
+        ]
+        full = len(expressions) - len(expressions) % columns
+        _write_rows(buffer, _grid_row(box, columns), columns, expressions[:full], results[:full])
+        _write_rows(buffer, _grid_row(box, len(expressions) - full), columns, expressions[full:], results[full:])
+    if output is None:
+        return buffer.getvalue()
+
+
+def _grid_row(box, count):
+    # The format string of a row of count boxes. Its fields are numbered automatically, expressions first.
+    return "".join(" ".join([line] * count) + "\n" for line in box)
+
+
+def _write_rows(buffer, template, per_row, expressions, results):
+    if per_row == 1:
+        for start in range(0, len(expressions), RENDER_BLOCK):
+            end = start + RENDER_BLOCK
+            buffer.write("".join(map(template.format, expressions[start:end], results[start:end])))
+        return
+    rows = []
+    for start in range(0, len(expressions), per_row):
+        rows.append(template.format(*expressions[start:start + per_row], *results[start:start + per_row]))
+        if len(rows) == RENDER_BLOCK:
+            buffer.write("".join(rows))
+            rows.clear()
+    buffer.write("".join(rows))
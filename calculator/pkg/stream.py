@@ -0,0 +1,73 @@
+# stream.py
+
+import csv
+import io
+import itertools
+import multiprocessing
+from collections import deque
+from pkg.calculator import Calculator
+from pkg.render import format_result
+
+CHUNK_LINES = 10000
+OUTPUT_FORMATS = ("plain", "csv")
+
+# The Calculator of a worker process, created on its first chunk.
+_worker_calculator = None
+
+
+def evaluate_lines(lines, output_format="plain", calculator=None):
+    # Evaluate one expression per line and return the formatted results, one line each. An empty line gives
+    # an empty result and an invalid expression an error, so output lines always match input lines.
+    global _worker_calculator
+    if calculator is None:
+        if _worker_calculator is None:
+            _worker_calculator = Calculator()
+        calculator = _worker_calculator
+
+    if output_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for line in lines:
+            expression = line.strip()
+            try:
+                result = calculator.evaluate(expression)
+                writer.writerow([expression, "" if result is None else format_result(result), ""])
+            except Exception as e:
+                writer.writerow([expression, "", str(e)])
+        return buffer.getvalue()
+
+    results = []
+    for line in lines:
+        try:
+            result = calculator.evaluate(line)
+            results.append("" if result is None else format_result(result))
+        except Exception as e:
+            results.append(f"Error: {e}")
+    results.append("")
+    return "\n".join(results)
+
+
+def evaluate_stream(input_file, output_file, output_format="plain", processes=1, chunk_lines=CHUNK_LINES):
+    # Evaluate every line of input_file and write the results to output_file in input order.
+    # Lines are processed in chunks, and with several processes at most two chunks per process are in flight,
+    # so memory does not grow with the size of the input.
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"unknown output format: {output_format}")
+    if output_format == "csv":
+        output_file.write("expression,result,error\n")
+    chunks = iter(lambda: list(itertools.islice(input_file, chunk_lines)), [])
+
+    if processes <= 1:
+        calculator = Calculator()
+        for chunk in chunks:
+            output_file.write(evaluate_lines(chunk, output_format, calculator))
+        return
+
+    with multiprocessing.Pool(processes) as pool:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(evaluate_lines, (chunk, output_format)))
+            if len(pending) >= processes * 2:
+                output_file.write(pending.popleft().get())
+        while pending:
+            output_file.write(pending.popleft().get())
@@ -1,7 +1,17 @@
 # tests.py
 
+import contextlib
+import io
 import unittest
+import warnings
+from decimal import Decimal
+from fractions import Fraction
+from unittest import mock
+from pkg import calculator as calculator_module
 from pkg.calculator import Calculator
+from pkg.render import render, render_many
+from pkg.stream import evaluate_stream
+from main import stream_main
 
 
 class TestCalculator(unittest.TestCase):
@@ -45,5 +55,190 @@ class TestCalculator(unittest.TestCase):
             self.calculator.evaluate("+ 3")
 
 
+    def test_variables(self):
+        self.assertEqual(self.calculator.evaluate("x * 2 + y", {"x": 3, "y": 1}), 7)
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("x + 1")
+
+    def test_compile(self):
+        expression = self.calculator.compile("x * 2 + 3 / y")
+        self.assertEqual(expression({"x": 3, "y": 4}), 6.75)
+        self.assertEqual(expression({"x": 1, "y": 1}), 5)
+        self.assertEqual(self.calculator.compile("2 * 3 - 8 / 2 + 5")(), 7)
+        with self.assertRaises(ValueError):
+            expression({"x": 3})
+        with self.assertRaises(ValueError):
+            self.calculator.compile(" ")
+        # any identifier can be a variable, and long expressions do not hit Python's nesting limits
+        self.assertEqual(self.calculator.evaluate("if + 1", {"if": 1}), 2)
+        self.assertEqual(self.calculator.evaluate(" + ".join(["1"] * 5000)), 5000)
+
+    def test_compile_cache(self):
+        calculator = Calculator(max_cache_size=2)
+        calculator.compile("1 + 2")
+        calculator.compile("3 + 4")
+        calculator.compile("1 + 2")
+        calculator.compile("5 * 6")
+        self.assertEqual(list(calculator._compiled), ["1 + 2", "5 * 6"])
+        self.assertEqual(calculator.evaluate("3 + 4"), 7)
+
+    def test_evaluate_many(self):
+        expressions = [f"{i} * 2 + {i} / 4" for i in range(1, 40)] + ["", "3 * 4 + 5", "2 * 3 - 8 / 2 + 5"]
+        expected = [self.calculator.evaluate(expression) for expression in expressions]
+        self.assertEqual(self.calculator.evaluate_many(expressions), expected)
+        # the same results without NumPy
+        with mock.patch.object(calculator_module, "load_numpy", return_value=None):
+            self.assertEqual(Calculator().evaluate_many(expressions), expected)
+
+    def test_evaluate_many_variables(self):
+        xs = list(range(50))
+        results = self.calculator.evaluate_many(["x * 2 + y"] * 49 + ["x - y"], {"x": xs, "y": 1})
+        self.assertEqual(results, [x * 2 + 1 for x in xs[:49]] + [48])
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate_many(["x + 1", "x + 2"], {"x": [1]})
+        # a string is one value for every expression, like in evaluate()
+        self.assertEqual(self.calculator.evaluate_many(["x+1"] * 3, {"x": "5"}), [self.calculator.evaluate("x+1", {"x": "5"})] * 3)
+        with self.assertRaises(ZeroDivisionError):
+            self.calculator.evaluate_many(["1 / x"] * 20, {"x": range(20)})
+
+    def test_evaluate_many_small_cache(self):
+        # programs evicted during the batch are not mistaken for later programs reusing their ids
+        expressions = [f"a{i} * 2" if i % 2 else f"x{i % 3} - {i}" for i in range(2000)]
+        variables = {f"x{i}": [i] * 2000 for i in range(3)}
+        variables.update((f"a{i}", 1) for i in range(2000))
+        results = Calculator(max_cache_size=4).evaluate_many(expressions, variables)
+        self.assertEqual(results, [2.0 if i % 2 else i % 3 - i for i in range(2000)])
+
+    def test_evaluate_many_matches_evaluate(self):
+        # the NumPy path gives the results and exceptions of evaluate() on the values that overflow or fail
+        cases = [
+            ("x ^ 0.5", {"x": -4}),
+            ("x ^ 400", {"x": 10}),
+            ("0 ^ x", {"x": -1}),
+            ("x * 1e300", {"x": 1e300}),
+            ("x - y", {"x": float("inf"), "y": float("inf")}),
+            ("1 / x", {"x": 0}),
+            ("x + 1", {"x": None}),
+            ("x + y", {"x": 1, "y": "2.5"}),
+        ]
+        # and without a RuntimeWarning
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            for expression, values in cases:
+                try:
+                    expected = self.calculator.evaluate(expression, values)
+                except Exception as e:
+                    expected = type(e)
+                # the failing value is in the last of enough rows to take the NumPy path
+                variables = {name: [1] * 19 + [value] for name, value in values.items()}
+                with self.subTest(expression=expression, values=values):
+                    if isinstance(expected, type):
+                        with self.assertRaises(expected):
+                            self.calculator.evaluate_many([expression] * 20, variables)
+                    else:
+                        # repr, so that nan equals nan
+                        self.assertEqual(repr(self.calculator.evaluate_many([expression] * 20, variables)[-1]), repr(expected))
+        # scalar variables are converted with float() too
+        with self.assertRaises(TypeError):
+            self.calculator.evaluate_many(["x + z"] * 20, {"x": None, "z": list(range(20))})
+        self.assertEqual(self.calculator.evaluate_many(["x + z"] * 20, {"x": Fraction(3, 2), "z": [1] * 20}), [2.5] * 20)
+
+    def test_evaluate_many_invalid(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate_many(["3 + 5", "$ 3 5"])
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate_many(["+ 3"])
+        # expressions matching a cached shape's operators are still checked
+        self.assertEqual(self.calculator.evaluate_many(["1 + 2 + 3", "x + 2 + 3"], {"x": 4}), [6, 9])
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("3 + + + 5")
+
+    def test_parentheses_and_powers(self):
+        self.assertEqual(self.calculator.evaluate("(3 + 5) * 2"), 16)
+        self.assertEqual(self.calculator.evaluate("3*4+5"), 17)
+        self.assertEqual(self.calculator.evaluate("3 - -2"), 5)
+        self.assertEqual(self.calculator.evaluate("-2 ^ 2"), -4)
+        self.assertEqual(self.calculator.evaluate("2 ^ 3 ^ 2"), 512)
+        self.assertEqual(self.calculator.evaluate("2 ** -1"), 0.5)
+        self.assertEqual(self.calculator.evaluate("-(x1 + 1e2)", {"x1": 1}), -101)
+        for expression in ["(3", "3)", "3 5", "2x", "3 5 +"]:
+            with self.assertRaises(ValueError):
+                self.calculator.evaluate(expression)
+        xs = list(range(20))
+        self.assertEqual(self.calculator.evaluate_many(["-x ^ 2 + 1"] * 20, {"x": xs}), [-x ** 2 + 1 for x in xs])
+
+    def test_number_type(self):
+        self.assertEqual(Calculator(number_type=Decimal).evaluate("0.1 + 0.2"), Decimal("0.3"))
+        self.assertEqual(Calculator(number_type=Fraction).evaluate("1 / 3 + 1 / 6"), Fraction(1, 2))
+        self.assertEqual(Calculator(number_type=Fraction).evaluate("x ^ 2", {"x": "1/2"}), Fraction(1, 4))
+
+
+class TestStream(unittest.TestCase):
+    lines = "3 + 5\n\n$ 3\n10 / 4\n1 / 0\n"
+
+    def stream(self, text, **kwargs):
+        output = io.StringIO()
+        evaluate_stream(io.StringIO(text), output, **kwargs)
+        return output.getvalue()
+
+    def test_plain(self):
+        self.assertEqual(
+            self.stream(self.lines),
+            "8\n\nError: invalid token: $\n2.5\nError: float division by zero\n",
+        )
+
+    def test_csv(self):
+        self.assertEqual(
+            self.stream(self.lines, output_format="csv"),
+            "expression,result,error\n3 + 5,8,\n,,\n$ 3,,invalid token: $\n10 / 4,2.5,\n1 / 0,,float division by zero\n",
+        )
+        with self.assertRaises(ValueError):
+            self.stream(self.lines, output_format="xml")
+
+    def test_processes(self):
+        text = "".join(f"{i} * 2 + 1\n" for i in range(50))
+        self.assertEqual(self.stream(text, processes=2, chunk_lines=7), self.stream(text))
+
+    def test_stream_main_options(self):
+        # an option without =value or an unknown option is rejected rather than read as a path or ignored
+        for args in (["--format", "csv"], ["--fromat=csv"], ["--processes="], ["a.txt", "b.txt"]):
+            stderr = io.StringIO()
+            with self.subTest(args=args), contextlib.redirect_stderr(stderr), self.assertRaises(SystemExit):
+                stream_main(args)
+            self.assertIn("Usage: python main.py --stream", stderr.getvalue())
+
+
+class TestRender(unittest.TestCase):
+    pairs = [("3 + 5", 8.0), ("10 / 4", 2.5), ("1 / 0", ZeroDivisionError("float division by zero")), ("", None)]
+
+    def test_table(self):
+        self.assertEqual(
+            render_many(self.pairs),
+            "┌────────┬───────────────────────────────┐\n"
+            "│ 3 + 5  │                             8 │\n"
+            "│ 10 / 4 │                           2.5 │\n"
+            "│ 1 / 0  │ Error: float division by zero │\n"
+            "│        │                               │\n"
+            "└────────┴───────────────────────────────┘\n",
+        )
+
+    def test_plain(self):
+        output = io.StringIO()
+        self.assertIsNone(render_many(self.pairs, "plain", output=output))
+        self.assertEqual(output.getvalue(), "3 + 5\t8\n10 / 4\t2.5\n1 / 0\tError: float division by zero\n\t\n")
+        with self.assertRaises(ValueError):
+            render_many(self.pairs, "html")
+
+    def test_grid(self):
+        self.assertEqual(render_many([("3 + 5", 8.0)], "grid"), render("3 + 5", 8.0) + "\n")
+        lines = render_many(self.pairs[:3], "grid", columns=2).splitlines()
+        self.assertEqual(len(lines), 14)
+        self.assertEqual(lines[1], "│  3 + 5                          │ │  10 / 4                         │")
+        self.assertEqual(lines[12], "│  Error: float division by zero  │")
+        for columns in (0, -1):
+            with self.assertRaises(ValueError):
+                render_many(self.pairs, "grid", columns=columns)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
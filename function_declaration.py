@@ -16,7 +16,7 @@ schema_get_files_info = types.FunctionDeclaration(
 
 schema_get_file_content = types.FunctionDeclaration(
     name="get_file_content",
-    description="Retrieves the content of a specified file.",
+    description="Retrieves the content of a specified file. Files over 10000 characters are truncated at a line break, except Python files, which return their outline instead.",
     parameters=types.Schema(
         type=types.Type.OBJECT,
         properties={
@@ -28,6 +28,29 @@ schema_get_file_content = types.FunctionDeclaration(
     ),
 )
 
+schema_get_files_content = types.FunctionDeclaration(
+    name="get_files_content",
+    description="Retrieves the content of several files in one call: a list of paths, every file matching a glob, or both. Each file is read like get_file_content, and the files share a total budget of characters; files that do not fit are listed under \"omitted\" to be read in another call. Returns {\"files\": [{\"path\", \"content\"}], \"errors\": [{\"path\", \"error\"}], \"omitted\": [paths], \"total_chars\"}.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_paths": types.Schema(
+                type=types.Type.ARRAY,
+                description="The paths to the files to retrieve, relative to the working directory.",
+                items=types.Schema(type=types.Type.STRING),
+            ),
+            "pattern": types.Schema(
+                type=types.Type.STRING,
+                description="A glob matched against every file path and file name, e.g. \"pkg/*.py\" or \"*.md\". At most 50 files are read per call.",
+            ),
+            "max_chars": types.Schema(
+                type=types.Type.INTEGER,
+                description="The total number of characters returned for all files. Defaults to 40000.",
+            ),
+        },
+    ),
+)
+
 schema_run_python_file = types.FunctionDeclaration(
     name="run_python_file",
     description="Executes a Python file.",
@@ -58,4 +81,170 @@ schema_write_file = types.FunctionDeclaration(
             ),
         },
     ),
-)
\ No newline at end of file
+)
+
+schema_get_file_outline = types.FunctionDeclaration(
+    name="get_file_outline",
+    description="Outlines a Python file: its imports, classes, functions with their signatures and top-level names, each with its line range. Use it before reading a large module, then read only the line ranges you need with read_file_range.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_path": types.Schema(
+                type=types.Type.STRING,
+                description="The path to the Python file to outline, relative to the working directory.",
+            ),
+        },
+        required=["file_path"],
+    ),
+)
+
+schema_read_file_range = types.FunctionDeclaration(
+    name="read_file_range",
+    description="Reads part of a file, either a byte range (offset/length) or a line range (start_line/end_line), without loading the whole file. Use it to page through large files; the response header gives the next offset or line to continue from. At most 10000 characters are returned.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_path": types.Schema(
+                type=types.Type.STRING,
+                description="The path to the file to read, relative to the working directory.",
+            ),
+            "offset": types.Schema(
+                type=types.Type.INTEGER,
+                description="The byte offset to start reading at. Defaults to 0.",
+            ),
+            "length": types.Schema(
+                type=types.Type.INTEGER,
+                description="The number of bytes to read. Defaults to (and is capped at) 10000.",
+            ),
+            "start_line": types.Schema(
+                type=types.Type.INTEGER,
+                description="The first line to read, starting at 1. Takes precedence over offset/length.",
+            ),
+            "end_line": types.Schema(
+                type=types.Type.INTEGER,
+                description="The last line to read, inclusive.",
+            ),
+        },
+        required=["file_path"],
+    ),
+)
+
+schema_get_files_tree = types.FunctionDeclaration(
+    name="get_files_tree",
+    description="Lists a directory tree recursively in one call, with file sizes, skipping paths ignored by .gitignore files. Results are bounded by a depth limit and paginated; the first line reports the total number of entries and pages.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "directory": types.Schema(
+                type=types.Type.STRING,
+                description="The directory to list, relative to the working directory. Defaults to the working directory itself.",
+            ),
+            "max_depth": types.Schema(
+                type=types.Type.INTEGER,
+                description="How many directory levels to descend; 1 lists only the directory's own entries. Defaults to 2, at most 10.",
+            ),
+            "pattern": types.Schema(
+                type=types.Type.STRING,
+                description="Only list entries whose name or relative path matches this glob, e.g. \"*.py\".",
+            ),
+            "page": types.Schema(
+                type=types.Type.INTEGER,
+                description="The page of results to return, starting at 1.",
+            ),
+            "page_size": types.Schema(
+                type=types.Type.INTEGER,
+                description="The number of entries per page. Defaults to 200, at most 500.",
+            ),
+        },
+    ),
+)
+
+schema_search_code = types.FunctionDeclaration(
+    name="search_code",
+    description="Searches the text files of the working directory for a literal string, like grep, using a persistent trigram index so repeated searches stay fast on large trees. Returns \"path:line: text\" for each matching line with surrounding context lines, grouped and separated by \"--\".",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "query": types.Schema(
+                type=types.Type.STRING,
+                description="The literal text to search for.",
+            ),
+            "path": types.Schema(
+                type=types.Type.STRING,
+                description="Only search below this directory, or files matching this glob, e.g. \"*.py\". Defaults to the whole working directory.",
+            ),
+            "case_sensitive": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Whether the match is case-sensitive. Defaults to false.",
+            ),
+            "context_lines": types.Schema(
+                type=types.Type.INTEGER,
+                description="The number of lines shown before and after each match. Defaults to 2, at most 10.",
+            ),
+            "max_results": types.Schema(
+                type=types.Type.INTEGER,
+                description="The maximum number of matching lines returned. Defaults to 50, at most 200.",
+            ),
+        },
+        required=["query"],
+    ),
+)
+
+schema_run_tests = types.FunctionDeclaration(
+    name="run_tests",
+    description="Runs the unittest test cases of a test file, skipping those that already passed with the same sources: the test's code and every workspace file it imports, directly or not. Use it instead of run_python_file on a test file after changing code. Reports how many tests ran and were skipped, the files written since the last run, the unittest output and the failed tests.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "file_path": types.Schema(
+                type=types.Type.STRING,
+                description="The path to the test file, relative to the working directory. Defaults to \"tests.py\".",
+            ),
+            "run_all": types.Schema(
+                type=types.Type.BOOLEAN,
+                description="Run every test case, even those that passed with the same sources. Defaults to false.",
+            ),
+        },
+    ),
+)
+
+schema_edit_files = types.FunctionDeclaration(
+    name="edit_files",
+    description="Edits one or more files in a single call without resending their whole content. Each edit either replaces a unique search text with a replacement, or applies the hunks of a unified diff of one file. Edits to the same file are applied in order; if any edit does not apply, no file is changed. An edit with an empty search text creates a new file.",
+    parameters=types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "edits": types.Schema(
+                type=types.Type.ARRAY,
+                description="The edits to apply.",
+                items=types.Schema(
+                    type=types.Type.OBJECT,
+                    properties={
+                        "file_path": types.Schema(
+                            type=types.Type.STRING,
+                            description="The path to the file to edit, relative to the working directory.",
+                        ),
+                        "search": types.Schema(
+                            type=types.Type.STRING,
+                            description="The exact text to replace, including enough surrounding lines to be unique in the file.",
+                        ),
+                        "replace": types.Schema(
+                            type=types.Type.STRING,
+                            description="The text replacing the search text.",
+                        ),
+                        "replace_all": types.Schema(
+                            type=types.Type.BOOLEAN,
+                            description="Replace every occurrence of the search text instead of requiring a unique one.",
+                        ),
+                        "diff": types.Schema(
+                            type=types.Type.STRING,
+                            description="A unified diff of this file (@@ hunks with space, - and + prefixed lines), used instead of search/replace.",
+                        ),
+                    },
+                    required=["file_path"],
+                ),
+            ),
+        },
+        required=["edits"],
+    ),
+)
@@ -0,0 +1,205 @@
+import os
+import re
+from functions.get_file_content import is_sub_file
+from functions.write_file import notify_file_written, write_atomic
+
+# "@@ -12,7 +12,8 @@"; the line numbers are optional, hunks without them are located by their content alone.
+HUNK_HEADER = re.compile(r"^@@(?: -(\d+)(?:,\d+)? \+\d+(?:,\d+)?)? @@")
+
+
+def edit_files(working_directory: str, edits: list[dict]) -> str:
+    """
+    Apply edits to one or more files without resending their whole content.
+    Each edit is either a search/replace ({"file_path", "search", "replace", "replace_all"}) or a unified diff
+    of one file ({"file_path", "diff"}). Edits to the same file are applied in order. Nothing is written unless
+    every edit applies; files are then written atomically, and files whose content did not change are not touched.
+    Args:
+        working_directory: The working directory.
+        edits: The edits to apply.
+    Returns:
+        One line per file saying whether it was created, edited or left unchanged.
+    """
+    if not edits:
+        raise ValueError("Error: No edits given")
+    originals: dict[str, str | None] = {}
+    contents: dict[str, str] = {}
+    line_counts: dict[str, list[int]] = {}
+    for number, edit in enumerate(edits, start=1):
+        file_path = edit.get("file_path")
+        if not file_path:
+            raise ValueError(f"Error: Edit {number} has no file_path")
+        if not is_sub_file(working_directory, file_path):
+            raise ValueError(f'Error: Cannot edit "{file_path}" as it is outside the permitted working directory')
+        rel_path = os.path.normpath(file_path)
+        if rel_path not in contents:
+            originals[rel_path] = read_original(working_directory, rel_path)
+            contents[rel_path] = originals[rel_path] or ""
+            line_counts[rel_path] = [0, 0]
+        try:
+            if edit.get("diff"):
+                contents[rel_path], added, removed = apply_unified_diff(contents[rel_path], edit["diff"])
+            elif "search" in edit:
+                if originals[rel_path] is None and edit["search"]:
+                    raise ValueError("the file does not exist; use an empty search to create it")
+                contents[rel_path], added, removed = apply_search_replace(
+                    contents[rel_path], edit["search"], edit.get("replace", ""), bool(edit.get("replace_all", False)))
+            else:
+                raise ValueError("an edit needs either search/replace or diff")
+        except ValueError as e:
+            raise ValueError(f'Error: Edit {number} of "{file_path}": {e}. No files were changed.')
+        line_counts[rel_path][0] += added
+        line_counts[rel_path][1] += removed
+
+    results = []
+    for rel_path, content in contents.items():
+        try:
+            if originals[rel_path] is None:
+                os.makedirs(os.path.dirname(os.path.join(working_directory, rel_path)), exist_ok=True)
+            written = content != originals[rel_path] and write_atomic(os.path.join(working_directory, rel_path), content)
+        except Exception as e:
+            raise Exception(f'Error: {e}')
+        if not written:
+            results.append(f'No changes to "{rel_path}" (content unchanged)')
+            continue
+        notify_file_written(working_directory, rel_path, originals[rel_path] is None)
+        action = "Created" if originals[rel_path] is None else "Edited"
+        added, removed = line_counts[rel_path]
+        results.append(f'{action} "{rel_path}" (+{added} -{removed} lines)')
+    return "\n".join(results)
+
+
+def read_original(working_directory: str, rel_path: str) -> str | None:
+    """
+    Read the current content of a file to edit, or None if it does not exist yet.
+    """
+    fp_final = os.path.join(working_directory, rel_path)
+    if os.path.isdir(fp_final):
+        raise ValueError(f'Error: Cannot edit "{rel_path}" as it is a directory')
+    try:
+        # newline="" keeps \r\n line endings intact.
+        with open(fp_final, "r", encoding="utf-8", newline="") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+    except UnicodeDecodeError:
+        raise ValueError(f'Error: Cannot edit "{rel_path}" as it is not a UTF-8 text file')
+
+
+def apply_search_replace(content: str, search: str, replace: str, replace_all: bool = False) -> tuple[str, int, int]:
+    """
+    Replace the unique occurrence of search in content (every occurrence with replace_all).
+    An empty search only applies to an empty (or new) file, whose content becomes replace.
+    Returns:
+        The new content and the number of lines added and removed.
+    """
+    if search == "":
+        if content:
+            raise ValueError("the search text is empty")
+        return replace, count_lines(replace), 0
+    occurrences = content.count(search)
+    if occurrences == 0 and "\r\n" in content and "\r\n" not in search:
+        # The model writes \n; match files with Windows line endings too.
+        search, replace = search.replace("\n", "\r\n"), replace.replace("\n", "\r\n")
+        occurrences = content.count(search)
+    if occurrences == 0:
+        raise ValueError("the search text was not found")
+    if occurrences > 1 and not replace_all:
+        raise ValueError(f"the search text was found {occurrences} times; include more context or set replace_all")
+    replaced = occurrences if replace_all else 1
+    return content.replace(search, replace, replaced), count_lines(replace) * replaced, count_lines(search) * replaced
+
+
+def apply_unified_diff(content: str, diff: str) -> tuple[str, int, int]:
+    """
+    Apply the hunks of a unified diff of one file.
+    Hunks are applied in order. Each is located by its context and removed lines, at the position given by its
+    header when that matches, otherwise at the nearest matching position after the previous hunk.
+    Returns:
+        The new content and the number of lines added and removed.
+    """
+    hunks = parse_hunks(diff)
+    if not hunks:
+        raise ValueError("the diff has no hunks")
+    lines = content.splitlines(keepends=True)
+    stripped = [line.rstrip("\r\n") for line in lines]
+    newline = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    offset = 0
+    search_start = 0
+    added = removed = 0
+    for number, (start, old, new, context) in enumerate(hunks, start=1):
+        if start is None:
+            expected = None
+        elif old:
+            expected = start - 1 + offset
+        else:
+            # "@@ -N,0 ..." inserts after line N (N is 0 to insert at the top).
+            expected = start + offset
+        position = find_block(stripped, old, search_start, expected)
+        if position is None:
+            first_line = next((line for line in old if line.strip()), "")
+            raise ValueError(f'hunk {number} does not match the file (near "{first_line.strip()}")')
+        end = position + len(old)
+        replacement = [line + newline for line in new]
+        if replacement and end == len(lines) and lines and not lines[-1].endswith("\n") and old:
+            # The hunk replaced the last line, which had no trailing newline; keep it that way.
+            replacement[-1] = new[-1]
+        lines[position:end] = replacement
+        stripped[position:end] = new
+        offset += len(new) - len(old)
+        search_start = position + len(new)
+        added += len(new) - context
+        removed += len(old) - context
+    return "".join(lines), added, removed
+
+
+def parse_hunks(diff: str) -> list[tuple[int | None, list[str], list[str], int]]:
+    """
+    Parse the hunks of a unified diff into (old start line, old lines, new lines, number of context lines).
+    File headers before the first hunk are skipped.
+    """
+    hunks: list[list] = []
+    for line in diff.splitlines():
+        header = HUNK_HEADER.match(line)
+        if header:
+            hunks.append([int(header.group(1)) if header.group(1) else None, [], [], 0])
+            continue
+        if not hunks or line.startswith("\\"):
+            # Text before the first hunk (diff/---/+++ headers) and "\ No newline at end of file" markers.
+            continue
+        hunk = hunks[-1]
+        tag, text = (line[0], line[1:]) if line else (" ", "")
+        if tag == " ":
+            hunk[1].append(text)
+            hunk[2].append(text)
+            hunk[3] += 1
+        elif tag == "-":
+            hunk[1].append(text)
+        elif tag == "+":
+            hunk[2].append(text)
+        else:
+            raise ValueError(f'invalid diff line "{line}"')
+    return [tuple(hunk) for hunk in hunks]
+
+
+def find_block(lines: list[str], block: list[str], start: int, expected: int | None) -> int | None:
+    """
+    Find where block occurs in lines at or after start, preferring the occurrence nearest to expected.
+    """
+    if not block:
+        # A pure insertion: trust the header, or append.
+        return min(max(expected, start), len(lines)) if expected is not None else len(lines)
+    if expected is not None and expected >= start and lines[expected:expected + len(block)] == block:
+        return expected
+    matches = [
+        position for position in range(start, len(lines) - len(block) + 1)
+        if lines[position] == block[0] and lines[position:position + len(block)] == block
+    ]
+    if not matches:
+        return None
+    if expected is None:
+        return matches[0]
+    return min(matches, key=lambda position: abs(position - expected))
+
+
+def count_lines(text: str) -> int:
+    return len(text.splitlines())
@@ -1,4 +1,8 @@
 import os
+from functions.path_index import get_path_index
+
+# Python files larger than this are truncated instead of outlined: parsing them would cost more than it saves.
+MAX_OUTLINE_CHARS = 4 * 1024 * 1024
 
 def get_file_content(working_directory: str, file_path: str) -> str:
     """
@@ -17,16 +21,73 @@ def get_file_content(working_directory: str, file_path: str) -> str:
             raise ValueError(f'Error: File not found or is not a regular file: "{file_path}" => "{fp_final}"')
 
         print(f"begin reading file: {fp_final}")
-        with open(fp_final, "r") as f:
-            print(f"contents:")
-            contents: str = f.read()
-            print(f"contents length: {len(contents)}")
-            return contents if len(contents) <= 10000 else contents[:10000] + '[...File "{file_path}" truncated at 10000 characters]'
+        print(f"contents:")
+        contents: str = read_file_text(fp_final, file_path)
+        print(f"contents length: {len(contents)}")
+        return contents
     except ValueError as e:
         raise ValueError(e)
     except Exception as e:
         raise Exception(f'Error: {e}')
 
+def read_file_text(fp_final: str, file_path: str) -> str:
+    """
+    Read the content returned by get_file_content. Files of up to 10000 characters are returned whole.
+    Larger Python files of up to MAX_OUTLINE_CHARS characters are returned as their outline, so the model can read
+    just the definitions it needs; other large files are cut at the last line break within 10000 characters.
+    Args:
+        fp_final: The resolved path to the file.
+        file_path: The path as requested, used in the truncation note.
+    Returns:
+        The content of the file, its outline, or its truncated content.
+    """
+    with open(fp_final, "r") as f:
+        # Only read what can be returned; one extra character tells whether the file was truncated.
+        contents: str = f.read(10001)
+        if len(contents) <= 10000:
+            return contents
+        if file_path.endswith(".py"):
+            # Imported here: get_file_outline depends on this module's path helpers.
+            from functions.get_file_outline import python_outline
+            rest = f.read(MAX_OUTLINE_CHARS - len(contents) + 1)
+            if len(contents) + len(rest) <= MAX_OUTLINE_CHARS:
+                try:
+                    return python_outline(contents + rest, file_path)
+                except ValueError:
+                    pass
+    return truncate_text(contents, 10000, file_path)
+
+def truncate_text(contents: str, max_chars: int, file_path: str, include_note: bool = False) -> str:
+    """
+    Cut content at the last line break within max_chars and note where the rest can be read from.
+    Args:
+        contents: The content to cut; content of up to max_chars characters is returned unchanged.
+        max_chars: The number of characters to keep at most.
+        file_path: The path as requested, used in the truncation note.
+        include_note: Count the truncation note against max_chars too, so the result never exceeds it.
+    Returns:
+        The kept content followed by the truncation note.
+    """
+    if len(contents) <= max_chars:
+        return contents
+    head = _cut_at_line_break(contents, max_chars)
+    note = _truncation_note(head, file_path)
+    if include_note and len(head) + len(note) > max_chars:
+        # The note of a shorter head is never longer.
+        head = _cut_at_line_break(contents, max(max_chars - len(note), 0))
+        note = _truncation_note(head, file_path)
+    return head + note
+
+def _cut_at_line_break(contents: str, max_chars: int) -> str:
+    head = contents[:max_chars]
+    if "\n" in head:
+        head = head[:head.rindex("\n") + 1]
+    return head
+
+def _truncation_note(head: str, file_path: str) -> str:
+    line_count = head.count("\n")
+    return f'[...File "{file_path}" truncated at {len(head)} characters ({line_count} lines); read the rest with read_file_range from line {line_count + 1}]'
+
 def is_sub_file(working_directory: str, file_path: str) -> bool:
     """
     Check if a file is a child of the working directory.
@@ -66,25 +127,10 @@ def get_file_relative_path(working_directory: str, file_path: str) -> str | None
     Returns:
         The relative path of the file.
     """
-    file_path_parts = file_path.split(os.sep)
-    for item in os.listdir(working_directory):
-        item_path = os.path.join(working_directory, item)
-        if item == file_path_parts[0]:
-            if len(file_path_parts) == 1:
-                return item_path
-            else:
-                search_results = get_file_relative_path(item_path, "/".join(file_path_parts[1:]))
-                if search_results:
-                    return search_results
-        else:
-            if os.path.isdir(item_path):
-                # print(f"begin searching in {item_path} for {file_path}")
-                search_results = get_file_relative_path(item_path, file_path)
-                if search_results:
-                    return search_results
-    return None
-            
-                
+    rel_path = get_path_index(working_directory).resolve(file_path)
+    if rel_path is None:
+        return None
+    return os.path.join(working_directory, rel_path)
 
 
 if __name__ == "__main__":
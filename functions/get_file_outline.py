@@ -0,0 +1,106 @@
+import ast
+import os
+from functions.get_file_content import is_sub_file, get_file_relative_path
+
+MAX_CHARS = 10000
+
+
+def get_file_outline(working_directory: str, file_path: str) -> str:
+    """
+    Get the outline of a Python file: its imports, classes, functions with their signatures and top-level names,
+    each with the line range it spans, so only the needed parts have to be read with read_file_range.
+    Args:
+        working_directory: The working directory.
+        file_path: The path to the Python file.
+    Returns:
+        A header line followed by one line per definition, nested definitions indented.
+    """
+    if not is_sub_file(working_directory, file_path):
+        raise ValueError(f'Error: Cannot read "{file_path}" as it is outside the permitted working directory')
+    fp_final = get_file_relative_path(working_directory, file_path)
+    if not fp_final or not os.path.isfile(fp_final):
+        raise ValueError(f'Error: File not found or is not a regular file: "{file_path}" => "{fp_final}"')
+
+    try:
+        with open(fp_final, "r") as f:
+            source = f.read()
+        return python_outline(source, file_path)
+    except ValueError as e:
+        raise ValueError(e)
+    except Exception as e:
+        raise Exception(f'Error: {e}')
+
+
+def python_outline(source: str, file_path: str) -> str:
+    """
+    Build the outline of Python source code.
+    Args:
+        source: The source code.
+        file_path: The path of the file, used in the header.
+    Returns:
+        The outline, at most MAX_CHARS characters.
+    """
+    try:
+        tree = ast.parse(source)
+    except SyntaxError as e:
+        raise ValueError(f'Error: Cannot outline "{file_path}" as it is not valid Python (line {e.lineno}: {e.msg})')
+    total_lines = source.count("\n") + (not source.endswith("\n"))
+    lines = [f'[Outline of "{file_path}" ({total_lines} lines, {len(source)} characters); read the line ranges you need with read_file_range]']
+    lines.extend(outline_nodes(tree.body, 0))
+
+    outline = ""
+    for number, line in enumerate(lines):
+        if len(outline) + len(line) + 1 > MAX_CHARS:
+            return outline + f"[...{len(lines) - number} more outline lines]"
+        outline += line + "\n"
+    return outline.rstrip("\n")
+
+
+def outline_nodes(nodes: list[ast.stmt], depth: int) -> list[str]:
+    """
+    Outline a list of statements: consecutive imports are grouped, classes are recursed into, and the bodies of
+    functions are not.
+    """
+    indent = "    " * depth
+    lines: list[str] = []
+    imports: list[ast.stmt] = []
+
+    def flush_imports():
+        if imports:
+            names = [alias.name for node in imports for alias in node.names]
+            lines.append(f"{indent}{line_range(imports[0], imports[-1])}: imports {', '.join(names)}")
+            imports.clear()
+
+    for node in nodes:
+        if isinstance(node, (ast.Import, ast.ImportFrom)):
+            imports.append(node)
+            continue
+        flush_imports()
+        if isinstance(node, ast.ClassDef):
+            bases = ", ".join(ast.unparse(base) for base in node.bases + node.keywords)
+            lines.append(f"{indent}{line_range(node)}: {decorators(node)}class {node.name}{f'({bases})' if bases else ''}")
+            lines.extend(outline_nodes(node.body, depth + 1))
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            prefix = "async def" if isinstance(node, ast.AsyncFunctionDef) else "def"
+            returns = f" -> {ast.unparse(node.returns)}" if node.returns else ""
+            lines.append(f"{indent}{line_range(node)}: {decorators(node)}{prefix} {node.name}({ast.unparse(node.args)}){returns}")
+        elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+            targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+            lines.append(f"{indent}{line_range(node)}: {', '.join(ast.unparse(target) for target in targets)} = ...")
+        elif isinstance(node, ast.If) and ast.unparse(node.test) == "__name__ == '__main__'":
+            lines.append(f"{indent}{line_range(node)}: if __name__ == '__main__'")
+    flush_imports()
+    return lines
+
+
+def line_range(first: ast.stmt, last: ast.stmt | None = None) -> str:
+    """
+    The "start-end" line range of a node (or of the nodes from first to last), including decorators.
+    """
+    start = min([first.lineno] + [decorator.lineno for decorator in getattr(first, "decorator_list", [])])
+    end = (last or first).end_lineno
+    return f"{start}" if start == end else f"{start}-{end}"
+
+
+def decorators(node: ast.stmt) -> str:
+    return "".join(f"@{ast.unparse(decorator)} " for decorator in node.decorator_list)
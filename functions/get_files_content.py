@@ -0,0 +1,83 @@
+import fnmatch
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functions.get_file_content import get_file_relative_path, is_sub_file, read_file_text, truncate_text
+from functions.path_index import get_path_index
+
+# The default number of characters returned by one call, shared by all of its files.
+MAX_TOTAL_CHARS = 40000
+# At most this many files are read by one call; the others are listed as omitted.
+MAX_FILES = 50
+READ_WORKERS = 8
+# A file that does not fit in the rest of the budget is only returned in part if this much of it fits.
+MIN_PARTIAL_CHARS = 1000
+
+
+def get_files_content(
+        working_directory: str,
+        file_paths: list[str] | None = None,
+        pattern: str | None = None,
+        max_chars: int = MAX_TOTAL_CHARS) -> dict:
+    """
+    Get the content of several files in one call, reading them concurrently.
+    Each file is read like get_file_content (large files are truncated, large Python files outlined), and the
+    files share a budget of max_chars characters: the file that crosses it is cut at a line break (or omitted when
+    little of it would fit), and the files after it are listed as omitted, to be read in another call.
+    Args:
+        working_directory: The working directory.
+        file_paths: The paths of the files to read.
+        pattern: A glob matched against the paths of every file of the working directory (e.g. "pkg/*.py") and
+            against their names (e.g. "*.md"); its matches are read after file_paths.
+        max_chars: The total number of characters returned, truncation notes included.
+    Returns:
+        {"files": [{"path", "content"}], "errors": [{"path", "error"}], "omitted": [paths], "total_chars": int}
+    """
+    if not file_paths and not pattern:
+        raise ValueError("Error: Provide file_paths, a pattern, or both.")
+    if isinstance(file_paths, str):
+        # One path given on its own rather than in a list.
+        file_paths = [file_paths]
+    paths = list(dict.fromkeys(file_paths or []))
+    if pattern:
+        matches = sorted(
+            rel_path for rel_path in get_path_index(working_directory).files()
+            if fnmatch.fnmatch(rel_path, pattern) or fnmatch.fnmatch(os.path.basename(rel_path), pattern)
+        )
+        paths.extend(rel_path for rel_path in matches if rel_path not in paths)
+    omitted = paths[MAX_FILES:]
+    paths = paths[:MAX_FILES]
+
+    with ThreadPoolExecutor(max_workers=min(READ_WORKERS, max(len(paths), 1))) as pool:
+        results = list(pool.map(lambda file_path: read_one(working_directory, file_path), paths))
+
+    files = []
+    errors = []
+    over_budget = []
+    total_chars = 0
+    for file_path, content, error in results:
+        if error is not None:
+            errors.append({"path": file_path, "error": error})
+            continue
+        remaining = max_chars - total_chars
+        if over_budget or (len(content) > remaining and remaining < MIN_PARTIAL_CHARS):
+            # Not worth a sliver of the file: it and the files after it are left for another call.
+            over_budget.append(file_path)
+            continue
+        content = truncate_text(content, remaining, file_path, include_note=True)
+        files.append({"path": file_path, "content": content})
+        total_chars += len(content)
+    omitted = over_budget + omitted
+    return {"files": files, "errors": errors, "omitted": omitted, "total_chars": total_chars}
+
+
+def read_one(working_directory: str, file_path: str) -> tuple[str, str | None, str | None]:
+    # (path, content, None) or (path, None, error message): one unreadable file does not fail the whole call.
+    if not is_sub_file(working_directory, file_path):
+        return file_path, None, f'Cannot read "{file_path}" as it is outside the permitted working directory'
+    fp_final = get_file_relative_path(working_directory, file_path)
+    if not fp_final or not os.path.isfile(fp_final):
+        return file_path, None, f'File not found or is not a regular file: "{file_path}"'
+    try:
+        return file_path, read_file_text(fp_final, file_path), None
+    except (OSError, UnicodeDecodeError) as e:
+        return file_path, None, str(e)
@@ -17,13 +17,11 @@ def get_files_info(working_directory: str, directory: str | None = None, print_r
         directory = working_directory + "/" + directory
     if not os.path.isdir(directory):
         raise ValueError(f'Error: "{directory}" is not a directory')
-    dir_info: str = ""
-    for item in os.listdir(directory):
-        item_path = os.path.join(directory, item)
-        dir_info += get_file_info(item_path) + "\n"
+    with os.scandir(directory) as entries:
+        dir_info: str = "\n".join(get_entry_info(entry) for entry in entries)
     if print_result:
-        print(dir_info[:-1] if len(dir_info) > 0 and dir_info[-1] == "\n" else dir_info)
-    return dir_info[:-1] if len(dir_info) > 0 and dir_info[-1] == "\n" else dir_info
+        print(dir_info)
+    return dir_info
 
 def is_sub_dir(working_directory: str, directory: str) -> bool:
     """
@@ -55,18 +53,16 @@ def is_sub_dir(working_directory: str, directory: str) -> bool:
             
     return False
 
-def get_file_info(item_path: str) -> str:
+def get_entry_info(entry: os.DirEntry, name: str | None = None) -> str:
     """
-    Get the information of a file.
+    Get the information of a directory entry, reusing the file type and stat data cached by os.scandir.
     Args:
-        item_path: The path to the file.
+        entry: The directory entry.
+        name: The name to display, defaults to the entry name.
     Returns:
-        A string with the information of the file.
+        A string with the information of the entry: its name, size in bytes and whether it is a directory.
     """
-    info: os.stat_result = os.stat(item_path)
-    file_size: str = f"file_size={info.st_size} bytes"
-    is_dir: bool = os.path.isdir(item_path)
-    return f"{item_path.split('/')[-1]}: {file_size}, is_dir={is_dir}"
+    return f"{name or entry.name}: file_size={entry.stat().st_size} bytes, is_dir={entry.is_dir()}"
     
 
 if __name__ == "__main__":
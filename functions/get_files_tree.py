@@ -0,0 +1,179 @@
+import fnmatch
+import os
+import re
+from functions.get_files_info import is_sub_dir, get_entry_info
+
+MAX_DEPTH = 10
+MAX_PAGE_SIZE = 500
+# Never listed, whatever the .gitignore files say.
+ALWAYS_IGNORED = {".git"}
+
+
+def get_files_tree(
+        working_directory: str,
+        directory: str | None = None,
+        max_depth: int = 2,
+        pattern: str | None = None,
+        page: int = 1,
+        page_size: int = 200) -> str:
+    """
+    List a directory tree, pruning paths ignored by .gitignore files.
+    Args:
+        working_directory: The working directory.
+        directory: The directory to list, relative to the working directory.
+        max_depth: How many levels to descend; 1 lists only the directory's own entries.
+        pattern: A glob filter (e.g. "*.py" or "pkg/*.py"); directories are still descended into but only matches are listed.
+        page: The page of results to return, starting at 1.
+        page_size: The number of entries per page.
+    Returns:
+        A header with the page and entry counts, then one "path: file_size=N bytes, is_dir=B" line per entry.
+    """
+    if directory is None:
+        directory = "."
+    if not is_sub_dir(working_directory, directory):
+        raise ValueError(f'Error: Cannot list "{directory}" as it is outside the permitted working directory')
+    root = os.path.normpath(os.path.join(working_directory, directory))
+    if not os.path.isdir(root):
+        raise ValueError(f'Error: "{directory}" is not a directory')
+    max_depth = max(1, min(int(max_depth), MAX_DEPTH))
+    page = max(1, int(page))
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+
+    # .gitignore files between the working directory and the listed directory apply too.
+    wd_final = os.path.normpath(os.path.abspath(working_directory))
+    root_final = os.path.abspath(root)
+    ignore_rules: list[GitIgnoreRule] = []
+    ancestor = root_final
+    while ancestor != wd_final:
+        ancestor = os.path.dirname(ancestor)
+        ignore_rules = load_gitignore(ancestor) + ignore_rules
+
+    lines: list[str] = []
+    walk(root_final, "", 1, max_depth, pattern, ignore_rules, lines)
+
+    total_pages = max(1, -(-len(lines) // page_size))
+    selected = lines[(page - 1) * page_size:page * page_size]
+    header = f'[{directory}: {len(lines)} entries, page {page} of {total_pages}, max_depth={max_depth}'
+    header += f", pattern={pattern}]" if pattern else "]"
+    return "\n".join([header] + selected)
+
+
+def walk(
+        abs_dir: str,
+        rel_dir: str,
+        depth: int,
+        max_depth: int,
+        pattern: str | None,
+        ignore_rules: list["GitIgnoreRule"],
+        lines: list[str]) -> None:
+    ignore_rules = ignore_rules + load_gitignore(abs_dir)
+    try:
+        with os.scandir(abs_dir) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+    except OSError:
+        return
+    for entry in entries:
+        if entry.name in ALWAYS_IGNORED:
+            continue
+        rel_path = os.path.join(rel_dir, entry.name) if rel_dir else entry.name
+        is_dir = entry.is_dir()
+        if is_ignored(entry.path, is_dir, ignore_rules):
+            continue
+        if pattern is None or fnmatch.fnmatch(entry.name, pattern) or fnmatch.fnmatch(rel_path, pattern):
+            lines.append(get_entry_info(entry, name=rel_path + ("/" if is_dir else "")))
+        if is_dir and depth < max_depth and not entry.is_symlink():
+            walk(entry.path, rel_path, depth + 1, max_depth, pattern, ignore_rules, lines)
+
+
+class GitIgnoreRule:
+    """
+    A single .gitignore pattern, matched against absolute paths below the directory of its .gitignore file.
+    Supports negation (!), directory-only patterns (trailing /), anchored patterns (a leading or inner /) and **.
+    """
+
+    def __init__(self, base_dir: str, line: str):
+        self.base_dir = base_dir
+        self.negated = line.startswith("!")
+        if self.negated:
+            line = line[1:]
+        self.anchored = line.startswith("/")
+        line = line.lstrip("/")
+        self.directory_only = line.endswith("/")
+        line = line.rstrip("/")
+        self.anchored = self.anchored or "/" in line
+        self.regex = re.compile(glob_to_regex(line))
+
+    def matches(self, abs_path: str, is_dir: bool) -> bool:
+        if self.directory_only and not is_dir:
+            return False
+        rel_path = os.path.relpath(abs_path, self.base_dir).replace(os.sep, "/")
+        if rel_path.startswith(".."):
+            return False
+        if self.anchored:
+            return self.regex.fullmatch(rel_path) is not None
+        return self.regex.fullmatch(rel_path.rsplit("/", 1)[-1]) is not None
+
+
+def glob_to_regex(pattern: str) -> str:
+    """
+    Translate a .gitignore glob to a regular expression: * and ? stay within a path segment, ** crosses segments.
+    """
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+        elif pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+        elif pattern[i] == "*":
+            regex += "[^/]*"
+            i += 1
+        elif pattern[i] == "?":
+            regex += "[^/]"
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(pattern[i])
+                i += 1
+            else:
+                regex += "[" + pattern[i + 1:end].replace("!", "^", 1) + "]"
+                i = end + 1
+        else:
+            regex += re.escape(pattern[i])
+            i += 1
+    return regex
+
+
+def load_gitignore(directory: str) -> list[GitIgnoreRule]:
+    """
+    Load the rules of directory/.gitignore, if it exists.
+    """
+    try:
+        with open(os.path.join(directory, ".gitignore"), "r") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+    rules = []
+    for line in lines:
+        line = line.rstrip()
+        if line and not line.startswith("#"):
+            rules.append(GitIgnoreRule(directory, line))
+    return rules
+
+
+def is_ignored(abs_path: str, is_dir: bool, rules: list[GitIgnoreRule]) -> bool:
+    """
+    Check a path against .gitignore rules; the last matching rule wins.
+    """
+    ignored = False
+    for rule in rules:
+        if rule.negated == ignored and rule.matches(abs_path, is_dir):
+            ignored = not rule.negated
+    return ignored
+
+
+if __name__ == "__main__":
+    print(get_files_tree(".", max_depth=3))
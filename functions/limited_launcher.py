@@ -0,0 +1,14 @@
+# Entry point of the scripts run with resource limits where there is no POSIX shell, see
+# resource_limits.limited_command.
+# Usage: python limited_launcher.py <limits JSON> <python arguments ...>
+# Applies ResourceLimits.to_dict() limits to the current process and replaces it with a Python interpreter started
+# with the remaining arguments. The limits survive the exec, and the script runs exactly like `python <arguments>`
+# in the same process, so its exit status and resource usage are the script's.
+import json
+import os
+import sys
+from resource_limits import apply_resource_limits
+
+if __name__ == "__main__":
+    apply_resource_limits(json.loads(sys.argv[1]))
+    os.execv(sys.executable, [sys.executable, *sys.argv[2:]])
@@ -0,0 +1,212 @@
+import os
+import threading
+
+# Directories that are never worth indexing; they are still reachable through exact lookups.
+IGNORED_DIRS = {".git", "__pycache__", ".agent_cache"}
+
+
+class PathIndex:
+    """
+    An in-memory index of every file and directory below a working directory.
+
+    The tree is walked once when the index is built. Afterwards lookups are answered from
+    dictionaries, and the index is kept valid by comparing the recorded mtime of every indexed
+    directory (a directory's mtime changes whenever an entry is added, removed or renamed) and
+    rescanning only the directories that changed.
+    """
+
+    def __init__(self, working_directory: str):
+        self.working_directory = working_directory
+        self.root = os.path.normpath(os.path.abspath(working_directory))
+        self._lock = threading.RLock()
+        self._paths: set[str] = set()
+        self._by_name: dict[str, set[str]] = {}
+        self._children: dict[str, set[str]] = {}
+        self._dir_mtimes: dict[str, int] = {}
+        self.build()
+
+    def build(self) -> None:
+        """
+        (Re)build the whole index by walking the working directory.
+        """
+        with self._lock:
+            self._paths.clear()
+            self._by_name.clear()
+            self._children.clear()
+            self._dir_mtimes.clear()
+            self._scan_dir("")
+
+    def resolve(self, file_path: str) -> str | None:
+        """
+        Resolve a path to the matching indexed path, relative to the working directory.
+        An exact match wins; otherwise the shallowest indexed path ending with file_path is used.
+        Args:
+            file_path: The path to resolve, relative to (or absolute inside) the working directory.
+        Returns:
+            The relative path of the match, or None if nothing matches.
+        """
+        rel_path = self._normalize(file_path)
+        if rel_path is None:
+            return None
+        if rel_path == "":
+            return "."
+        if os.path.lexists(os.path.join(self.root, rel_path)):
+            # An exact path always wins, including paths inside ignored or not yet rescanned directories.
+            return rel_path
+        with self._lock:
+            match = self._lookup(rel_path)
+            if match is not None and os.path.lexists(os.path.join(self.root, match)):
+                return match
+            # Miss or stale hit: bring the changed directories up to date and try again.
+            self.refresh()
+            return self._lookup(rel_path)
+
+    def add(self, file_path: str) -> None:
+        """
+        Record a path created outside of a rescan (e.g. by write_file).
+        Args:
+            file_path: The created path, relative to (or absolute inside) the working directory.
+        """
+        rel_path = self._normalize(file_path)
+        if not rel_path:
+            return
+        with self._lock:
+            parent = os.path.dirname(rel_path)
+            if parent not in self._dir_mtimes:
+                # The parent directory itself is new (or ignored); let a rescan pick it up.
+                return
+            if rel_path not in self._paths:
+                self._add_path(rel_path)
+                if os.path.isdir(os.path.join(self.root, rel_path)):
+                    self._scan_dir(rel_path)
+            # The parent's recorded mtime is left as it was: entries created there by anything else since the
+            # last scan are only found by the rescan that its changed mtime triggers.
+
+    def files(self) -> list[str]:
+        """
+        List every indexed file, relative to the working directory.
+        Returns:
+            The relative paths of all files outside ignored directories.
+        """
+        with self._lock:
+            return [
+                rel_path for rel_path in self._paths
+                if rel_path not in self._dir_mtimes and os.path.basename(rel_path) not in IGNORED_DIRS
+            ]
+
+    def refresh(self) -> None:
+        """
+        Rescan every indexed directory whose mtime changed since it was last scanned.
+        """
+        with self._lock:
+            for rel_dir, mtime in list(self._dir_mtimes.items()):
+                if rel_dir not in self._dir_mtimes:
+                    continue  # removed while refreshing a parent
+                try:
+                    current = os.stat(self._abs(rel_dir)).st_mtime_ns
+                except OSError:
+                    self._remove_path(rel_dir)
+                    continue
+                if current != mtime:
+                    self._scan_dir(rel_dir)
+
+    def _lookup(self, rel_path: str) -> str | None:
+        if rel_path in self._paths:
+            return rel_path
+        candidates = self._by_name.get(os.path.basename(rel_path))
+        if not candidates:
+            return None
+        suffix = os.sep + rel_path
+        matches = [candidate for candidate in candidates if candidate.endswith(suffix)]
+        if not matches:
+            return None
+        return min(matches, key=lambda match: (match.count(os.sep), match))
+
+    def _normalize(self, file_path: str) -> str | None:
+        if os.path.isabs(file_path):
+            abs_path = os.path.normpath(file_path)
+        else:
+            abs_path = os.path.normpath(os.path.join(self.root, file_path))
+        if abs_path == self.root:
+            return ""
+        if not abs_path.startswith(self.root + os.sep):
+            return None
+        return abs_path[len(self.root) + 1:]
+
+    def _abs(self, rel_path: str) -> str:
+        return os.path.join(self.root, rel_path) if rel_path else self.root
+
+    def _scan_dir(self, rel_dir: str) -> None:
+        abs_dir = self._abs(rel_dir)
+        try:
+            mtime = os.stat(abs_dir).st_mtime_ns
+            with os.scandir(abs_dir) as entries:
+                found = {entry.name: entry.is_dir() for entry in entries}
+        except OSError:
+            self._remove_path(rel_dir)
+            return
+        self._dir_mtimes[rel_dir] = mtime
+        previous = self._children.get(rel_dir, set())
+        for name in previous - found.keys():
+            self._remove_path(os.path.join(rel_dir, name))
+        for name, is_dir in found.items():
+            rel_path = os.path.join(rel_dir, name)
+            if name not in previous:
+                self._add_path(rel_path)
+            if is_dir and name not in IGNORED_DIRS and rel_path not in self._dir_mtimes:
+                self._scan_dir(rel_path)
+
+    def _add_path(self, rel_path: str) -> None:
+        self._paths.add(rel_path)
+        self._by_name.setdefault(os.path.basename(rel_path), set()).add(rel_path)
+        self._children.setdefault(os.path.dirname(rel_path), set()).add(os.path.basename(rel_path))
+
+    def _remove_path(self, rel_path: str) -> None:
+        for name in self._children.pop(rel_path, set()):
+            self._remove_path(os.path.join(rel_path, name))
+        self._dir_mtimes.pop(rel_path, None)
+        if not rel_path:
+            return
+        self._paths.discard(rel_path)
+        name = os.path.basename(rel_path)
+        same_name = self._by_name.get(name)
+        if same_name is not None:
+            same_name.discard(rel_path)
+            if not same_name:
+                del self._by_name[name]
+        siblings = self._children.get(os.path.dirname(rel_path))
+        if siblings is not None:
+            siblings.discard(name)
+
+
+_indexes: dict[str, PathIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_path_index(working_directory: str, create: bool = True) -> PathIndex | None:
+    """
+    Get the shared path index of a working directory, building it on first use.
+    Args:
+        working_directory: The working directory.
+        create: Whether to build the index if it does not exist yet.
+    Returns:
+        The shared PathIndex, or None if it does not exist and create is False.
+    """
+    root = os.path.normpath(os.path.abspath(working_directory))
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None and create:
+            index = PathIndex(working_directory)
+            _indexes[root] = index
+        return index
+
+
+def drop_path_index(working_directory: str) -> None:
+    """
+    Forget the shared path index of a working directory that is no longer used, freeing its memory.
+    Args:
+        working_directory: The working directory.
+    """
+    root = os.path.normpath(os.path.abspath(working_directory))
+    with _indexes_lock:
+        _indexes.pop(root, None)
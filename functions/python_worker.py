@@ -0,0 +1,44 @@
+# Entry point of a warm worker started by PythonWorkerPool.
+# Usage: python python_worker.py [module_to_preload ...]
+# The worker imports the preload modules, then waits for one JSON job line on stdin:
+# {"working_directory": ..., "file_path": ..., "limits": ...}, applies the resource limits and runs that file as
+# __main__ exactly like `python file_path` would.
+import importlib
+import json
+import os
+import runpy
+import sys
+import traceback
+from resource_limits import apply_resource_limits
+
+if __name__ == "__main__":
+    for module_name in sys.argv[1:]:
+        try:
+            importlib.import_module(module_name)
+        except ImportError:
+            pass
+
+    job_line = sys.stdin.readline()
+    if not job_line:
+        sys.exit(0)
+    job = json.loads(job_line)
+
+    apply_resource_limits(job.get("limits", {}))
+    # The script gets the modules it would get under `python file_path`, not the worker's own helper.
+    del sys.modules["resource_limits"], apply_resource_limits
+    os.chdir(job["working_directory"])
+    script = os.path.abspath(job["file_path"])
+    sys.argv = [job["file_path"]]
+    sys.path[0] = os.path.dirname(script)
+    del job, job_line
+    try:
+        runpy.run_path(script, run_name="__main__")
+    except SystemExit:
+        raise
+    except BaseException as e:
+        # Report the traceback from the script's first frame, like the interpreter would for `python script.py`.
+        tb = e.__traceback__
+        while tb is not None and tb.tb_frame.f_code.co_filename != script:
+            tb = tb.tb_next
+        traceback.print_exception(type(e), e, tb or e.__traceback__)
+        sys.exit(1)
@@ -0,0 +1,150 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+from functions.resource_limits import wait_for_exit
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_worker.py")
+
+
+class PythonWorkerPool:
+    """
+    A pool of pre-started, pre-warmed Python interpreters used by run_python_file instead of a cold `python` spawn.
+
+    Every worker has already paid the interpreter startup and imported the preload modules, and is blocked
+    waiting for a job on stdin. Each worker runs exactly one script and exits, so every run gets a fresh
+    process: an isolated namespace, clean sys.modules, its own exit code and output pipes, and a crash only
+    ever takes down that one run. A replacement worker is started as soon as a run finishes, which in the agent
+    loop overlaps with the next model round-trip.
+    """
+
+    def __init__(self, size: int = 2, preload: list[str] | None = None):
+        self.size = size
+        self.preload = list(preload or [])
+        self._idle: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        for _ in range(size):
+            self._start_worker()
+
+    def start(self, working_directory: str, file_path: str, limits: dict | None = None) -> subprocess.Popen:
+        """
+        Hand a Python file to a warm worker.
+        Args:
+            working_directory: The directory to run the script in.
+            file_path: The path to the script, relative to the working directory.
+            limits: ResourceLimits.to_dict() of the limits the worker applies before running the script.
+        Returns:
+            The worker process; read its stdout/stderr and wait for it like a Popen of `python file_path`.
+        """
+        if self._closed:
+            raise RuntimeError("Worker pool is closed")
+        process: subprocess.Popen = self._idle.get()
+        while process.poll() is not None:
+            # The worker died while idle (killed, or a preload module exited it): replace it and take the next one.
+            process.communicate()
+            self._start_worker()
+            if self._closed:
+                raise RuntimeError("Worker pool is closed")
+            process = self._idle.get()
+        # Warm the replacement once this run is over, so its startup does not compete with the run for CPU.
+        threading.Thread(target=self._replace_after, args=(process,), daemon=True).start()
+        job = {"working_directory": os.path.abspath(working_directory), "file_path": file_path, "limits": limits or {}}
+        process.stdin.write((json.dumps(job) + "\n").encode())
+        process.stdin.close()
+        # The job is the only input; from here on the worker behaves like a Popen without stdin.
+        process.stdin = None
+        return process
+
+    def run(
+            self,
+            working_directory: str,
+            file_path: str,
+            timeout: float = 30,
+            limits: dict | None = None) -> subprocess.CompletedProcess:
+        """
+        Run a Python file in a warm worker, like subprocess.run(["python", file_path], cwd=working_directory).
+        Args:
+            working_directory: The directory to run the script in.
+            file_path: The path to the script, relative to the working directory.
+            timeout: The number of seconds after which the worker is killed.
+            limits: ResourceLimits.to_dict() of the limits the worker applies before running the script.
+        Returns:
+            A CompletedProcess with the captured stdout, stderr and exit code.
+        """
+        args = ["python", file_path]
+        process = self.start(working_directory, file_path, limits=limits)
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise subprocess.TimeoutExpired(args, timeout)
+        return subprocess.CompletedProcess(
+            args,
+            process.returncode,
+            stdout.decode("utf-8", errors="replace"),
+            stderr.decode("utf-8", errors="replace"),
+        )
+
+    def close(self) -> None:
+        """
+        Stop every idle worker.
+        """
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                process = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            process.kill()
+            process.communicate()
+
+    def _replace_after(self, process: subprocess.Popen) -> None:
+        # Reaps the worker with its rusage for the caller of start(), see wait_for_exit.
+        wait_for_exit(process)
+        self._start_worker()
+
+    def _start_worker(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            process = subprocess.Popen(
+                [sys.executable, WORKER_SCRIPT, *self.preload],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+            self._idle.put(process)
+
+
+_worker_pool: PythonWorkerPool | None = None
+
+
+def start_worker_pool(size: int = 2, preload: list[str] | None = None) -> PythonWorkerPool:
+    """
+    Start the shared worker pool used by run_python_file.
+    Args:
+        size: The number of warm workers kept ready.
+        preload: Modules imported by the workers before they receive a script.
+    Returns:
+        The started pool.
+    """
+    global _worker_pool
+    stop_worker_pool()
+    _worker_pool = PythonWorkerPool(size=size, preload=preload)
+    return _worker_pool
+
+
+def get_worker_pool() -> PythonWorkerPool | None:
+    return _worker_pool
+
+
+def stop_worker_pool() -> None:
+    global _worker_pool
+    if _worker_pool is not None:
+        _worker_pool.close()
+        _worker_pool = None
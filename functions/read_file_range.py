@@ -0,0 +1,103 @@
+import os
+from itertools import islice
+from functions.get_file_content import is_sub_file, get_file_relative_path
+
+MAX_CHARS = 10000
+
+
+def read_file_range(
+        working_directory: str,
+        file_path: str,
+        offset: int | None = None,
+        length: int | None = None,
+        start_line: int | None = None,
+        end_line: int | None = None) -> str:
+    """
+    Read part of a file without loading the whole file.
+    Either a byte range (offset/length) or a line range (start_line/end_line, 1-based and inclusive) can be requested.
+    At most 10000 characters are returned.
+    Args:
+        working_directory: The working directory.
+        file_path: The path to the file.
+        offset: The byte offset to start reading at.
+        length: The number of bytes to read.
+        start_line: The first line to read.
+        end_line: The last line to read.
+    Returns:
+        A string with a header describing the range, followed by its content.
+    """
+    if not is_sub_file(working_directory, file_path):
+        raise ValueError(f'Error: Cannot read "{file_path}" as it is outside the permitted working directory')
+    fp_final = get_file_relative_path(working_directory, file_path)
+    if not fp_final or not os.path.isfile(fp_final):
+        raise ValueError(f'Error: File not found or is not a regular file: "{file_path}" => "{fp_final}"')
+
+    try:
+        if start_line is not None or end_line is not None:
+            return read_lines(fp_final, file_path, int(start_line or 1), None if end_line is None else int(end_line))
+        return read_bytes(fp_final, file_path, int(offset or 0), MAX_CHARS if length is None else int(length))
+    except ValueError as e:
+        raise ValueError(e)
+    except Exception as e:
+        raise Exception(f'Error: {e}')
+
+
+def read_bytes(fp_final: str, file_path: str, offset: int, length: int) -> str:
+    """
+    Read a byte range of a file.
+    Args:
+        fp_final: The resolved path of the file.
+        file_path: The path as given by the caller, used in messages.
+        offset: The byte offset to start reading at.
+        length: The number of bytes to read, capped at MAX_CHARS.
+    Returns:
+        A string with the range header and the decoded bytes.
+    """
+    if offset < 0 or length < 0:
+        raise ValueError(f'Error: offset and length must not be negative for "{file_path}"')
+    size = os.path.getsize(fp_final)
+    length = min(length, MAX_CHARS)
+    with open(fp_final, "rb") as f:
+        f.seek(offset)
+        data = f.read(length)
+    end = offset + len(data)
+    header = f'[Bytes {offset}-{end} of {size} in "{file_path}"'
+    header += f", next offset: {end}]" if end < size else "]"
+    return header + "\n" + data.decode("utf-8", errors="replace")
+
+
+def read_lines(fp_final: str, file_path: str, start_line: int, end_line: int | None) -> str:
+    """
+    Read a line range of a file, streaming through the lines before it.
+    Args:
+        fp_final: The resolved path of the file.
+        file_path: The path as given by the caller, used in messages.
+        start_line: The first line to read (1-based).
+        end_line: The last line to read (inclusive), or None to read until MAX_CHARS is reached.
+    Returns:
+        A string with the range header and the lines.
+    """
+    if start_line < 1 or (end_line is not None and end_line < start_line):
+        raise ValueError(f'Error: Invalid line range {start_line}-{end_line} for "{file_path}"')
+    lines: list[str] = []
+    characters = 0
+    last_line = start_line - 1
+    more = False
+    with open(fp_final, "r", errors="replace") as f:
+        for line in islice(f, start_line - 1, end_line):
+            if characters + len(line) > MAX_CHARS:
+                if not lines:
+                    lines.append(line[:MAX_CHARS])
+                    last_line += 1
+                more = True
+                break
+            lines.append(line)
+            characters += len(line)
+            last_line += 1
+        else:
+            more = end_line is not None and f.readline() != ""
+    if not lines:
+        return f'[No lines at {start_line}-{end_line} in "{file_path}"]'
+    header = f'[Lines {start_line}-{last_line} of "{file_path}"'
+    header += f", next line: {last_line + 1}]" if more else "]"
+    return header + "\n" + "".join(lines)
@@ -0,0 +1,168 @@
+# Resource limits applied to the scripts run by run_python_file, and the resources a finished run used.
+# Imported by python_worker.py too, so it only depends on the standard library.
+import functools
+import json
+import os
+import sys
+
+try:
+    import resource
+except ImportError:
+    # Windows: scripts run without limits and without resource accounting.
+    resource = None
+
+
+class ResourceLimits:
+    """
+    Per-run limits of a script, enforced with setrlimit in the process that runs it. None means unlimited.
+
+    cpu_seconds is CPU time, not wall time: the process gets SIGXCPU once it has used it, and SIGKILL a second
+    later. Linux does not enforce a limit on resident memory, so memory_bytes limits the address space
+    (RLIMIT_AS); allocations beyond it fail with MemoryError. processes is RLIMIT_NPROC, which counts every
+    process and thread of the user, not only the script's children; it does not apply to root.
+    """
+
+    def __init__(
+            self,
+            cpu_seconds: int | None = None,
+            memory_bytes: int | None = None,
+            open_files: int | None = None,
+            processes: int | None = None):
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.open_files = open_files
+        self.processes = processes
+
+    def to_dict(self) -> dict:
+        return {
+            "cpu_seconds": self.cpu_seconds,
+            "memory_bytes": self.memory_bytes,
+            "open_files": self.open_files,
+            "processes": self.processes,
+        }
+
+
+# Started in place of the interpreter where there is no POSIX shell; applies the limits and execs the interpreter.
+LAUNCHER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "limited_launcher.py")
+SHELL = "/bin/sh"
+# The ulimit option of each limit, and the unit its value is given in. RLIMIT_NPROC is -u in bash and -p in dash,
+# see _ulimit_process_option.
+ULIMIT_OPTIONS = {"RLIMIT_CPU": ("-t", 1), "RLIMIT_AS": ("-v", 1024), "RLIMIT_NOFILE": ("-n", 1)}
+
+
+def limited_command(command: list[str], limits: dict) -> list[str]:
+    """
+    Turn the command line of a Python interpreter into one that runs it under resource limits.
+    The limits are applied in the new process before the interpreter starts, rather than in a preexec_fn, which
+    is not safe to run between fork and exec while other threads are running: by `ulimit` in a shell that then
+    execs the interpreter, or, without a POSIX shell, by a Python launcher (which costs a second interpreter
+    startup). Either way the script keeps the pid, so its exit status and resource usage are its own.
+    Args:
+        command: The interpreter followed by its arguments, e.g. ["python", "script.py"].
+        limits: ResourceLimits.to_dict() of the limits to apply.
+    Returns:
+        The command to start instead; the command itself where setrlimit is not available.
+    """
+    if resource is None:
+        return command
+    if not os.path.exists(SHELL):
+        return [command[0], LAUNCHER_SCRIPT, json.dumps(limits), *command[1:]]
+    ulimits = []
+    for name, soft, hard in _effective_limits(limits):
+        option, unit = ULIMIT_OPTIONS.get(name) or (_ulimit_process_option(), 1)
+        # The soft limit first: it may have to drop below the new hard limit before that can be set.
+        ulimits.append(f"ulimit -S {option} {soft // unit} && ulimit -H {option} {hard // unit}")
+    # A limit that cannot be set stops the run instead of running the script without it.
+    script = " && ".join([*ulimits, 'exec "$0" "$@"'])
+    return [SHELL, "-c", script, *command]
+
+
+@functools.lru_cache(maxsize=None)
+def _ulimit_process_option() -> str:
+    # Imported here: python_worker.py imports this module and should not load subprocess.
+    import subprocess
+    return "-u" if subprocess.run([SHELL, "-c", "ulimit -u"], capture_output=True).returncode == 0 else "-p"
+
+
+def apply_resource_limits(limits: dict) -> None:
+    """
+    Lower the limits of the current process; called in the script's process before it runs.
+    Args:
+        limits: ResourceLimits.to_dict() of the limits to apply.
+    """
+    if resource is None:
+        return
+    for name, soft, hard in _effective_limits(limits):
+        resource.setrlimit(getattr(resource, name), (soft, hard))
+
+
+def _effective_limits(limits: dict) -> list[tuple[str, int, int]]:
+    # (RLIMIT_ name, soft, hard) of each limit to set. A child starts with the limits of its parent, so they can
+    # be worked out in either.
+    wanted = []
+    cpu_seconds = limits.get("cpu_seconds")
+    if cpu_seconds:
+        # SIGXCPU at the soft limit, SIGKILL a second later.
+        wanted.append(("RLIMIT_CPU", cpu_seconds, cpu_seconds + 1))
+    for name, key in (("RLIMIT_AS", "memory_bytes"), ("RLIMIT_NOFILE", "open_files"), ("RLIMIT_NPROC", "processes")):
+        if limits.get(key) and hasattr(resource, name):
+            wanted.append((name, limits[key], limits[key]))
+    effective = []
+    for name, soft, hard in wanted:
+        current_soft, current_hard = resource.getrlimit(getattr(resource, name))
+        # A limit can only be lowered: keep an existing, stricter one.
+        if current_hard != resource.RLIM_INFINITY:
+            hard = min(hard, current_hard)
+        soft = min(soft, hard)
+        if current_soft != resource.RLIM_INFINITY:
+            soft = min(soft, current_soft)
+        effective.append((name, soft, hard))
+    return effective
+
+
+class ResourceUsage:
+    def __init__(self, wall_seconds: float, user_seconds: float, system_seconds: float, max_rss_bytes: int):
+        self.wall_seconds = wall_seconds
+        self.user_seconds = user_seconds
+        self.system_seconds = system_seconds
+        self.max_rss_bytes = max_rss_bytes
+
+    @classmethod
+    def from_rusage(cls, wall_seconds: float, rusage) -> "ResourceUsage":
+        # ru_maxrss is in kilobytes on Linux and in bytes on macOS.
+        max_rss = rusage.ru_maxrss if sys.platform == "darwin" else rusage.ru_maxrss * 1024
+        return cls(wall_seconds, rusage.ru_utime, rusage.ru_stime, max_rss)
+
+    def describe(self) -> str:
+        return (
+            f"cpu {self.user_seconds + self.system_seconds:.2f}s (user {self.user_seconds:.2f}s, "
+            f"system {self.system_seconds:.2f}s), max RSS {self.max_rss_bytes / (1024 * 1024):.1f} MiB, "
+            f"wall {self.wall_seconds:.2f}s"
+        )
+
+
+def wait_for_exit(process):
+    """
+    Wait for a subprocess.Popen to exit and reap it with os.wait4 where available, keeping its rusage.
+    Several threads may wait for the same process: the first one reaps it and stores the rusage on the process,
+    the others get the stored rusage.
+    Args:
+        process: The process to wait for.
+    Returns:
+        The rusage of the process, or None where wait4 is not available.
+    """
+    # Popen.wait and Popen.poll (which process.kill() calls) take this CPython lock before reaping the process, so
+    # they neither reap it before wait4 does nor block on it; once it is released they see the returncode set here.
+    # Without it, reaping the process behind Popen's back is not safe: wait for it without the rusage.
+    waitpid_lock = getattr(process, "_waitpid_lock", None)
+    if not hasattr(os, "wait4") or waitpid_lock is None:
+        process.wait()
+        return None
+    with waitpid_lock:
+        if process.returncode is None:
+            try:
+                _, status, process.rusage = os.wait4(process.pid, 0)
+                process.returncode = os.waitstatus_to_exitcode(status)
+            except ChildProcessError:
+                process.returncode = 0
+    return getattr(process, "rusage", None)
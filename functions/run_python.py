@@ -1,5 +1,48 @@
 import os
+import subprocess
+import sys
+import threading
+import time
 from functions.get_file_content import is_sub_file
+from functions.path_index import get_path_index
+from functions.python_worker_pool import get_worker_pool
+from functions.resource_limits import ResourceLimits, ResourceUsage, limited_command, wait_for_exit
+
+# Bytes kept from the start and from the end of each output stream.
+KEEP_BYTES = 5000
+# A run is killed as soon as stdout and stderr together exceed this many bytes.
+max_output_bytes: int = 10 * 1024 * 1024
+# Whether output is echoed to the console while the script runs.
+stream_output: bool = False
+# Limits applied to every run, so a runaway script cannot take down the host or other agent runs.
+resource_limits: ResourceLimits = ResourceLimits(
+    cpu_seconds=30, memory_bytes=2 * 1024 * 1024 * 1024, open_files=1024, processes=4096
+)
+
+
+def configure_output_capture(max_bytes: int | None = None, stream: bool | None = None) -> None:
+    """
+    Configure how run_python_file captures script output.
+    Args:
+        max_bytes: Kill a run once its output exceeds this many bytes.
+        stream: Echo output to the console while the script runs.
+    """
+    global max_output_bytes, stream_output
+    if max_bytes is not None:
+        max_output_bytes = max_bytes
+    if stream is not None:
+        stream_output = stream
+
+
+def configure_resource_limits(limits: ResourceLimits) -> None:
+    """
+    Set the resource limits of the scripts run by run_python_file.
+    Args:
+        limits: The limits of each run.
+    """
+    global resource_limits
+    resource_limits = limits
+
 
 def run_python_file(working_directory: str, file_path: str) -> str:
     """
@@ -12,25 +55,181 @@ def run_python_file(working_directory: str, file_path: str) -> str:
     # print(f"abs_working_directory: {abs_working_directory}")
     if not is_sub_file(working_directory, file_path):
         raise ValueError(f'Error: Cannot execute "{file_path}" as it is outside the permitted working directory')
-    fp_final = os.path.normpath(os.path.join(working_directory, file_path))
-    if not os.path.exists(fp_final):
+    rel_path = get_path_index(working_directory).resolve(file_path)
+    if rel_path is None:
         raise ValueError(f'Error: File "{file_path}" not found.')
+    fp_final = os.path.join(working_directory, rel_path)
     if not os.path.isfile(fp_final):
         raise ValueError(f'Error: Item "{file_path}" is not a file.')
     if not file_path.endswith(".py"):
         raise ValueError(f'Error: "{file_path}" is not a Python file.')
-    
+
     try:
-        import subprocess
-        result = subprocess.run(["python", file_path], capture_output=True, text=True, timeout=30, cwd=working_directory)
+        worker_pool = get_worker_pool()
+        limits = resource_limits.to_dict()
+        if worker_pool is not None:
+            process = worker_pool.start(working_directory, rel_path, limits=limits)
+        else:
+            process = subprocess.Popen(
+                limited_command(["python", rel_path], limits),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                cwd=working_directory,
+            )
+        try:
+            result = capture_output(process, timeout=30, max_bytes=max_output_bytes, stream=stream_output)
+        except subprocess.TimeoutExpired:
+            raise subprocess.TimeoutExpired(["python", rel_path], 30)
         output: str = f'STDOUT: {result.stdout}\nSTDERR: {result.stderr}'
         if result.returncode != 0:
             output += f"\nProcess exited with code {result.returncode}"
         if result.stdout == "" or not result.stdout:
             output += "\nNo output produced."
+        if result.output_exceeded:
+            output += f"\nProcess killed: output exceeded {max_output_bytes} bytes"
+        if result.usage is not None:
+            cpu_seconds = result.usage.user_seconds + result.usage.system_seconds
+            # SIGXCPU at the soft limit, SIGKILL at the hard one; CPU time is accounted in ticks, so the usage may
+            # read just under the limit.
+            if result.returncode < 0 and limits["cpu_seconds"] and cpu_seconds >= limits["cpu_seconds"] - 0.1:
+                output += f"\nProcess killed: CPU time limit of {limits['cpu_seconds']} s exceeded"
+            output += f"\nResources: {result.usage.describe()}"
+        if limits["memory_bytes"] and "MemoryError" in result.stderr:
+            output += f"\nThe script ran out of memory (limit {limits['memory_bytes'] // (1024 * 1024)} MiB)"
         return output
     except Exception as e:
         raise Exception(f"Error: executing Python file: {e}")
-    
-    if __name__ == "__main__":
-        print(run_python_file(working_directory=".", file_path='tests.py'))
+
+
+class HeadTailBuffer:
+    """
+    Keeps the first head_size and the last tail_size bytes written to it, in bounded memory.
+    """
+
+    def __init__(self, head_size: int = KEEP_BYTES, tail_size: int = KEEP_BYTES):
+        self.head_size = head_size
+        self.tail_size = tail_size
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total = 0
+
+    def write(self, data: bytes) -> None:
+        self.total += len(data)
+        if len(self.head) < self.head_size:
+            taken = self.head_size - len(self.head)
+            self.head += data[:taken]
+            data = data[taken:]
+        if data:
+            self.tail += data
+            if len(self.tail) > 2 * self.tail_size:
+                del self.tail[:-self.tail_size]
+
+    def getvalue(self) -> str:
+        tail = self.tail[-self.tail_size:]
+        omitted = self.total - len(self.head) - len(tail)
+        if omitted <= 0:
+            return (self.head + tail).decode("utf-8", errors="replace")
+        return (
+            self.head.decode("utf-8", errors="replace")
+            + f"\n[... {omitted} bytes omitted ...]\n"
+            + tail.decode("utf-8", errors="replace")
+        )
+
+
+class CapturedOutput:
+    def __init__(
+            self,
+            returncode: int,
+            stdout: str,
+            stderr: str,
+            output_exceeded: bool,
+            usage: ResourceUsage | None = None):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.output_exceeded = output_exceeded
+        self.usage = usage
+
+
+def capture_output(process: subprocess.Popen, timeout: float, max_bytes: int, stream: bool = False) -> CapturedOutput:
+    """
+    Read a process's stdout and stderr incrementally into bounded buffers while it runs.
+    Args:
+        process: A process started with binary stdout and stderr pipes.
+        timeout: The number of seconds after which the process is killed.
+        max_bytes: Kill the process once stdout and stderr together exceed this many bytes.
+        stream: Echo the output to the console as it arrives.
+    Returns:
+        The exit code, the kept head and tail of each stream, whether the process was killed for its output size,
+        and the resources it used.
+    """
+    buffers = {"stdout": HeadTailBuffer(), "stderr": HeadTailBuffer()}
+    consoles = {"stdout": sys.stdout, "stderr": sys.stderr}
+    state = {"total": 0, "exceeded": False}
+    lock = threading.Lock()
+
+    def pump(name: str, pipe) -> None:
+        while True:
+            chunk = pipe.read1(65536)
+            if not chunk:
+                break
+            buffers[name].write(chunk)
+            if stream:
+                consoles[name].write(chunk.decode("utf-8", errors="replace"))
+                consoles[name].flush()
+            with lock:
+                state["total"] += len(chunk)
+                if state["total"] > max_bytes and not state["exceeded"]:
+                    state["exceeded"] = True
+                    process.kill()
+        pipe.close()
+
+    readers = [
+        threading.Thread(target=pump, args=("stdout", process.stdout), daemon=True),
+        threading.Thread(target=pump, args=("stderr", process.stderr), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+    try:
+        usage = wait_with_usage(process, timeout)
+    except subprocess.TimeoutExpired:
+        for reader in readers:
+            reader.join(timeout=5)
+        raise
+    # A child process the script started may still hold the pipes open; don't wait on it forever.
+    for reader in readers:
+        reader.join(timeout=5)
+    return CapturedOutput(
+        process.returncode, buffers["stdout"].getvalue(), buffers["stderr"].getvalue(), state["exceeded"], usage
+    )
+
+
+def wait_with_usage(process: subprocess.Popen, timeout: float) -> ResourceUsage | None:
+    """
+    Wait for a process like process.wait(timeout), killing it on timeout, and return the resources it used.
+    Args:
+        process: The process to wait for.
+        timeout: The number of seconds after which the process is killed and TimeoutExpired raised.
+    Returns:
+        The resources the process used, or None where os.wait4 is not available.
+    """
+    start = time.perf_counter()
+    finished = threading.Event()
+    result = {}
+
+    def reap() -> None:
+        rusage = wait_for_exit(process)
+        if rusage is not None:
+            result["usage"] = ResourceUsage.from_rusage(time.perf_counter() - start, rusage)
+        finished.set()
+
+    threading.Thread(target=reap, daemon=True).start()
+    if not finished.wait(timeout):
+        process.kill()
+        finished.wait()
+        raise subprocess.TimeoutExpired(process.args, timeout)
+    return result.get("usage")
+
+
+if __name__ == "__main__":
+    print(run_python_file(working_directory=".", file_path='tests.py'))
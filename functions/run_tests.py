@@ -0,0 +1,412 @@
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from functions import run_python
+from functions.get_file_content import is_sub_file
+from functions.path_index import get_path_index
+from functions.resource_limits import limited_command
+from functions.search_code import INDEX_DIR
+
+RESULTS_FILE = "test_results.json"
+RESULTS_VERSION = 1
+RUNNER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "unittest_runner.py")
+TIMEOUT_SECONDS = 30
+
+
+class TestImpactIndex:
+    """
+    Selects the unittest test cases of a test file that may be affected by changes since they last passed.
+
+    Every Python file of the working directory is parsed once for its imports (and again only when its mtime
+    or size changes, or write_file wrote it), which gives an import dependency map. A TestCase class depends on
+    the test file's module-level code, its own source and the workspace files reachable through the imports of
+    the names it uses, plus any workspace path it names in a string literal (e.g. a script it runs). A test is
+    skipped when it passed before and the sha256 of all of those is unchanged.
+
+    Passes are kept in <working_directory>/.agent_cache/test_results.json so they survive between runs.
+    Dependencies the sources do not show (files read through computed paths, environment variables) are not
+    tracked; run_all reruns everything.
+    """
+
+    def __init__(self, working_directory: str, results_path: str | None = None):
+        self.working_directory = working_directory
+        self.root = os.path.normpath(os.path.abspath(working_directory))
+        self.results_path = results_path or os.path.join(self.root, INDEX_DIR, RESULTS_FILE)
+        self._lock = threading.RLock()
+        self._files: dict[str, tuple[int, int, str, tuple]] = {}  # rel path -> (mtime_ns, size, sha256, imports)
+        self._passes: dict[str, dict[str, str]] = {}  # test file -> test id -> key of the sources it passed with
+        self._written: set[str] = set()
+        self._load()
+
+    def mark_written(self, file_path: str) -> None:
+        """
+        Record a file written by a tool, so it is hashed and parsed again and reported by the next run.
+        Args:
+            file_path: The written path, relative to the working directory.
+        """
+        rel_path = os.path.normpath(file_path)
+        with self._lock:
+            self._files.pop(rel_path, None)
+            self._written.add(rel_path)
+
+    def select(self, test_file: str, run_all: bool = False) -> tuple[list[str], list[str], dict[str, str]]:
+        """
+        Find the test cases of a test file and the ones that have to run.
+        Args:
+            test_file: The test file, relative to the working directory.
+            run_all: Select every test, even those that passed with the same sources.
+        Returns:
+            Every test id of the file, the ids to run, and the key of the sources of every test id.
+        """
+        with self._lock:
+            test_dir = os.path.dirname(test_file)
+            module = os.path.splitext(os.path.basename(test_file))[0]
+            source = self._read(test_file)
+            try:
+                tree = ast.parse(source)
+            except SyntaxError as e:
+                raise ValueError(f'Error: "{test_file}" is not valid Python: {e}')
+            classes = {node.name: node for node in tree.body if isinstance(node, ast.ClassDef)}
+            shared = [node for node in tree.body if not isinstance(node, ast.ClassDef)]
+            shared_source = source_segments(source, shared)
+            bindings = self._bindings(tree, test_file, test_dir)
+
+            test_ids = []
+            keys = {}
+            for name, node in classes.items():
+                methods = self._test_methods(node, classes)
+                if not methods:
+                    continue
+                # What every test of the class runs besides its own method: setUp, helpers, class attributes,
+                # class decorators and bases, including those of the test classes it derives from.
+                fixtures = []
+                for class_node in [node, *(classes[base] for base in self._local_bases(node, classes))]:
+                    fixtures.extend(class_node.decorator_list + class_node.bases)
+                    fixtures.extend(child for child in class_node.body if child not in methods.values())
+                # The test file's own code is keyed by source, per test, so editing one test does not select
+                # the others.
+                fixture_sources = source_segments(source, fixtures)
+                fixture_dependencies = self._dependencies(fixtures + shared, bindings, test_dir)
+                for method, method_node in methods.items():
+                    dependencies = fixture_dependencies | self._dependencies([method_node], bindings, test_dir)
+                    entries = {path: self._entry(path) for path in self._closure(dependencies, test_dir)}
+                    test_id = f"{module}.{name}.{method}"
+                    test_ids.append(test_id)
+                    keys[test_id] = hashlib.sha256(json.dumps([
+                        shared_source,
+                        fixture_sources,
+                        source_segments(source, [method_node]),
+                        sorted((path, entry[2]) for path, entry in entries.items() if entry is not None),
+                    ]).encode()).hexdigest()
+
+            passes = self._passes.get(test_file, {})
+            selected = [test_id for test_id in test_ids if run_all or passes.get(test_id) != keys[test_id]]
+            return test_ids, selected, keys
+
+    def record(self, test_file: str, keys: dict[str, str], passed: list[str], failed: list[str]) -> None:
+        """
+        Remember the tests that passed with the given source keys, forget those that failed, and save.
+        """
+        with self._lock:
+            passes = self._passes.setdefault(test_file, {})
+            for test_id in passed:
+                if test_id in keys:
+                    passes[test_id] = keys[test_id]
+            for test_id in failed:
+                passes.pop(test_id, None)
+            self._save()
+
+    def take_written(self) -> list[str]:
+        """
+        Get the files written since the last call, and start tracking anew.
+        """
+        with self._lock:
+            written = sorted(self._written)
+            self._written.clear()
+            return written
+
+    def _entry(self, rel_path: str) -> tuple[int, int, str, tuple] | None:
+        abs_path = os.path.join(self.root, rel_path)
+        try:
+            info = os.stat(abs_path)
+        except OSError:
+            self._files.pop(rel_path, None)
+            return None
+        entry = self._files.get(rel_path)
+        if entry is not None and entry[:2] == (info.st_mtime_ns, info.st_size):
+            return entry
+        with open(abs_path, "rb") as f:
+            data = f.read()
+        imports = ()
+        if rel_path.endswith(".py"):
+            try:
+                imports = tuple(imported_modules(ast.parse(data)))
+            except (SyntaxError, ValueError):
+                pass
+        entry = (info.st_mtime_ns, info.st_size, hashlib.sha256(data).hexdigest(), imports)
+        self._files[rel_path] = entry
+        return entry
+
+    def _read(self, rel_path: str) -> str:
+        with open(os.path.join(self.root, rel_path), "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _bindings(self, tree: ast.Module, test_file: str, test_dir: str) -> dict[str, set[str]]:
+        # The names the test file binds by importing, mapped to the workspace files they come from.
+        bindings: dict[str, set[str]] = {}
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    name = alias.asname or alias.name.split(".")[0]
+                    bindings.setdefault(name, set()).update(self._module_files(alias.name, 0, test_file, test_dir))
+            elif isinstance(node, ast.ImportFrom):
+                for alias in node.names:
+                    files = self._module_files(f"{node.module or ''}.{alias.name}".strip("."), node.level, test_file, test_dir)
+                    files = files or self._module_files(node.module or "", node.level, test_file, test_dir)
+                    bindings.setdefault(alias.asname or alias.name, set()).update(files)
+        return bindings
+
+    def _module_files(self, module: str, level: int, importer: str, test_dir: str) -> list[str]:
+        # The files of a module and of its parent packages, looked up like `python -m unittest` run from the
+        # test file's directory would: relative imports from the importer's package, others from test_dir.
+        if level:
+            base = os.path.dirname(importer)
+            for _ in range(level - 1):
+                base = os.path.dirname(base)
+        else:
+            base = test_dir
+        files = []
+        for part in [part for part in module.split(".") if part]:
+            base = os.path.join(base, part)
+            for candidate in (os.path.join(base, "__init__.py"), base + ".py"):
+                if os.path.isfile(os.path.join(self.root, candidate)):
+                    files.append(os.path.normpath(candidate))
+                    break
+            else:
+                # A directory without __init__.py is a namespace package.
+                if not os.path.isdir(os.path.join(self.root, base)):
+                    return []
+        return files
+
+    def _closure(self, rel_paths: set[str], test_dir: str) -> set[str]:
+        pending = list(rel_paths)
+        seen = set(rel_paths)
+        while pending:
+            rel_path = pending.pop()
+            entry = self._entry(rel_path)
+            if entry is None:
+                continue
+            for module, level, names in entry[3]:
+                files = self._module_files(module, level, rel_path, test_dir)
+                for name in names:
+                    files = files + self._module_files(f"{module}.{name}".strip("."), level, rel_path, test_dir)
+                for dependency in files:
+                    if dependency not in seen:
+                        seen.add(dependency)
+                        pending.append(dependency)
+        return seen
+
+    def _literal_paths(self, text: str, test_dir: str) -> list[str]:
+        # A string naming a workspace file or directory, e.g. the script or directory a test runs.
+        if not text or len(text) > 200 or "\n" in text or os.path.isabs(text) or text.strip(os.sep + ".") == "":
+            return []
+        rel_path = os.path.normpath(os.path.join(test_dir, text))
+        if rel_path.startswith(".."):
+            return []
+        abs_path = os.path.join(self.root, rel_path)
+        if os.path.isfile(abs_path):
+            return [rel_path]
+        if os.path.isdir(abs_path):
+            prefix = rel_path + os.sep
+            return [path for path in get_path_index(self.working_directory).files() if path.startswith(prefix)]
+        return []
+
+    def _test_methods(self, node: ast.ClassDef, classes: dict[str, ast.ClassDef]) -> dict[str, ast.AST]:
+        # The test methods of a TestCase class by name, including those it inherits from test classes of the file.
+        local_bases = self._local_bases(node, classes)
+        if not local_bases and not any(base_name(base).endswith("TestCase") for base in node.bases):
+            return {}
+        methods = {}
+        for class_node in [node, *(classes[base] for base in local_bases)]:
+            for child in class_node.body:
+                if isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)) and child.name.startswith("test"):
+                    methods.setdefault(child.name, child)
+        return methods
+
+    def _dependencies(self, nodes: list[ast.AST], bindings: dict[str, set[str]], test_dir: str) -> set[str]:
+        # The workspace files named by the imported names and the path literals used in the nodes.
+        dependencies = set()
+        for node in nodes:
+            for child in ast.walk(node):
+                if isinstance(child, ast.Name) and child.id in bindings:
+                    dependencies.update(bindings[child.id])
+                elif isinstance(child, ast.Constant) and isinstance(child.value, str):
+                    dependencies.update(self._literal_paths(child.value, test_dir))
+        return dependencies
+
+    def _local_bases(self, node: ast.ClassDef, classes: dict[str, ast.ClassDef]) -> list[str]:
+        bases = []
+        pending = [base_name(base) for base in node.bases]
+        while pending:
+            name = pending.pop()
+            if name in classes and name not in bases and name != node.name:
+                bases.append(name)
+                pending.extend(base_name(base) for base in classes[name].bases)
+        return bases
+
+    def _load(self) -> None:
+        try:
+            with open(self.results_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(data, dict) and data.get("version") == RESULTS_VERSION:
+            self._passes = data.get("passes", {})
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.results_path), exist_ok=True)
+        tmp_path = f"{self.results_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": RESULTS_VERSION, "passes": self._passes}, f)
+        os.replace(tmp_path, self.results_path)
+
+
+def imported_modules(tree: ast.Module) -> list[tuple[str, int, tuple[str, ...]]]:
+    """
+    List every import of a module, including imports inside functions.
+    Returns:
+        (module, level, imported names) tuples; the names are empty for `import module`.
+    """
+    modules = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules.extend((alias.name, 0, ()) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            modules.append((node.module or "", node.level, tuple(alias.name for alias in node.names)))
+    return modules
+
+
+def source_segments(source: str, nodes: list[ast.AST]) -> list[str]:
+    # The source of each node, with the decorators the node's own segment leaves out.
+    segments = []
+    for node in nodes:
+        segments.extend(ast.get_source_segment(source, decorator) or "" for decorator in getattr(node, "decorator_list", []))
+        segments.append(ast.get_source_segment(source, node) or "")
+    return segments
+
+
+def base_name(node: ast.expr) -> str:
+    # The last part of a base class expression: TestCase for unittest.TestCase.
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    return node.id if isinstance(node, ast.Name) else ""
+
+
+_indexes: dict[str, TestImpactIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_test_index(working_directory: str, create: bool = True) -> TestImpactIndex | None:
+    """
+    Get the shared test impact index of a working directory.
+    Args:
+        working_directory: The working directory.
+        create: Whether to create the index if it does not exist yet.
+    Returns:
+        The shared TestImpactIndex, or None if it does not exist and create is False.
+    """
+    root = os.path.normpath(os.path.abspath(working_directory))
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None and create:
+            index = TestImpactIndex(working_directory)
+            _indexes[root] = index
+        return index
+
+
+def drop_test_index(working_directory: str) -> None:
+    """
+    Forget the shared test impact index of a working directory that is no longer used, freeing its memory.
+    Args:
+        working_directory: The working directory.
+    """
+    root = os.path.normpath(os.path.abspath(working_directory))
+    with _indexes_lock:
+        _indexes.pop(root, None)
+
+
+def run_tests(working_directory: str, file_path: str = "tests.py", run_all: bool = False) -> str:
+    """
+    Run the unittest test cases of a test file that may be affected by changes since they last passed.
+    Args:
+        working_directory: The working directory.
+        file_path: The test file, relative to the working directory.
+        run_all: Run every test case, even those that passed with the same sources.
+    Returns:
+        Which tests ran and were skipped, the unittest output, the failed tests and the resources the run used.
+    """
+    if not is_sub_file(working_directory, file_path):
+        raise ValueError(f'Error: Cannot execute "{file_path}" as it is outside the permitted working directory')
+    rel_path = get_path_index(working_directory).resolve(file_path)
+    if rel_path is None:
+        raise ValueError(f'Error: File "{file_path}" not found.')
+    if not os.path.isfile(os.path.join(working_directory, rel_path)):
+        raise ValueError(f'Error: Item "{file_path}" is not a file.')
+    if not rel_path.endswith(".py"):
+        raise ValueError(f'Error: "{file_path}" is not a Python file.')
+
+    index = get_test_index(working_directory)
+    test_ids, selected, keys = index.select(rel_path, run_all)
+    written = index.take_written()
+    lines = []
+    if not test_ids:
+        return f'No unittest test cases found in "{rel_path}".'
+    skipped = len(test_ids) - len(selected)
+    lines.append(f'Ran {len(selected)} of {len(test_ids)} tests in "{rel_path}"; '
+                 f"{skipped} passed before with the same sources and were skipped.")
+    if written:
+        lines.append(f"Files written since the last run: {', '.join(written)}")
+    if not selected:
+        return "\n".join(lines)
+
+    limits = run_python.resource_limits.to_dict()
+    fd, results_path = tempfile.mkstemp(prefix="test_results.", suffix=".json")
+    os.close(fd)
+    try:
+        process = subprocess.Popen(
+            limited_command([sys.executable, RUNNER_SCRIPT, results_path, *selected], limits),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            cwd=os.path.join(working_directory, os.path.dirname(rel_path)),
+        )
+        try:
+            result = run_python.capture_output(
+                process, timeout=TIMEOUT_SECONDS, max_bytes=run_python.max_output_bytes, stream=run_python.stream_output
+            )
+        except subprocess.TimeoutExpired:
+            raise Exception(f"Error: running tests: timed out after {TIMEOUT_SECONDS} seconds")
+        try:
+            with open(results_path, "r") as f:
+                outcome = json.load(f)
+        except (OSError, ValueError):
+            outcome = {}
+    finally:
+        os.remove(results_path)
+
+    index.record(rel_path, keys, outcome.get("passed", []), outcome.get("failed", selected))
+    lines.append(f"STDOUT: {result.stdout}")
+    lines.append(f"STDERR: {result.stderr}")
+    if outcome.get("failed"):
+        lines.append(f"Failed: {', '.join(outcome['failed'])}")
+    if result.returncode != 0:
+        lines.append(f"Process exited with code {result.returncode}")
+    if result.output_exceeded:
+        lines.append(f"Process killed: output exceeded {run_python.max_output_bytes} bytes")
+    if result.usage is not None:
+        lines.append(f"Resources: {result.usage.describe()}")
+    return "\n".join(lines)
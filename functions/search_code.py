@@ -0,0 +1,295 @@
+import fnmatch
+import json
+import os
+import threading
+from functions.get_files_info import is_sub_dir
+from functions.path_index import get_path_index
+
+INDEX_DIR = ".agent_cache"
+INDEX_FILE = "search_index.json"
+INDEX_VERSION = 2
+# Larger files and binary files are not indexed.
+MAX_FILE_BYTES = 1024 * 1024
+MAX_RESULTS = 200
+
+
+class SearchIndex:
+    """
+    A persistent trigram index over the text files of a working directory.
+
+    Every file's lowercased content is split into trigrams, and each trigram maps to the ids of the files
+    containing it. A query is answered by intersecting the posting sets of its trigrams and only scanning
+    the candidate files, so the cost depends on the number of candidates rather than on the size of the tree.
+
+    The index is stored as JSON in <working_directory>/.agent_cache/search_index.json (never pickled: the
+    model can write to that directory, and loading a pickle runs code); anything that does not parse as an index
+    is ignored and rebuilt. Before every search, files whose mtime or size changed are re-indexed, whoever
+    changed them; write_file also re-indexes the file it wrote right away. Re-indexed and
+    removed files leave stale ids in the posting sets, which are filtered out at query time and dropped when
+    the index is compacted.
+    """
+
+    def __init__(self, working_directory: str, index_path: str | None = None):
+        self.working_directory = working_directory
+        self.root = os.path.normpath(os.path.abspath(working_directory))
+        self.index_path = index_path or os.path.join(self.root, INDEX_DIR, INDEX_FILE)
+        self._lock = threading.RLock()
+        self._files: dict[str, tuple[int, int, int]] = {}  # rel path -> (mtime_ns, size, file id)
+        self._paths_by_id: dict[int, str] = {}
+        self._postings: dict[str, set[int]] = {}
+        self._next_id = 0
+        self._dirty = False
+        self._load()
+        self.refresh()
+
+    def refresh(self) -> None:
+        """
+        Bring the index up to date with the working directory: index new and changed files, forget removed ones.
+        """
+        path_index = get_path_index(self.working_directory)
+        path_index.refresh()
+        current = set(path_index.files())
+        with self._lock:
+            for rel_path in list(self._files):
+                if rel_path not in current:
+                    self._forget(rel_path)
+            for rel_path in current:
+                self.update_file(rel_path)
+            self._compact_if_needed()
+
+    def update_file(self, rel_path: str) -> None:
+        """
+        (Re)index a file if its mtime or size changed since it was indexed.
+        Args:
+            rel_path: The path of the file, relative to the working directory.
+        """
+        abs_path = os.path.join(self.root, rel_path)
+        try:
+            info = os.stat(abs_path)
+        except OSError:
+            with self._lock:
+                self._forget(rel_path)
+            return
+        with self._lock:
+            indexed = self._files.get(rel_path)
+            if indexed is not None and indexed[:2] == (info.st_mtime_ns, info.st_size):
+                return
+            self._forget(rel_path)
+            text = read_text(abs_path, info.st_size)
+            if text is None:
+                return
+            file_id = self._next_id
+            self._next_id += 1
+            self._files[rel_path] = (info.st_mtime_ns, info.st_size, file_id)
+            self._paths_by_id[file_id] = rel_path
+            for trigram in trigrams(text.lower()):
+                self._postings.setdefault(trigram, set()).add(file_id)
+            self._dirty = True
+
+    def candidates(self, query: str) -> list[str]:
+        """
+        Get the files that may contain query (case-insensitively).
+        Args:
+            query: The literal text to search for.
+        Returns:
+            The relative paths of the candidate files, sorted.
+        """
+        with self._lock:
+            query_trigrams = trigrams(query.lower())
+            if not query_trigrams:
+                return sorted(self._files)
+            postings = sorted((self._postings.get(trigram, set()) for trigram in query_trigrams), key=len)
+            file_ids = set(postings[0])
+            for posting in postings[1:]:
+                file_ids &= posting
+                if not file_ids:
+                    break
+            return sorted(self._paths_by_id[file_id] for file_id in file_ids if file_id in self._paths_by_id)
+
+    def save(self) -> None:
+        """
+        Write the index to disk if it changed since it was loaded or last saved.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+            tmp_path = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "version": INDEX_VERSION,
+                    "files": self._files,
+                    "postings": {trigram: sorted(ids) for trigram, ids in self._postings.items()},
+                    "next_id": self._next_id,
+                }, f)
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_path, "r") as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or data.get("version") != INDEX_VERSION:
+                return
+            files = {
+                str(rel_path): (int(mtime_ns), int(size), int(file_id))
+                for rel_path, (mtime_ns, size, file_id) in data["files"].items()
+            }
+            postings = {str(trigram): {int(file_id) for file_id in ids} for trigram, ids in data["postings"].items()}
+            next_id = int(data["next_id"])
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            return
+        self._files = files
+        self._postings = postings
+        self._next_id = next_id
+        self._paths_by_id = {file_id: rel_path for rel_path, (_, _, file_id) in self._files.items()}
+
+    def _forget(self, rel_path: str) -> None:
+        indexed = self._files.pop(rel_path, None)
+        if indexed is not None:
+            self._paths_by_id.pop(indexed[2], None)
+            self._dirty = True
+
+    def _compact_if_needed(self) -> None:
+        # Drop stale ids from the posting sets once they outnumber the live files.
+        if self._next_id - len(self._files) <= max(len(self._files), 1000):
+            return
+        live_ids = set(self._paths_by_id)
+        for trigram in list(self._postings):
+            posting = self._postings[trigram] & live_ids
+            if posting:
+                self._postings[trigram] = posting
+            else:
+                del self._postings[trigram]
+        self._dirty = True
+
+
+def trigrams(text: str) -> set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def read_text(abs_path: str, size: int) -> str | None:
+    """
+    Read a file as text, or return None for files that are too large or binary.
+    """
+    if size > MAX_FILE_BYTES:
+        return None
+    try:
+        with open(abs_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if b"\0" in data[:8192]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+_indexes: dict[str, SearchIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_search_index(working_directory: str, create: bool = True) -> SearchIndex | None:
+    """
+    Get the shared search index of a working directory, loading or building it on first use.
+    Args:
+        working_directory: The working directory.
+        create: Whether to load or build the index if it is not in memory yet.
+    Returns:
+        The shared SearchIndex, or None if it is not in memory and create is False.
+    """
+    root = os.path.normpath(os.path.abspath(working_directory))
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None and create:
+            index = SearchIndex(working_directory)
+            _indexes[root] = index
+        return index
+
+
+def drop_search_index(working_directory: str) -> None:
+    """
+    Forget the shared search index of a working directory that is no longer used, freeing its memory.
+    Args:
+        working_directory: The working directory.
+    """
+    root = os.path.normpath(os.path.abspath(working_directory))
+    with _indexes_lock:
+        _indexes.pop(root, None)
+
+
+def search_code(
+        working_directory: str,
+        query: str,
+        path: str | None = None,
+        case_sensitive: bool = False,
+        context_lines: int = 2,
+        max_results: int = 50) -> str:
+    """
+    Search the text files of the working directory for a literal string.
+    Args:
+        working_directory: The working directory.
+        query: The text to search for.
+        path: Only search files below this directory, or matching this glob (e.g. "*.py" or "pkg/*.py").
+        case_sensitive: Whether the match is case-sensitive.
+        context_lines: The number of lines shown before and after each match.
+        max_results: The maximum number of matching lines returned.
+    Returns:
+        A header with the match counts, then grep-style "path:line: text" matches and "path-line- text" context.
+    """
+    if not query:
+        raise ValueError("Error: query must not be empty")
+    if path and not any(char in path for char in "*?[") and not is_sub_dir(working_directory, path):
+        raise ValueError(f'Error: Cannot search "{path}" as it is outside the permitted working directory')
+    context_lines = max(0, min(int(context_lines), 10))
+    max_results = max(1, min(int(max_results), MAX_RESULTS))
+
+    index = get_search_index(working_directory)
+    # Files changed by scripts or outside the agent are not reported to the index; a rescan only stats them.
+    index.refresh()
+    candidates = [rel_path for rel_path in index.candidates(query) if matches_path(rel_path, path)]
+
+    needle = query if case_sensitive else query.lower()
+    blocks: list[str] = []
+    match_count = 0
+    file_count = 0
+    for rel_path in candidates:
+        abs_path = os.path.join(index.root, rel_path)
+        try:
+            size = os.path.getsize(abs_path)
+        except OSError:
+            continue
+        text = read_text(abs_path, size)
+        if text is None:
+            continue
+        lines = text.splitlines()
+        hits = [i for i, line in enumerate(lines) if needle in (line if case_sensitive else line.lower())]
+        if not hits:
+            continue
+        file_count += 1
+        for i in hits:
+            match_count += 1
+            if match_count > max_results:
+                continue
+            block = []
+            for j in range(max(0, i - context_lines), min(len(lines), i + context_lines + 1)):
+                separator = ":" if j == i else "-"
+                block.append(f"{rel_path}{separator}{j + 1}{separator} {lines[j]}")
+            blocks.append("\n".join(block))
+    index.save()
+
+    header = f'[{match_count} matches for "{query}" in {file_count} files'
+    header += f", showing the first {max_results}]" if match_count > max_results else "]"
+    return "\n--\n".join([header] + blocks) if blocks else header
+
+
+def matches_path(rel_path: str, path: str | None) -> bool:
+    if not path or path in (".", "./"):
+        return True
+    if any(char in path for char in "*?["):
+        return fnmatch.fnmatch(rel_path, path) or fnmatch.fnmatch(os.path.basename(rel_path), path)
+    prefix = os.path.normpath(path)
+    return rel_path == prefix or rel_path.startswith(prefix + os.sep)
+
+
+if __name__ == "__main__":
+    print(search_code(".", "def main"))
@@ -0,0 +1,42 @@
+# Entry point of the test runs of run_tests.
+# Usage (from the directory of the test file): python unittest_runner.py <results.json> <test id> [<test id> ...]
+# Runs the given unittest test ids like `python -m unittest` would, printing the usual report to stderr, and writes
+# the ids of the tests that passed, failed or were skipped to results.json.
+import json
+import os
+import sys
+import unittest
+
+
+class RecordingResult(unittest.TextTestResult):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.passed = []
+
+    def addSuccess(self, test):
+        super().addSuccess(test)
+        self.passed.append(test.id())
+
+    def addExpectedFailure(self, test, err):
+        super().addExpectedFailure(test, err)
+        self.passed.append(test.id())
+
+
+if __name__ == "__main__":
+    results_path = sys.argv[1]
+    test_ids = sys.argv[2:]
+    # Import the tests from the current directory, not from the directory of this script.
+    sys.path[0] = os.getcwd()
+    sys.argv = [sys.argv[0]]
+    suite = unittest.defaultTestLoader.loadTestsFromNames(test_ids)
+    result = unittest.TextTestRunner(stream=sys.stderr, verbosity=1, resultclass=RecordingResult).run(suite)
+    failed = [test for test, _ in result.failures + result.errors] + result.unexpectedSuccesses
+    # A failed subTest is reported as its own object; record the test it belongs to.
+    failed = [getattr(test, "test_case", test) for test in failed]
+    with open(results_path, "w") as f:
+        json.dump({
+            "passed": result.passed,
+            "failed": sorted({test.id() for test in failed}),
+            "skipped": [test.id() for test, _ in result.skipped],
+        }, f)
+    sys.exit(0 if result.wasSuccessful() else 1)
@@ -1,5 +1,10 @@
 import os
+import secrets
+import stat
 from functions.get_file_content import is_sub_file
+from functions.path_index import get_path_index
+from functions.search_code import get_search_index
+from functions.run_tests import get_test_index
 
 def write_file(working_directory: str, file_path: str, content: str) -> None:
     """
@@ -17,8 +22,89 @@ def write_file(working_directory: str, file_path: str, content: str) -> None:
         raise ValueError(f'Error: Cannot write to "{file_path}" as it is a directory')
     
     try:
-        with open(fp_final, "w") as f:
-            f.write(content)
+        is_new_file = not os.path.exists(fp_final)
+        if not write_atomic(fp_final, content):
+            return f'No changes to "{file_path}" (content unchanged)'
+        notify_file_written(working_directory, file_path, is_new_file)
         return f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
     except Exception as e:
         raise Exception(f'Error: {e}')
+
+
+def write_atomic(fp_final: str, content: str) -> bool:
+    """
+    Write content to a file through a temporary file renamed over it, so a crash never leaves a torn file.
+    Content equal to the file's current content is not written at all.
+    Args:
+        fp_final: The path to the file.
+        content: The content to write.
+    Returns:
+        True if the file was written, False if it already had this content.
+    """
+    data = content.encode("utf-8")
+    # Replace the target of a symlink rather than the link itself, like a plain open(..., "w") would.
+    fp_final = os.path.realpath(fp_final)
+    try:
+        info = os.stat(fp_final)
+    except FileNotFoundError:
+        info = None
+    if info is not None and info.st_size == len(data):
+        with open(fp_final, "rb") as f:
+            if f.read() == data:
+                return False
+
+    directory, name = os.path.split(fp_final)
+    fd, tmp_path = create_temp_file(directory or ".", name)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # The temporary file gets the default mode of new files (0666 less the umask); keep the mode of the file
+        # being replaced.
+        if info is not None:
+            os.chmod(tmp_path, stat.S_IMODE(info.st_mode))
+        os.replace(tmp_path, fp_final)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
+
+
+def create_temp_file(directory: str, name: str) -> tuple[int, str]:
+    """
+    Create a new, uniquely named temporary file next to a file, like tempfile.mkstemp but with the mode a plain
+    open(..., "w") would give the file: 0666 less the process umask, applied by the OS.
+    Args:
+        directory: The directory of the file.
+        name: The name of the file.
+    Returns:
+        The open file descriptor and the path of the temporary file.
+    """
+    while True:
+        tmp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        try:
+            return os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666), tmp_path
+        except FileExistsError:
+            continue
+
+
+def notify_file_written(working_directory: str, file_path: str, is_new_file: bool) -> None:
+    """
+    Keep the in-memory indexes of the working directory up to date after a file was written.
+    Args:
+        working_directory: The working directory.
+        file_path: The path to the written file, relative to the working directory.
+        is_new_file: Whether the file was created by the write.
+    """
+    if is_new_file:
+        path_index = get_path_index(working_directory, create=False)
+        if path_index is not None:
+            path_index.add(file_path)
+    search_index = get_search_index(working_directory, create=False)
+    if search_index is not None:
+        search_index.update_file(os.path.normpath(file_path))
+    test_index = get_test_index(working_directory, create=False)
+    if test_index is not None:
+        test_index.mark_written(file_path)
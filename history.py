@@ -0,0 +1,199 @@
+from __future__ import annotations
+import json
+from lazy_imports import LazyModule
+from tool_executor import READ_ONLY_FUNCTIONS, WRITE_FUNCTIONS, get_written_paths
+
+# Prefix of every compacted payload, so compaction never processes its own output twice.
+COMPACTED_MARKER = "[compacted]"
+
+types = LazyModule("google.genai.types")
+
+
+class HistoryManager:
+    """
+    Keeps the conversation sent to the model within a token budget.
+
+    On every compaction:
+    - a read-only call repeated later with the same arguments keeps only its latest response,
+    - reads of a file that was written afterwards are replaced by a short note,
+    - write_file calls overwritten by a later write to the same path drop their content argument.
+    If the estimated size is still over the budget, tool responses older than the last keep_recent
+    iterations are collapsed into short summaries, oldest first, until the history fits.
+
+    Tokens are estimated as characters / 4; the exact count is only known after the model call
+    (usage_metadata.prompt_token_count).
+    """
+
+    def __init__(self, token_budget: int = 32000, keep_recent: int = 2, summary_chars: int = 200):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.summary_chars = summary_chars
+        self.tokens_saved = 0
+
+    def compact(self, messages: list[types.Content]) -> dict:
+        """
+        Compact the conversation in place.
+        Args:
+            messages: The conversation; contents are replaced, never removed, so function calls and responses stay paired.
+        Returns:
+            The estimated token counts before and after compaction.
+        """
+        tokens_before = estimate_tokens(messages)
+        calls = pair_function_calls(messages)
+
+        latest_read: dict[tuple[str, str], int] = {}
+        latest_write: dict[str, int] = {}
+        # Only writes of a whole file (write_file's content) supersede each other; edits do not.
+        latest_overwrite: dict[str, int] = {}
+        for position, call in enumerate(calls):
+            if call["name"] in READ_ONLY_FUNCTIONS:
+                latest_read[(call["name"], call["args_key"])] = position
+            elif call["name"] in WRITE_FUNCTIONS:
+                for path in get_written_paths(call["name"], call["args"]):
+                    latest_write[path] = position
+                if "content" in call["args"]:
+                    latest_overwrite[call["args"].get("file_path")] = position
+
+        for position, call in enumerate(calls):
+            if call["name"] in READ_ONLY_FUNCTIONS:
+                if latest_read[(call["name"], call["args_key"])] != position:
+                    self._replace_response(messages, call, "repeated later in the conversation, see the latest response")
+                elif any(latest_write.get(path, -1) > position for path in read_paths(call)):
+                    self._replace_response(messages, call, "outdated, the file was written afterwards")
+            elif "content" in call["args"] and latest_overwrite.get(call["args"].get("file_path")) not in (None, position):
+                self._replace_call_content(messages, call)
+
+        tokens = estimate_tokens(messages)
+        if tokens > self.token_budget:
+            recent_start = self._recent_start(messages)
+            for call in calls:
+                if tokens <= self.token_budget:
+                    break
+                if call["response_index"] >= recent_start:
+                    break
+                tokens -= self._summarize_response(messages, call)
+
+        tokens_after = estimate_tokens(messages)
+        self.tokens_saved += tokens_before - tokens_after
+        return {"tokens_before": tokens_before, "tokens_after": tokens_after}
+
+    def _recent_start(self, messages: list[types.Content]) -> int:
+        model_turns = [index for index, content in enumerate(messages) if content.role == "model"]
+        if len(model_turns) <= self.keep_recent:
+            return 0
+        return model_turns[-self.keep_recent] if self.keep_recent > 0 else len(messages)
+
+    def _replace_response(self, messages: list[types.Content], call: dict, reason: str) -> None:
+        response = call["response"]
+        if response is None or is_compacted(response):
+            return
+        self._set_response(messages, call, {"result": f"{COMPACTED_MARKER} Response removed: {reason}."})
+
+    def _summarize_response(self, messages: list[types.Content], call: dict) -> int:
+        response = call["response"]
+        if response is None or is_compacted(response):
+            return 0
+        text = json.dumps(response, default=str)
+        if len(text) <= self.summary_chars:
+            return 0
+        summary = f"{COMPACTED_MARKER} {text[:self.summary_chars]}... [{len(text) - self.summary_chars} characters omitted]"
+        self._set_response(messages, call, {"result": summary})
+        return (len(text) - len(summary)) // 4
+
+    def _set_response(self, messages: list[types.Content], call: dict, response: dict) -> None:
+        content = messages[call["response_index"]]
+        parts = list(content.parts)
+        parts[call["response_part"]] = types.Part.from_function_response(name=call["name"], response=response)
+        messages[call["response_index"]] = types.Content(role=content.role, parts=parts)
+        call["response"] = response
+
+    def _replace_call_content(self, messages: list[types.Content], call: dict) -> None:
+        args = dict(call["args"])
+        if is_compacted(args.get("content")):
+            return
+        args["content"] = f"{COMPACTED_MARKER} Content omitted: superseded by a later write to this file."
+        content = messages[call["call_index"]]
+        parts = list(content.parts)
+        parts[call["call_part"]] = types.Part.from_function_call(name=call["name"], args=args)
+        messages[call["call_index"]] = types.Content(role=content.role, parts=parts)
+        call["args"] = args
+
+
+def pair_function_calls(messages: list[types.Content]) -> list[dict]:
+    """
+    Pair every function call in the conversation with the function response that answered it.
+    The agent loop appends the responses of a model turn right after it, in call order.
+    Args:
+        messages: The conversation.
+    Returns:
+        One dict per function call with its name, args, response and where both live in messages.
+    """
+    calls: list[dict] = []
+    pending: list[dict] = []
+    for index, content in enumerate(messages):
+        for part_index, part in enumerate(content.parts or []):
+            if part.function_call:
+                args = dict(part.function_call.args or {})
+                call = {
+                    "name": part.function_call.name,
+                    "args": args,
+                    "args_key": json.dumps(args, sort_keys=True, default=str),
+                    "call_index": index,
+                    "call_part": part_index,
+                    "response_index": None,
+                    "response_part": None,
+                    "response": None,
+                }
+                calls.append(call)
+                pending.append(call)
+            elif part.function_response:
+                for call in pending:
+                    if call["name"] == part.function_response.name:
+                        call["response_index"] = index
+                        call["response_part"] = part_index
+                        call["response"] = part.function_response.response
+                        pending.remove(call)
+                        break
+    return [call for call in calls if call["response_index"] is not None]
+
+
+def read_paths(call: dict) -> list[str]:
+    """
+    Get the paths of the files a read-only call returned.
+    Args:
+        call: A call from pair_function_calls.
+    Returns:
+        The file paths as given in the arguments, or as listed in the response of a get_files_content call.
+    """
+    if call["name"] != "get_files_content":
+        return [call["args"].get("file_path")]
+    result = (call["response"] or {}).get("result")
+    if isinstance(result, dict):
+        return [file.get("path") for file in result.get("files") or []]
+    return list(call["args"].get("file_paths") or [])
+
+
+def estimate_tokens(messages: list[types.Content]) -> int:
+    """
+    Estimate the number of prompt tokens of a conversation (about 4 characters per token).
+    Args:
+        messages: The conversation.
+    Returns:
+        The estimated token count.
+    """
+    characters = 0
+    for content in messages:
+        for part in content.parts or []:
+            if part.text:
+                characters += len(part.text)
+            if part.function_call:
+                characters += len(part.function_call.name or "") + len(json.dumps(part.function_call.args or {}, default=str))
+            if part.function_response:
+                characters += len(part.function_response.name or "") + len(json.dumps(part.function_response.response or {}, default=str))
+    return characters // 4
+
+
+def is_compacted(value) -> bool:
+    if isinstance(value, dict):
+        value = value.get("result")
+    return isinstance(value, str) and value.startswith(COMPACTED_MARKER)
@@ -0,0 +1,24 @@
+import importlib
+
+
+class LazyModule:
+    """
+    A stand-in for a module that is only imported when one of its attributes is first used.
+
+    Importing google.genai costs most of a second, and main.py, the tool modules and the tests only need it once a
+    model call actually happens. Modules that use it in annotations only must also use
+    `from __future__ import annotations`, so that defining a function does not import it.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attribute: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attribute)
+
+    def __repr__(self) -> str:
+        state = "imported" if self._module is not None else "not imported yet"
+        return f"<lazy module {self._name!r} ({state})>"
@@ -1,21 +1,36 @@
+from __future__ import annotations
+import functools
 import os
 import re
 import json
-from dotenv import load_dotenv
-from google import genai
-from google.genai import types
 import sys
-from function_declaration import schema_run_python_file, schema_get_files_info, schema_write_file, schema_get_file_content
-from functions.run_python import run_python_file
+from lazy_imports import LazyModule
+from functions.run_python import run_python_file, configure_output_capture, configure_resource_limits
 from functions.get_files_info import get_files_info
 from functions.get_file_content import get_file_content
+from functions.get_files_content import get_files_content
 from functions.write_file import write_file
+from functions.edit_files import edit_files
+from functions.read_file_range import read_file_range
+from functions.get_file_outline import get_file_outline
+from functions.get_files_tree import get_files_tree
+from functions.search_code import search_code
+from functions.run_tests import run_tests
+from functions.python_worker_pool import start_worker_pool, stop_worker_pool
+from functions.resource_limits import ResourceLimits
+from tool_executor import ToolExecutor, READ_ONLY_FUNCTIONS, WRITE_FUNCTIONS, get_written_paths
+from tool_cache import ToolCache
+from prefetch import Prefetcher
+from history import HistoryManager, estimate_tokens
+from tracing import Tracer, append_message, record_usage
+from model_backend import GeminiBackend, RecordingBackend, ReplayBackend
 
-load_dotenv(dotenv_path="secrets/secrets.env")
-api_key = os.environ.get("GEMINI_API_KEY")
-# print(f"api_key: {api_key}")
+# The SDK is imported on first use: paths that never call the model (--help, tests, replays) skip its import cost.
+genai = LazyModule("google.genai")
+types = LazyModule("google.genai.types")
 
-client = genai.Client(api_key=api_key)
+# Created on first use, so replayed runs and tests work without an API key.
+client: genai.Client | None = None
 
 system_prompt = """
 You are a helpful AI coding agent.
@@ -23,30 +38,140 @@ You are a helpful AI coding agent.
 When a user asks a question or makes a request, make a function call plan. You can perform the following operations:
 
 - List files and directories
+- List a directory tree recursively
 - Read file contents
+- Read several files at once, by path list or glob
+- Read a byte or line range of a large file
+- Outline the classes and functions of a Python file, with their line ranges
+- Search the code for a string
 - Execute Python files with optional arguments
+- Run the unittest tests of a test file, skipping tests that already passed with the same sources
 - Write or overwrite files
+- Edit files with search/replace edits or unified diff hunks, several files per call
+
+Prefer edit_files over write_file to change part of an existing file: only the changed text has to be sent.
+For large Python files, get the outline first and read only the line ranges you need.
+To read several files, use one get_files_content call instead of one get_file_content call per file.
 
 All paths you provide should be relative to the working directory. You do not need to specify the working directory in your function calls as it is automatically injected for security reasons.
 """
 
+gemini_model: str = "gemini-2.0-flash-001"
 
-def get_llm_response(
-        prompt: str, 
-        is_verbose: bool = False, 
-        system_prompt: str = system_prompt, 
-        agent_mode: bool = False,
-        messages: list[types.Content] = None) -> types.GenerateContentResponse | dict | str:
-    gemini_model: str = "gemini-2.0-flash-001"
+usage = """usage: python main.py "<prompt>" [options]
+
+  --verbose               print function calls, tool responses, token counts and a trace summary
+  --agent                 keep calling the model until it answers without a function call
+  --iter-limit=N          maximum number of agent iterations (default 20)
+  --async                 with --agent, run the loop on the streaming async client
+  --max-workers=N         threads running the function calls of one model turn (default 4)
+  --history-budget=N      estimated token budget of the history (default 32000)
+  --no-compaction         always send the full history
+  --cache-dir=PATH        also keep read-only tool results on disk
+  --cache-hash            add a sha256 of the file content to the cache key
+  --no-cache              disable the tool result cache
+  --warm-workers=N        run Python files in N pre-started interpreters
+  --preload=mod1,mod2     modules the warm workers import up front
+  --max-output-bytes=N    kill a script once its output exceeds N bytes (default 10 MiB)
+  --max-cpu-seconds=N     CPU time limit of a script (default 30)
+  --max-memory-mb=N       address space limit of a script in MiB (default 2048)
+  --max-open-files=N      open file limit of a script (default 1024)
+  --max-processes=N       process limit of the user running a script, threads included (default 4096)
+  --no-prefetch           do not read likely next files in the background (agent mode)
+  --prefetch-bytes=N      memory bound of prefetched files (default 2 MiB)
+  --record=PATH           record the model responses to a JSONL file
+  --replay=PATH           answer model requests from a recording, offline
+  --trace=PATH            export a trace (.jsonl, or a Chrome trace otherwise)
+  -h, --help              show this message"""
+
+# Where get_llm_response sends requests; None means the Gemini API through the shared client.
+model_backend: GeminiBackend | RecordingBackend | ReplayBackend | None = None
+
+# Cache of read-only tool results shared by every call_function dispatch; None disables caching.
+tool_cache: ToolCache | None = ToolCache()
+
+# Reads the files of the latest listing in the background while the model is thinking; None disables prefetching.
+prefetcher: Prefetcher | None = None
+
+# Spans of every model call, tool execution and history append, summarized by --verbose and exported by --trace.
+tracer: Tracer = Tracer()
+
+
+def get_client() -> genai.Client:
+    """
+    Get the shared genai client, creating it on first use.
+    """
+    global client
+    if client is None:
+        from dotenv import load_dotenv
+        load_dotenv(dotenv_path="secrets/secrets.env")
+        client = genai.Client(api_key=os.environ.get("GEMINI_API_KEY"))
+    return client
+
+
+def get_model_backend() -> GeminiBackend | RecordingBackend | ReplayBackend:
+    """
+    Get the backend model requests are sent to, defaulting to the Gemini API.
+    """
+    global model_backend
+    if model_backend is None:
+        model_backend = GeminiBackend(get_client())
+    return model_backend
+
+
+@functools.lru_cache(maxsize=8)
+def get_generate_content_config(system_prompt: str = system_prompt) -> types.GenerateContentConfig:
+    """
+    Build the generation config shared by every model call: the system prompt and the available tools.
+    The tool schemas are built on first use and the config is reused by every later call.
+    Args:
+        system_prompt: The system instruction.
+    Returns:
+        The GenerateContentConfig.
+    """
+    from function_declaration import (
+        schema_run_python_file,
+        schema_get_files_info,
+        schema_get_file_content,
+        schema_get_files_content,
+        schema_write_file,
+        schema_read_file_range,
+        schema_get_file_outline,
+        schema_get_files_tree,
+        schema_search_code,
+        schema_edit_files,
+        schema_run_tests,
+    )
     available_functions: types.Tool = types.Tool(
         function_declarations=[
             schema_run_python_file,
             schema_get_files_info,
             schema_get_file_content,
+            schema_get_files_content,
             schema_write_file,
+            schema_read_file_range,
+            schema_get_file_outline,
+            schema_get_files_tree,
+            schema_search_code,
+            schema_edit_files,
+            schema_run_tests,
         ]
     )
+    return types.GenerateContentConfig(
+        system_instruction=system_prompt,
+        tools=[
+            available_functions
+        ]
+        )
+
 
+def get_llm_response(
+        prompt: str, 
+        is_verbose: bool = False, 
+        system_prompt: str = system_prompt, 
+        agent_mode: bool = False,
+        messages: list[types.Content] = None,
+        tool_executor: ToolExecutor | None = None) -> types.GenerateContentResponse | dict | str:
     api_contents = messages
     if not api_contents:
         if prompt:
@@ -54,26 +179,27 @@ def get_llm_response(
         else:
             raise ValueError("Either messages or a prompt must be provided to get_llm_response.")
 
-    response: types.GenerateContentResponse = client.models.generate_content(
-        model=gemini_model, 
-        contents=api_contents, 
-        config=types.GenerateContentConfig(
-            system_instruction=system_prompt,
-            tools=[
-                available_functions
-            ]
-            ),
-        
-        )
+    with tracer.span(
+            "generate_content",
+            "model",
+            messages=len(api_contents),
+            history_tokens=estimate_tokens(api_contents)) as span_attributes:
+        response: types.GenerateContentResponse = get_model_backend().generate_content(
+            model=gemini_model, 
+            contents=api_contents, 
+            config=get_generate_content_config(system_prompt),
+            )
+        record_usage(span_attributes, response)
     
     if agent_mode:
         return response
 
     executed_function_call_results_for_obj = []
     if response.function_calls: 
-        for fc_to_execute in response.function_calls:
-            tool_response_content: types.Content = call_function(fc_to_execute, verbose=is_verbose) 
-            
+        if tool_executor is None:
+            tool_executor = ToolExecutor(call_function)
+        tool_response_contents: list[types.Content] = tool_executor.run(response.function_calls, verbose=is_verbose)
+        for fc_to_execute, tool_response_content in zip(response.function_calls, tool_response_contents):
             actual_response_data = None
             if tool_response_content.parts and tool_response_content.parts[0].function_response:
                 actual_response_data = tool_response_content.parts[0].function_response.response
@@ -96,13 +222,34 @@ def get_llm_response(
             "Prompt tokens": response.usage_metadata.prompt_token_count,
             "Response tokens": response.usage_metadata.candidates_token_count,
             "Function Calls Made by Model": list(map(lambda x: {"name": x.name, "args": dict(x.args)}, response.function_calls)),
-            "Executed Function Call Results": executed_function_call_results_for_obj
+            "Executed Function Call Results": executed_function_call_results_for_obj,
+            "Tool Cache Stats": tool_cache.stats() if tool_cache is not None else None,
         }
     else:
         print(response.text)
         return response.text
     
-def call_function(function_call_part: types.FunctionCall, verbose=False):
+def call_function(
+        function_call_part: types.FunctionCall,
+        verbose=False,
+        working_directory: str = ".",
+        cache: ToolCache | None = None,
+        call_tracer: Tracer | None = None):
+    """
+    Execute a function call requested by the model.
+    Args:
+        function_call_part: The FunctionCall part.
+        verbose: Whether to print the call arguments.
+        working_directory: The directory the tools operate in.
+        cache: The tool cache to use; defaults to the module-level tool_cache.
+        call_tracer: The tracer recording the call; defaults to the module-level tracer.
+    Returns:
+        The tool response content.
+    """
+    if cache is None:
+        cache = tool_cache
+    if call_tracer is None:
+        call_tracer = tracer
     function_name = function_call_part.name
     function_args = dict(function_call_part.args)
     if verbose:
@@ -113,10 +260,40 @@ def call_function(function_call_part: types.FunctionCall, verbose=False):
         "run_python_file": run_python_file,
         "get_files_info": get_files_info,
         "get_file_content": get_file_content,
-        "write_file": write_file
+        "get_files_content": get_files_content,
+        "write_file": write_file,
+        "edit_files": edit_files,
+        "read_file_range": read_file_range,
+        "get_file_outline": get_file_outline,
+        "get_files_tree": get_files_tree,
+        "search_code": search_code,
+        "run_tests": run_tests,
     }
     if function_name in function_map:
-        result = function_map[function_name](working_directory=".", **function_args)
+        def run_tool():
+            if prefetcher is not None and function_name == "get_file_content" and function_args.get("file_path"):
+                prefetched = prefetcher.get(working_directory, function_args["file_path"])
+                if prefetched is not None:
+                    span_attributes["prefetched"] = True
+                    return prefetched
+            return function_map[function_name](working_directory=working_directory, **function_args)
+
+        with call_tracer.span(f"tool:{function_name}", "tool", args_chars=len(json.dumps(function_args, default=str))) as span_attributes:
+            if cache is None:
+                result = run_tool()
+            else:
+                result = cache.get_or_call(function_name, function_args, run_tool)
+                if function_name in WRITE_FUNCTIONS:
+                    for path in get_written_paths(function_name, function_args):
+                        cache.invalidate(path)
+                elif function_name not in READ_ONLY_FUNCTIONS:
+                    cache.invalidate_listings()
+            span_attributes["result_chars"] = len(str(result))
+        if prefetcher is not None:
+            if function_name in ("get_files_info", "get_files_tree"):
+                prefetcher.schedule(working_directory, function_args.get("directory"), result)
+            for path in get_written_paths(function_name, function_args):
+                prefetcher.invalidate(working_directory, path)
         return types.Content(
             role="tool",
             parts=[
@@ -137,90 +314,249 @@ def call_function(function_call_part: types.FunctionCall, verbose=False):
             ],
         )
 
+def run_agent(
+        messages: list[types.Content],
+        iter_limit: int = 20,
+        is_verbose: bool = False,
+        tool_executor: ToolExecutor | None = None,
+        history_manager: HistoryManager | None = None) -> str | None:
+    """
+    Run the agent loop: call the model, execute its function calls and feed the results back until it answers without one.
+    Args:
+        messages: The conversation so far; assistant turns and tool responses are appended to it.
+        iter_limit: The maximum number of model calls.
+        is_verbose: Whether to print verbose output.
+        tool_executor: The executor used to run the function calls of each turn.
+        history_manager: Compacts messages before every model call; None sends the full history.
+    Returns:
+        The final text response, or None if the loop ended without one.
+    """
+    if tool_executor is None:
+        tool_executor = ToolExecutor(call_function)
+    if prefetcher is not None:
+        for message in messages:
+            if message.role == "user":
+                prefetcher.mention(" ".join(part.text for part in message.parts if part.text))
+    for i in range(iter_limit):
+        print(f"\n--- Iteration {i + 1} ---")
+        if history_manager is not None:
+            with tracer.span("compact_history", "history") as span_attributes:
+                compaction = history_manager.compact(messages)
+                span_attributes.update(compaction)
+            if is_verbose and compaction["tokens_after"] < compaction["tokens_before"]:
+                print(f"History compacted: ~{compaction['tokens_before']} -> ~{compaction['tokens_after']} tokens (saved ~{compaction['tokens_before'] - compaction['tokens_after']})")
+        model_api_response: types.GenerateContentResponse = get_llm_response(
+            prompt=None,
+            is_verbose=is_verbose, 
+            agent_mode=True, 
+            messages=messages
+        )
+
+        if not model_api_response.candidates:
+            print("No candidates received from model. Exiting.")
+            return None
+        
+        assistant_content: types.Content = model_api_response.candidates[0].content
+        append_message(tracer, messages, assistant_content)
+        if prefetcher is not None:
+            prefetcher.mention(" ".join(part.text for part in assistant_content.parts if part.text))
+
+        if is_verbose:
+            print("Assistant's turn added to messages:")
+            assistant_text_parts = []
+            function_calls_requested = []
+            for part in assistant_content.parts:
+                if part.text:
+                    assistant_text_parts.append(part.text.strip())
+                if part.function_call:
+                    fc = part.function_call
+                    function_calls_requested.append(fc)
+                    print(f"  Function Call Requested: {fc.name}({dict(fc.args)})")
+            if assistant_text_parts:
+                 print(f"  Text: {' '.join(assistant_text_parts)}")
+        
+        function_calls_to_execute = [part.function_call for part in assistant_content.parts if part.function_call]
+
+        if function_calls_to_execute:
+            tool_response_contents: list[types.Content] = tool_executor.run(function_calls_to_execute, verbose=is_verbose)
+            for tool_response_content in tool_response_contents:
+                append_message(tracer, messages, tool_response_content)
+                if is_verbose:
+                    if tool_response_content.parts and tool_response_content.parts[0].function_response:
+                        fr_part = tool_response_content.parts[0].function_response
+                        print("Tool response added to messages:")
+                        print(f"  Function Executed: {fr_part.name}")
+                        print(f"  Response Data: {fr_part.response}")
+                    else:
+                        print("  Tool response was empty or malformed.")
+        else:
+            print("\nFinal response from assistant (no further function calls):")
+            final_text = "".join(part.text for part in assistant_content.parts if part.text if part.text)
+            print(final_text.strip())
+            return final_text
+        
+        if is_verbose:
+            print(f"Current messages count: {len(messages)}")
+            if tool_cache is not None:
+                print(f"Tool cache stats: {tool_cache.stats()}")
+            if prefetcher is not None:
+                print(f"Prefetch stats: {prefetcher.stats()}")
+    return None
+
+def get_int_cli_arg(command_line_args: list[str], name: str, default: int) -> int:
+    """
+    Get the value of a positive integer command line argument such as --iter-limit=20.
+    Args:
+        command_line_args: The command line arguments.
+        name: The argument name, without the leading dashes.
+        default: The value to use when the argument is not given.
+    Returns:
+        The parsed value.
+    """
+    value: int = default
+    for arg in command_line_args[2:]:
+        if arg.startswith(f"--{name}="):
+            digits = re.findall(r"\d+", arg)
+            if len(digits) > 0 and digits[0][0] != "0":
+                value = int(digits[0])
+            else:
+                raise ValueError(f"No valid numeric value found in {name} argument.")
+    return value
+
+def get_str_cli_arg(command_line_args: list[str], name: str, default: str | None = None) -> str | None:
+    """
+    Get the value of a string command line argument such as --cache-dir=.agent_cache.
+    Args:
+        command_line_args: The command line arguments.
+        name: The argument name, without the leading dashes.
+        default: The value to use when the argument is not given.
+    Returns:
+        The argument value.
+    """
+    value: str | None = default
+    for arg in command_line_args[2:]:
+        if arg.startswith(f"--{name}="):
+            value = arg[len(name) + 3:]
+            if not value:
+                raise ValueError(f"No value found in {name} argument.")
+    return value
+
+def get_resource_limits(command_line_args: list[str]) -> ResourceLimits:
+    """
+    Get the resource limits of the scripts run by the agent from the --max-cpu-seconds, --max-memory-mb,
+    --max-open-files and --max-processes command line arguments.
+    Args:
+        command_line_args: The command line arguments.
+    Returns:
+        The limits, with the defaults for the arguments that are not given.
+    """
+    return ResourceLimits(
+        cpu_seconds=get_int_cli_arg(command_line_args, "max-cpu-seconds", 30),
+        memory_bytes=get_int_cli_arg(command_line_args, "max-memory-mb", 2048) * 1024 * 1024,
+        open_files=get_int_cli_arg(command_line_args, "max-open-files", 1024),
+        processes=get_int_cli_arg(command_line_args, "max-processes", 4096),
+    )
+
 def main():
+    global tool_cache, model_backend, prefetcher
     command_line_args = sys.argv
+    if "--help" in command_line_args or "-h" in command_line_args:
+        print(usage)
+        return
     if len(command_line_args) <= 1 or command_line_args[1][0] == "-":
         print("no prompt included. Please ensure the prompt is included as an enquoted string after the filename.")
         sys.exit(1)
     prompt: str = command_line_args[1]
+    replay_path: str | None = get_str_cli_arg(command_line_args, "replay")
+    record_path: str | None = get_str_cli_arg(command_line_args, "record")
+    # Checked before anything is started: RecordingBackend truncates the recording.
+    if (replay_path or record_path) and "--async" in command_line_args:
+        print("--record and --replay are not supported with --async.")
+        sys.exit(1)
     is_verbose_cli_arg = "--verbose" in command_line_args
+    tool_executor = ToolExecutor(call_function, max_workers=get_int_cli_arg(command_line_args, "max-workers", 4))
+    warm_workers: int = get_int_cli_arg(command_line_args, "warm-workers", 0)
+    if warm_workers:
+        preload: str = get_str_cli_arg(command_line_args, "preload", "")
+        start_worker_pool(size=warm_workers, preload=[module for module in preload.split(",") if module])
+    configure_output_capture(
+        max_bytes=get_int_cli_arg(command_line_args, "max-output-bytes", 10 * 1024 * 1024),
+        stream="--agent" in command_line_args,
+    )
+    configure_resource_limits(get_resource_limits(command_line_args))
+    if replay_path:
+        model_backend = ReplayBackend(replay_path)
+    elif record_path:
+        model_backend = RecordingBackend(GeminiBackend(get_client()), record_path)
+    if "--no-cache" in command_line_args:
+        tool_cache = None
+    else:
+        tool_cache = ToolCache(
+            cache_dir=get_str_cli_arg(command_line_args, "cache-dir"),
+            use_hash="--cache-hash" in command_line_args,
+        )
 
     if "--agent" in command_line_args:
         print("agent mode")
         print(f"User prompt: '{prompt}'")
-        iter_limit: int = 20
-        for arg in command_line_args[2:]:
-            if arg.startswith("--iter-limit="):
-                digits = re.findall(r"\d+", arg)
-                if len(digits) > 0 and digits[0][0] != "0":
-                    iter_limit = int(digits[0])
-                else:
-                    raise ValueError("No valid numeric value found in iter-limit argument.")
+        iter_limit: int = get_int_cli_arg(command_line_args, "iter-limit", 20)
+        history_manager: HistoryManager | None = None
+        if "--no-compaction" not in command_line_args:
+            history_manager = HistoryManager(token_budget=get_int_cli_arg(command_line_args, "history-budget", 32000))
         
         messages: list[types.Content] = [types.Content(role="user", parts=[types.Part.from_text(text=prompt)])]
+        if "--no-prefetch" not in command_line_args:
+            prefetcher = Prefetcher(max_bytes=get_int_cli_arg(command_line_args, "prefetch-bytes", 2 * 1024 * 1024))
 
-        for i in range(iter_limit):
-            print(f"\n--- Iteration {i + 1} ---")
-            model_api_response: types.GenerateContentResponse = get_llm_response(
-                prompt=None,
-                is_verbose=is_verbose_cli_arg, 
-                agent_mode=True, 
-                messages=messages
+        if "--async" in command_line_args:
+            # Only the async loop needs asyncio and the async client.
+            import asyncio
+            from async_agent import AsyncAgentRunner
+            runner = AsyncAgentRunner(
+                get_client(),
+                call_function,
+                model=gemini_model,
+                config=get_generate_content_config(),
+                verbose=is_verbose_cli_arg,
+                max_workers=tool_executor.max_workers,
+                history_manager=history_manager,
+                tracer=tracer,
             )
-
-            if not model_api_response.candidates:
-                print("No candidates received from model. Exiting.")
-                break
-            
-            assistant_content: types.Content = model_api_response.candidates[0].content
-            messages.append(assistant_content)
-
-            if is_verbose_cli_arg:
-                print("Assistant's turn added to messages:")
-                assistant_text_parts = []
-                function_calls_requested = []
-                for part in assistant_content.parts:
-                    if part.text:
-                        assistant_text_parts.append(part.text.strip())
-                    if part.function_call:
-                        fc = part.function_call
-                        function_calls_requested.append(fc)
-                        print(f"  Function Call Requested: {fc.name}({dict(fc.args)})")
-                if assistant_text_parts:
-                     print(f"  Text: {' '.join(assistant_text_parts)}")
-            
-            function_calls_to_execute = [part.function_call for part in assistant_content.parts if part.function_call]
-
-            if function_calls_to_execute:
-                for fc_to_exec in function_calls_to_execute:
-                    tool_response_content: types.Content = call_function(fc_to_exec, verbose=is_verbose_cli_arg)
-                    messages.append(tool_response_content) 
-                    if is_verbose_cli_arg:
-                        if tool_response_content.parts and tool_response_content.parts[0].function_response:
-                            fr_part = tool_response_content.parts[0].function_response
-                            print("Tool response added to messages:")
-                            print(f"  Function Executed: {fr_part.name}")
-                            print(f"  Response Data: {fr_part.response}")
-                        else:
-                            print("  Tool response was empty or malformed.")
-            else:
-                print("\nFinal response from assistant (no further function calls):")
-                final_text = "".join(part.text for part in assistant_content.parts if part.text if part.text)
-                print(final_text.strip())
-                break 
-            
-            if is_verbose_cli_arg:
-                print(f"Current messages count: {len(messages)}")
+            asyncio.run(runner.run(messages, iter_limit=iter_limit))
+        else:
+            run_agent(
+                messages,
+                iter_limit=iter_limit,
+                is_verbose=is_verbose_cli_arg,
+                tool_executor=tool_executor,
+                history_manager=history_manager,
+            )
+        if is_verbose_cli_arg and history_manager is not None:
+            print(f"History compaction saved ~{history_manager.tokens_saved} tokens in total")
 
     elif is_verbose_cli_arg:
         print("verbose mode (non-agent)")
         print(f"User prompt: '{prompt}'")
-        response_dict: dict = get_llm_response(prompt, is_verbose=True, agent_mode=False)
+        response_dict: dict = get_llm_response(prompt, is_verbose=True, agent_mode=False, tool_executor=tool_executor)
         for key, value in response_dict.items():
             print(f"{key}: {value}")
     else:
         print("non-verbose mode (non-agent)")
-        get_llm_response(prompt, is_verbose=False, agent_mode=False)
+        get_llm_response(prompt, is_verbose=False, agent_mode=False, tool_executor=tool_executor)
+    tool_executor.shutdown()
+    stop_worker_pool()
+    if is_verbose_cli_arg and tool_cache is not None:
+        print(f"Tool cache stats: {tool_cache.stats()}")
+    if prefetcher is not None:
+        prefetcher.shutdown()
+        if is_verbose_cli_arg:
+            print(f"Prefetch stats: {prefetcher.stats()}")
+    if is_verbose_cli_arg:
+        print(f"\nTrace summary:\n{tracer.summary()}")
+    trace_path: str | None = get_str_cli_arg(command_line_args, "trace")
+    if trace_path:
+        tracer.export(trace_path)
+        print(f"Trace written to {trace_path}")
     
     '''response: str = get_llm_response(prompt)
     for key, value in response.items():
@@ -0,0 +1,111 @@
+from __future__ import annotations
+import json
+import threading
+from lazy_imports import LazyModule
+
+types = LazyModule("google.genai.types")
+
+
+class GeminiBackend:
+    """
+    Sends generate_content requests to the Gemini API through a genai client.
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    def generate_content(
+            self,
+            model: str,
+            contents: list[types.Content],
+            config: types.GenerateContentConfig | None = None) -> types.GenerateContentResponse:
+        return self.client.models.generate_content(model=model, contents=contents, config=config)
+
+
+class RecordingBackend:
+    """
+    Forwards requests to another backend and appends every response to a JSONL recording,
+    which ReplayBackend can play back later without an API key.
+    """
+
+    def __init__(self, backend, path: str):
+        self.backend = backend
+        self.path = path
+        self._lock = threading.Lock()
+        # Start a fresh recording; responses are appended (and flushed) one by one so a crashed run keeps them.
+        open(path, "w").close()
+
+    def generate_content(
+            self,
+            model: str,
+            contents: list[types.Content],
+            config: types.GenerateContentConfig | None = None) -> types.GenerateContentResponse:
+        response = self.backend.generate_content(model=model, contents=contents, config=config)
+        with self._lock, open(self.path, "a") as f:
+            f.write(json.dumps(dump_response(model, contents, response)) + "\n")
+        return response
+
+
+class ReplayBackend:
+    """
+    Plays back the responses of a recording in order, ignoring the requests.
+
+    The agent loop is deterministic given the model's responses, so replaying a recording reproduces
+    a run offline: the same function calls are executed and the same history is built.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "r") as f:
+            self.records = [json.loads(line) for line in f if line.strip()]
+        self.position = 0
+        self._lock = threading.Lock()
+
+    def generate_content(
+            self,
+            model: str,
+            contents: list[types.Content],
+            config: types.GenerateContentConfig | None = None) -> types.GenerateContentResponse:
+        with self._lock:
+            if self.position >= len(self.records):
+                raise RuntimeError(f'Replay "{self.path}" is exhausted after {len(self.records)} responses')
+            record = self.records[self.position]
+            self.position += 1
+        return types.GenerateContentResponse.model_validate(record["response"])
+
+    def rewind(self) -> None:
+        """
+        Start replaying from the first response again.
+        """
+        with self._lock:
+            self.position = 0
+
+
+def dump_response(model: str, contents: list[types.Content], response: types.GenerateContentResponse) -> dict:
+    """
+    Serialize a response as a recording line; the request is only summarized.
+    Args:
+        model: The model the request was sent to.
+        contents: The conversation sent to the model.
+        response: The model response.
+    Returns:
+        The JSON-serializable recording line.
+    """
+    return {
+        "model": model,
+        "messages": len(contents),
+        "response": response.model_dump(mode="json", exclude_none=True),
+    }
+
+
+def write_recording(path: str, responses: list[types.GenerateContentResponse], model: str = "") -> None:
+    """
+    Write scripted responses as a recording, e.g. to build a benchmark scenario without calling the API.
+    Args:
+        path: The recording path.
+        responses: The responses, in the order they should be replayed.
+        model: The model name stored with every response.
+    """
+    with open(path, "w") as f:
+        for response in responses:
+            f.write(json.dumps(dump_response(model, [], response)) + "\n")
@@ -0,0 +1,175 @@
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functions.get_file_content import get_file_relative_path, is_sub_file, read_file_text
+
+# "name: file_size=123 bytes, is_dir=False", as listed by get_files_info and get_files_tree.
+LISTING_ENTRY = re.compile(r"^(.+?): file_size=(\d+) bytes, is_dir=(True|False)$")
+# Words of the conversation that may name a file, e.g. "main.py" or "pkg/calculator.py".
+MENTION = re.compile(r"[\w./-]+\.\w+")
+
+
+class Prefetcher:
+    """
+    Speculatively reads files from the latest directory listing in the background, so the get_file_content
+    calls that usually follow a listing are answered from memory instead of waiting for the disk.
+
+    When a listing is returned, its small files are ranked (files mentioned in the conversation first, then the
+    smallest) and up to max_files of them are read on background threads while the next model call is in flight.
+    Results are kept with the mtime and size of the file they were read from and are only served while those
+    still match. The cache is bounded by max_bytes (memory used by the cached strings) and evicts the least recently used files first.
+    """
+
+    def __init__(self, max_bytes: int = 2 * 1024 * 1024, max_file_bytes: int = 20000, max_files: int = 5, workers: int = 2):
+        self.max_bytes = max_bytes
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.evicted_unused = 0
+        self.bytes = 0
+        self.peak_bytes = 0
+        # abs path -> (fingerprint, content, memory size, used)
+        self._entries: OrderedDict[str, tuple[tuple[int, int], str, int, bool]] = OrderedDict()
+        self._pending: set[str] = set()
+        self._mentions: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+
+    def mention(self, text: str) -> None:
+        """
+        Remember the file names mentioned in conversation text; mentioned files are prefetched first.
+        Args:
+            text: A user prompt or model response.
+        """
+        with self._lock:
+            for word in MENTION.findall(text or ""):
+                name = os.path.basename(word)
+                self._mentions[name] = None
+                self._mentions.move_to_end(name)
+            while len(self._mentions) > 100:
+                self._mentions.popitem(last=False)
+
+    def schedule(self, working_directory: str, directory: str | None, listing: str) -> None:
+        """
+        Start reading the most likely next files of a listing in the background.
+        Args:
+            working_directory: The working directory.
+            directory: The listed directory, relative to the working directory.
+            listing: The result of get_files_info or get_files_tree.
+        """
+        candidates = []
+        for line in listing.splitlines():
+            entry = LISTING_ENTRY.match(line.strip())
+            if entry is None or entry.group(3) == "True":
+                continue
+            size = int(entry.group(2))
+            if 0 < size <= self.max_file_bytes:
+                candidates.append((entry.group(1), size))
+        with self._lock:
+            mentions = set(self._mentions)
+        candidates.sort(key=lambda candidate: (os.path.basename(candidate[0]) not in mentions, candidate[1]))
+
+        for name, _ in candidates[:self.max_files]:
+            file_path = os.path.normpath(os.path.join(directory or ".", name))
+            if not is_sub_file(working_directory, file_path):
+                continue
+            abs_path = os.path.abspath(os.path.join(working_directory, file_path))
+            with self._lock:
+                if abs_path in self._pending or self._is_fresh(abs_path):
+                    continue
+                self._pending.add(abs_path)
+            self._pool.submit(self._prefetch, abs_path, file_path)
+
+    def get(self, working_directory: str, file_path: str) -> str | None:
+        """
+        Get the prefetched get_file_content result of a file, if it is still valid.
+        Args:
+            working_directory: The working directory.
+            file_path: The file_path argument of the get_file_content call.
+        Returns:
+            The prefetched content, or None on a miss.
+        """
+        fp_final = get_file_relative_path(working_directory, file_path) if is_sub_file(working_directory, file_path) else None
+        abs_path = os.path.abspath(fp_final) if fp_final else None
+        with self._lock:
+            if abs_path is not None and self._is_fresh(abs_path):
+                fingerprint, content, size, _ = self._entries[abs_path]
+                self._entries[abs_path] = (fingerprint, content, size, True)
+                self._entries.move_to_end(abs_path)
+                self.hits += 1
+                return content
+            self.misses += 1
+            return None
+
+    def invalidate(self, working_directory: str, file_path: str) -> None:
+        """
+        Drop the prefetched content of a written file.
+        """
+        abs_path = os.path.abspath(os.path.join(working_directory, file_path))
+        with self._lock:
+            self._drop(abs_path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            requests = self.hits + self.misses
+            return {
+                "prefetched": self.prefetched,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests, 3) if requests else None,
+                "evicted_unused": self.evicted_unused,
+                "entries": len(self._entries),
+                "bytes": self.bytes,
+                "peak_bytes": self.peak_bytes,
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _prefetch(self, abs_path: str, file_path: str) -> None:
+        try:
+            info = os.stat(abs_path)
+            content = read_file_text(abs_path, file_path)
+        except (OSError, UnicodeDecodeError):
+            # Binary or vanished files are simply not prefetched; the real call reports the error.
+            with self._lock:
+                self._pending.discard(abs_path)
+            return
+        with self._lock:
+            self._pending.discard(abs_path)
+            self._drop(abs_path)
+            size = sys.getsizeof(content)
+            if size > self.max_bytes:
+                return
+            self._entries[abs_path] = ((info.st_mtime_ns, info.st_size), content, size, False)
+            self.prefetched += 1
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                evicted_path, (_, _, _, used) = next(iter(self._entries.items()))
+                self.evicted_unused += not used
+                self._drop(evicted_path)
+            self.peak_bytes = max(self.peak_bytes, self.bytes)
+
+    def _is_fresh(self, abs_path: str) -> bool:
+        entry = self._entries.get(abs_path)
+        if entry is None:
+            return False
+        try:
+            info = os.stat(abs_path)
+        except OSError:
+            self._drop(abs_path)
+            return False
+        if entry[0] != (info.st_mtime_ns, info.st_size):
+            self._drop(abs_path)
+            return False
+        return True
+
+    def _drop(self, abs_path: str) -> None:
+        entry = self._entries.pop(abs_path, None)
+        if entry is not None:
+            self.bytes -= entry[2]
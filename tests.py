@@ -1,8 +1,32 @@
 import unittest
 from functions.get_files_info import get_files_info
+from functions.get_files_tree import get_files_tree
 from functions.get_file_content import get_file_content
+from functions.get_files_content import get_files_content
+from functions.get_file_outline import get_file_outline
 from functions.write_file import write_file
-from functions.run_python import run_python_file
+from functions.edit_files import edit_files
+from functions.run_python import run_python_file, configure_output_capture, configure_resource_limits, HeadTailBuffer
+from functions.resource_limits import ResourceLimits
+from functions.path_index import PathIndex, get_path_index
+from functions.read_file_range import read_file_range
+from functions.search_code import SearchIndex, get_search_index, search_code
+from functions.python_worker_pool import get_worker_pool, start_worker_pool, stop_worker_pool
+from functions.run_tests import run_tests
+from tool_executor import ToolExecutor
+from tool_cache import ToolCache
+from prefetch import Prefetcher
+from tracing import Tracer, append_message, record_usage
+import asyncio
+import difflib
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
 
 class Tests(unittest.TestCase):
     '''def __init__(self):
@@ -36,6 +60,32 @@ class Tests(unittest.TestCase):
         except ValueError as e:
             print(e)'''
 
+    def test_get_files_tree(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for path in ["a/b/deep.py", "a/top.py", "a/notes.log", "a/keep.log", "build/out.o", "root.py"]:
+                os.makedirs(os.path.join(tmp_dir, os.path.dirname(path)), exist_ok=True)
+                with open(os.path.join(tmp_dir, path), "w") as f:
+                    f.write("x")
+            with open(os.path.join(tmp_dir, ".gitignore"), "w") as f:
+                f.write("build/\n*.log\n!keep.log\n")
+
+            tree = get_files_tree(tmp_dir, max_depth=3)
+            self.assertIn("a/b/deep.py: file_size=1 bytes, is_dir=False", tree)
+            self.assertIn("a/keep.log", tree)
+            self.assertNotIn("notes.log", tree)
+            self.assertNotIn("build", tree)
+
+            # depth limit and glob filter
+            tree = get_files_tree(tmp_dir, max_depth=2, pattern="*.py")
+            self.assertEqual(tree.splitlines()[1:], ["a/top.py: file_size=1 bytes, is_dir=False", "root.py: file_size=1 bytes, is_dir=False"])
+
+            # pagination
+            tree = get_files_tree(tmp_dir, max_depth=3, page=2, page_size=2)
+            self.assertTrue(tree.startswith("[.: 7 entries, page 2 of 4"))
+            self.assertEqual(len(tree.splitlines()), 3)
+
+            self.assertRaises(ValueError, get_files_tree, tmp_dir, "../")
+
     def test_get_file_content(self):
         # valid case
         file_content = get_file_content("calculator", "pkg/calculator.py")
@@ -68,6 +118,64 @@ class Tests(unittest.TestCase):
         except Exception as e:
             print(e)'''
 
+    def test_get_file_outline(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            functions = "".join(f"def function_{i}(x: int, *args, scale=2) -> int:\n    return x * scale + {i}\n\n" for i in range(400))
+            source = (
+                "import os\nfrom typing import Any\n\nLIMIT: int = 10\n\n"
+                "class Shape(Base, metaclass=Meta):\n    @property\n    def area(self):\n        return 0\n\n"
+                "    async def load(self, path):\n        pass\n\n" + functions
+            )
+            with open(os.path.join(tmp_dir, "big.py"), "w") as f:
+                f.write(source)
+            with open(os.path.join(tmp_dir, "big.txt"), "w") as f:
+                f.write("0123456789\n" * 2000)
+            with open(os.path.join(tmp_dir, "broken.py"), "w") as f:
+                f.write("def broken(:\n" + "# padding\n" * 2000)
+
+            outline = get_file_outline(tmp_dir, "big.py")
+            self.assertTrue(outline.startswith(f'[Outline of "big.py" ({source.count(chr(10))} lines'))
+            self.assertIn("\n1-2: imports os, Any\n4: LIMIT = ...\n6-12: class Shape(Base, metaclass=Meta)\n", outline)
+            self.assertIn("\n    7-9: @property def area(self)\n    11-12: async def load(self, path)\n", outline)
+            self.assertIn("\n14-15: def function_0(x: int, *args, scale=2) -> int\n", outline)
+            self.assertLessEqual(len(outline), 10000)
+            self.assertRaises(ValueError, get_file_outline, tmp_dir, "broken.py")
+            self.assertRaises(ValueError, get_file_outline, tmp_dir, "../big.py")
+
+            # large Python files are read as their outline, other large files are cut at a line break
+            self.assertEqual(get_file_content(tmp_dir, "big.py"), outline)
+            content = get_file_content(tmp_dir, "big.txt")
+            self.assertTrue(content.startswith("0123456789\n" * 909 + '[...File "big.txt" truncated at 9999 characters (909 lines)'))
+            self.assertIn("from line 910", content)
+            self.assertIn('[...File "broken.py" truncated', get_file_content(tmp_dir, "broken.py"))
+            # Python files too large to outline are read no further than the cap and truncated
+            with mock.patch("functions.get_file_content.MAX_OUTLINE_CHARS", len(source) - 1):
+                self.assertIn('[...File "big.py" truncated', get_file_content(tmp_dir, "big.py"))
+            with mock.patch("functions.get_file_content.MAX_OUTLINE_CHARS", len(source)):
+                self.assertEqual(get_file_content(tmp_dir, "big.py"), outline)
+
+    def test_get_files_content(self):
+        result = get_files_content("calculator", ["main.py", "nonexistent.py", "../main.py"], pattern="pkg/*.py")
+        self.assertEqual([file["path"] for file in result["files"]], ["main.py", "pkg/calculator.py", "pkg/render.py", "pkg/stream.py"])
+        self.assertEqual(result["files"][0]["content"], get_file_content("calculator", "main.py"))
+        self.assertEqual([error["path"] for error in result["errors"]], ["nonexistent.py", "../main.py"])
+        self.assertEqual(result["total_chars"], sum(len(file["content"]) for file in result["files"]))
+        # files share the budget: the file crossing it is truncated and the ones after it are omitted
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name in ("a.txt", "b.txt", "c.txt"):
+                with open(os.path.join(tmp_dir, name), "w") as f:
+                    f.write("line of text\n" * 200)
+            result = get_files_content(tmp_dir, pattern="*.txt", max_chars=4000)
+            self.assertEqual([file["path"] for file in result["files"]], ["a.txt", "b.txt"])
+            self.assertEqual(result["files"][0]["content"], "line of text\n" * 200)
+            # the truncation note fits in the budget too
+            self.assertIn('[...File "b.txt" truncated at 1287 characters (99 lines)', result["files"][1]["content"])
+            self.assertLessEqual(result["total_chars"], 4000)
+            self.assertEqual(result["total_chars"], sum(len(file["content"]) for file in result["files"]))
+            self.assertEqual(result["omitted"], ["c.txt"])
+        self.assertEqual(get_files_content("calculator", "lorem.txt")["files"][0]["path"], "lorem.txt")
+        self.assertRaises(ValueError, get_files_content, "calculator")
+
     def test_write_file(self):
         # valid case
         output = write_file("calculator", "lorem.txt", "wait, this isn't lorem ipsum")
@@ -89,7 +197,73 @@ class Tests(unittest.TestCase):
 
         # should raise ValueError if the file is a directory
         self.assertRaises(ValueError, write_file, "calculator", "pkg", "this should not be allowed")
+
+        # new files get the mode open() would give them, replaced files keep theirs
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(os.path.join(tmp_dir, "plain.txt"), "w") as f:
+                f.write("plain")
+            write_file(tmp_dir, "new.txt", "new")
+            self.assertEqual(os.stat(os.path.join(tmp_dir, "new.txt")).st_mode, os.stat(os.path.join(tmp_dir, "plain.txt")).st_mode)
+            os.chmod(os.path.join(tmp_dir, "plain.txt"), 0o755)
+            write_file(tmp_dir, "plain.txt", "replaced")
+            self.assertEqual(os.stat(os.path.join(tmp_dir, "plain.txt")).st_mode & 0o777, 0o755)
+            self.assertEqual(sorted(os.listdir(tmp_dir)), ["new.txt", "plain.txt"])
         
+    def test_edit_files(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            lines = [f"line {i}" for i in range(1, 101)]
+            with open(os.path.join(tmp_dir, "big.txt"), "w") as f:
+                f.write("\n".join(lines) + "\n")
+            with open(os.path.join(tmp_dir, "crlf.txt"), "w", newline="") as f:
+                f.write("a\r\nb\r\n")
+
+            # search/replace and a unified diff whose header is off by a few lines, batched over several files
+            diff = "--- a/big.txt\n+++ b/big.txt\n@@ -47,3 +47,4 @@\n line 50\n-line 51\n+line fifty-one\n+line 51.5\n line 52\n"
+            output = edit_files(tmp_dir, [
+                {"file_path": "big.txt", "search": "line 10\n", "replace": "line ten\n"},
+                {"file_path": "big.txt", "diff": diff},
+                {"file_path": "crlf.txt", "search": "a\nb", "replace": "a\nc"},
+                {"file_path": "pkg/new.py", "search": "", "replace": "x = 1\n"},
+            ])
+            self.assertEqual(output.splitlines(), [
+                'Edited "big.txt" (+3 -2 lines)',
+                'Edited "crlf.txt" (+2 -2 lines)',
+                f'Created "{os.path.join("pkg", "new.py")}" (+1 -0 lines)',
+            ])
+            with open(os.path.join(tmp_dir, "big.txt")) as f:
+                edited = f.read().splitlines()
+            self.assertEqual(edited[9], "line ten")
+            self.assertEqual(edited[49:53], ["line 50", "line fifty-one", "line 51.5", "line 52"])
+            with open(os.path.join(tmp_dir, "crlf.txt"), newline="") as f:
+                self.assertEqual(f.read(), "a\r\nc\r\n")
+
+            # nothing is written unless every edit applies
+            self.assertRaises(ValueError, edit_files, tmp_dir, [
+                {"file_path": "big.txt", "search": "line 20", "replace": "line twenty"},
+                {"file_path": "big.txt", "search": "not there", "replace": ""},
+            ])
+            self.assertRaises(ValueError, edit_files, tmp_dir, [{"file_path": "big.txt", "search": "line 1", "replace": ""}])
+            with open(os.path.join(tmp_dir, "big.txt")) as f:
+                self.assertIn("line 20\n", f.read())
+            self.assertRaises(ValueError, edit_files, tmp_dir, [{"file_path": "../x.txt", "search": "", "replace": ""}])
+
+            # unchanged content is not written, by either tool
+            mtime = os.stat(os.path.join(tmp_dir, "big.txt")).st_mtime_ns
+            self.assertEqual(edit_files(tmp_dir, [{"file_path": "big.txt", "search": "line ten", "replace": "line ten"}]), 'No changes to "big.txt" (content unchanged)')
+            self.assertEqual(write_file(tmp_dir, "pkg/new.py", "x = 1\n"), 'No changes to "pkg/new.py" (content unchanged)')
+            self.assertEqual(os.stat(os.path.join(tmp_dir, "big.txt")).st_mtime_ns, mtime)
+            # writes go through a temporary file that does not outlive them
+            self.assertEqual(sorted(os.listdir(tmp_dir)), ["big.txt", "crlf.txt", "pkg"])
+
+            # pure insertions from a -U0 diff go after the line named in the header, including line 0
+            with open(os.path.join(tmp_dir, "abcd.txt"), "w") as f:
+                f.write("a\nb\nc\nd\n")
+            for before, after in ((["a", "b", "c", "d"], ["a", "b", "X", "c", "d"]), (["a", "b", "X", "c", "d"], ["Y", "a", "b", "X", "c", "d"])):
+                diff = "".join(difflib.unified_diff([line + "\n" for line in before], [line + "\n" for line in after], n=0))
+                edit_files(tmp_dir, [{"file_path": "abcd.txt", "diff": diff}])
+                with open(os.path.join(tmp_dir, "abcd.txt")) as f:
+                    self.assertEqual(f.read().splitlines(), after)
+
     def test_run_python(self):
         # valid case
         output = run_python_file("calculator", "main.py")
@@ -135,6 +309,661 @@ class Tests(unittest.TestCase):
         except Exception as e:
             print(e)
 
+    def test_run_python_output_capture(self):
+        buffer = HeadTailBuffer(head_size=4, tail_size=4)
+        for chunk in (b"0123", b"456", b"789abc"):
+            buffer.write(chunk)
+        self.assertEqual(buffer.getvalue(), "0123\n[... 5 bytes omitted ...]\n9abc")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(os.path.join(tmp_dir, "spam.py"), "w") as f:
+                f.write("while True:\n    print('spam' * 100)\n")
+            configure_output_capture(max_bytes=100000)
+            try:
+                # the run is killed by the output cap long before the 30 second timeout
+                start = time.perf_counter()
+                output = run_python_file(tmp_dir, "spam.py")
+                self.assertLess(time.perf_counter() - start, 10)
+            finally:
+                configure_output_capture(max_bytes=10 * 1024 * 1024)
+            self.assertIn("Process killed: output exceeded 100000 bytes", output)
+            self.assertIn("bytes omitted", output)
+            self.assertLess(len(output), 11000)
+
+    @unittest.skipUnless(os.name == "posix", "resource limits need setrlimit")
+    def test_run_python_resource_limits(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(os.path.join(tmp_dir, "spin.py"), "w") as f:
+                f.write("while True:\n    pass\n")
+            with open(os.path.join(tmp_dir, "files.py"), "w") as f:
+                f.write("files = [open(__file__) for _ in range(100)]\n")
+            with open(os.path.join(tmp_dir, "hog.py"), "w") as f:
+                f.write("data = bytearray(512 * 1024 * 1024)\n")
+            with open(os.path.join(tmp_dir, "limits.py"), "w") as f:
+                f.write("import resource, sys\nprint(sys.argv, resource.getrlimit(resource.RLIMIT_NPROC))\nraise SystemExit(3)\n")
+            configure_resource_limits(ResourceLimits(cpu_seconds=1, memory_bytes=256 * 1024 * 1024, open_files=50, processes=500))
+            try:
+                # the run is stopped by its CPU time limit long before the 30 second timeout
+                start = time.perf_counter()
+                output = run_python_file(tmp_dir, "spin.py")
+                self.assertLess(time.perf_counter() - start, 10)
+                self.assertIn("Process killed: CPU time limit of 1 s exceeded", output)
+                self.assertIn("Too many open files", run_python_file(tmp_dir, "files.py"))
+                output = run_python_file(tmp_dir, "hog.py")
+                self.assertIn("MemoryError", output)
+                self.assertIn("The script ran out of memory (limit 256 MiB)", output)
+                # a shell applies the limits, then the script runs like `python limits.py`
+                output = run_python_file(tmp_dir, "limits.py")
+                self.assertIn("STDOUT: ['limits.py'] (500, 500)", output)
+                self.assertIn("Process exited with code 3", output)
+                # without a POSIX shell, a Python launcher applies them
+                with mock.patch("functions.resource_limits.SHELL", os.path.join(tmp_dir, "no_sh")):
+                    output = run_python_file(tmp_dir, "limits.py")
+                self.assertIn("STDOUT: ['limits.py'] (500, 500)", output)
+                self.assertIn("Process exited with code 3", output)
+                # warm workers apply the same limits and report the resources of the run
+                start_worker_pool(size=1)
+                try:
+                    output = run_python_file(tmp_dir, "files.py")
+                    self.assertIn("Too many open files", output)
+                    self.assertRegex(output, r"Resources: cpu [0-9.]+s .*max RSS [0-9.]+ MiB, wall [0-9.]+s")
+                finally:
+                    stop_worker_pool()
+            finally:
+                configure_resource_limits(ResourceLimits(
+                    cpu_seconds=30, memory_bytes=2 * 1024 * 1024 * 1024, open_files=1024, processes=4096
+                ))
+
+    def test_resource_limit_args(self):
+        import main
+        limits = main.get_resource_limits(["batch.py", "in.jsonl", "--max-memory-mb=64", "--max-processes=100"])
+        self.assertEqual(limits.to_dict(), {
+            "cpu_seconds": 30, "memory_bytes": 64 * 1024 * 1024, "open_files": 1024, "processes": 100,
+        })
+
+    def test_python_worker_pool(self):
+        cold_output = run_python_file("calculator", "tests.py")
+        start_worker_pool(size=1, preload=["unittest"])
+        try:
+            # warm runs produce the same result as a cold spawn
+            warm_output = run_python_file("calculator", "tests.py")
+            self.assertEqual(warm_output.split("Ran")[0], cold_output.split("Ran")[0])
+            self.assertNotIn("Process exited with code", warm_output)
+
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                with open(os.path.join(tmp_dir, "fail.py"), "w") as f:
+                    f.write("import sys\nprint('partial')\nsys.exit(3)\n")
+                with open(os.path.join(tmp_dir, "crash.py"), "w") as f:
+                    f.write("raise RuntimeError('boom')\n")
+                output = run_python_file(tmp_dir, "fail.py")
+                self.assertIn("STDOUT: partial", output)
+                self.assertIn("Process exited with code 3", output)
+                # a crashed run does not affect the next one
+                output = run_python_file(tmp_dir, "crash.py")
+                self.assertIn("RuntimeError: boom", output)
+                self.assertIn("Process exited with code 1", output)
+                self.assertIn("STDOUT: partial", run_python_file(tmp_dir, "fail.py"))
+                # a workspace module named like the worker's helper is the one the script imports
+                with open(os.path.join(tmp_dir, "resource_limits.py"), "w") as f:
+                    f.write("NAME = 'workspace'\n")
+                with open(os.path.join(tmp_dir, "uses_helper.py"), "w") as f:
+                    f.write("import resource_limits\nprint(resource_limits.NAME)\n")
+                self.assertIn("STDOUT: workspace", run_python_file(tmp_dir, "uses_helper.py"))
+                # a worker that died while idle is replaced instead of being handed the job
+                idle_workers = get_worker_pool()._idle
+                deadline = time.monotonic() + 10
+                while idle_workers.empty() and time.monotonic() < deadline:
+                    time.sleep(0.01)
+                idle = idle_workers.queue[0]
+                idle.kill()
+                idle.wait()
+                self.assertIn("STDOUT: partial", run_python_file(tmp_dir, "fail.py"))
+        finally:
+            stop_worker_pool()
+
+    def test_run_tests(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, "pkg"))
+            with open(os.path.join(tmp_dir, "pkg", "shapes.py"), "w") as f:
+                f.write("def area(w, h):\n    return w * h\n")
+            with open(os.path.join(tmp_dir, "pkg", "words.py"), "w") as f:
+                f.write("def shout(text):\n    return text.upper()\n")
+            with open(os.path.join(tmp_dir, "tests.py"), "w") as f:
+                f.write(
+                    "import unittest\nfrom pkg.shapes import area\nfrom pkg import words\n\n"
+                    "class TestShapes(unittest.TestCase):\n"
+                    "    def test_area(self):\n        self.assertEqual(area(2, 3), 6)\n\n"
+                    "    def test_square(self):\n        self.assertEqual(area(2, 2), 4)\n\n"
+                    "class TestWords(unittest.TestCase):\n"
+                    "    def test_shout(self):\n        self.assertEqual(words.shout('a'), 'A')\n"
+                )
+            output = run_tests(tmp_dir, "tests.py")
+            self.assertIn('Ran 3 of 3 tests in "tests.py"', output)
+            self.assertIn("OK", output)
+            self.assertIn('Ran 0 of 3 tests in "tests.py"; 3 passed before', run_tests(tmp_dir, "tests.py"))
+
+            # only the tests importing the written module run again, and a failure is rerun until it passes
+            write_file(tmp_dir, "pkg/shapes.py", "def area(w, h):\n    return w * h + 1\n")
+            output = run_tests(tmp_dir, "tests.py")
+            self.assertIn("Ran 2 of 3 tests", output)
+            self.assertIn("Files written since the last run: pkg/shapes.py", output)
+            self.assertIn("Failed: tests.TestShapes.test_area, tests.TestShapes.test_square", output)
+            self.assertIn("Ran 2 of 3 tests", run_tests(tmp_dir, "tests.py"))
+            write_file(tmp_dir, "pkg/shapes.py", "def area(w, h):\n    return w * h\n")
+            self.assertIn("Ran 2 of 3 tests", run_tests(tmp_dir, "tests.py"))
+            # editing one test only reruns that test
+            edit_files(tmp_dir, [{"file_path": "tests.py", "search": "area(2, 2), 4", "replace": "area(3, 3), 9"}])
+            output = run_tests(tmp_dir, "tests.py")
+            self.assertIn("Ran 1 of 3 tests", output)
+            self.assertIn("Files written since the last run: tests.py", output)
+            self.assertIn("Ran 3 of 3 tests", run_tests(tmp_dir, "tests.py", run_all=True))
+            self.assertRaises(ValueError, run_tests, tmp_dir, "../tests.py")
+            self.assertRaises(ValueError, run_tests, tmp_dir, "missing_tests.py")
+
+    def test_read_file_range(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with open(os.path.join(tmp_dir, "big.log"), "w") as f:
+                for i in range(1, 5001):
+                    f.write(f"line {i}\n")
+
+            # byte ranges
+            output = read_file_range(tmp_dir, "big.log", offset=7, length=6)
+            self.assertTrue(output.startswith("[Bytes 7-13 of "))
+            self.assertIn("next offset: 13", output)
+            self.assertTrue(output.endswith("line 2"))
+
+            # line ranges
+            output = read_file_range(tmp_dir, "big.log", start_line=10, end_line=12)
+            self.assertEqual(output, '[Lines 10-12 of "big.log", next line: 13]\nline 10\nline 11\nline 12\n')
+            output = read_file_range(tmp_dir, "big.log", start_line=4999)
+            self.assertEqual(output, '[Lines 4999-5000 of "big.log"]\nline 4999\nline 5000\n')
+
+            # the character budget still applies to open-ended ranges
+            output = read_file_range(tmp_dir, "big.log", start_line=1)
+            self.assertLessEqual(len(output.split("\n", 1)[1]), 10000)
+            self.assertIn("next line:", output)
+
+            self.assertRaises(ValueError, read_file_range, tmp_dir, "big.log", start_line=5, end_line=2)
+            self.assertRaises(ValueError, read_file_range, tmp_dir, "../big.log", offset=0)
+
+    def test_path_index(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, "pkg", "sub"))
+            with open(os.path.join(tmp_dir, "pkg", "sub", "module.py"), "w") as f:
+                f.write("x = 1")
+            index = PathIndex(tmp_dir)
+
+            # exact and basename/suffix lookups
+            self.assertEqual(index.resolve("pkg/sub/module.py"), os.path.join("pkg", "sub", "module.py"))
+            self.assertEqual(index.resolve("module.py"), os.path.join("pkg", "sub", "module.py"))
+            self.assertEqual(index.resolve("sub/module.py"), os.path.join("pkg", "sub", "module.py"))
+            self.assertIsNone(index.resolve("missing.py"))
+
+            # files created behind the index's back are picked up through directory mtimes
+            with open(os.path.join(tmp_dir, "module.py"), "w") as f:
+                f.write("x = 2")
+            self.assertEqual(index.resolve("module.py"), "module.py")
+
+            # removed files are dropped
+            os.remove(os.path.join(tmp_dir, "pkg", "sub", "module.py"))
+            self.assertIsNone(index.resolve("sub/module.py"))
+
+            # write_file keeps the shared index up to date
+            shared_index = get_path_index(tmp_dir)
+            write_file(tmp_dir, "pkg/new.txt", "new")
+            self.assertIn(os.path.join("pkg", "new.txt"), shared_index._paths)
+            self.assertEqual(get_file_content(tmp_dir, "new.txt"), "new")
+            # files created next to it behind the index's back before the write are still picked up
+            with open(os.path.join(tmp_dir, "pkg", "generated.py"), "w") as f:
+                f.write("needle_value = 1\n")
+            write_file(tmp_dir, "pkg/new.py", "x = 1\n")
+            self.assertEqual(get_file_content(tmp_dir, "generated.py"), "needle_value = 1\n")
+            self.assertIn("needle_value = 1", search_code(tmp_dir, "needle_value"))
+            self.assertEqual(
+                [file["path"] for file in get_files_content(tmp_dir, pattern="pkg/*.py")["files"]],
+                [os.path.join("pkg", "generated.py"), os.path.join("pkg", "new.py")],
+            )
+
+    def test_search_code(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            os.makedirs(os.path.join(tmp_dir, "pkg"))
+            with open(os.path.join(tmp_dir, "pkg", "calc.py"), "w") as f:
+                f.write("import math\n\ndef Area(r):\n    return math.pi * r * r\n")
+            with open(os.path.join(tmp_dir, "notes.txt"), "w") as f:
+                f.write("area of a circle\n")
+            with open(os.path.join(tmp_dir, "blob.bin"), "wb") as f:
+                f.write(b"area\0\0")
+
+            result = search_code(tmp_dir, "area", context_lines=1)
+            self.assertTrue(result.startswith('[2 matches for "area" in 2 files]'))
+            self.assertIn(os.path.join("pkg", "calc.py") + ":3: def Area(r):", result)
+            self.assertIn(os.path.join("pkg", "calc.py") + "-4-     return math.pi * r * r", result)
+            self.assertIn("notes.txt:1: area of a circle", result)
+            self.assertNotIn("blob.bin", result)
+
+            # case sensitivity and path filters
+            self.assertTrue(search_code(tmp_dir, "area", case_sensitive=True).startswith("[1 matches"))
+            self.assertTrue(search_code(tmp_dir, "area", path="*.py").startswith("[1 matches"))
+            self.assertTrue(search_code(tmp_dir, "area", path="pkg").startswith("[1 matches"))
+            self.assertRaises(ValueError, search_code, tmp_dir, "area", "../")
+
+            # write_file re-indexes the shared index, and the index persists across loads
+            write_file(tmp_dir, "pkg/calc.py", "def volume(r):\n    pass\n")
+            self.assertIn(os.path.join("pkg", "calc.py") + ":1: def volume(r):", search_code(tmp_dir, "volume"))
+            self.assertTrue(search_code(tmp_dir, "Area").startswith("[1 matches"))
+            reloaded = SearchIndex(tmp_dir)
+            self.assertEqual(reloaded.candidates("volume"), [os.path.join("pkg", "calc.py")])
+            self.assertEqual(reloaded.candidates("zzz"), [])
+
+            # files changed behind the index's back are re-indexed on load
+            with open(os.path.join(tmp_dir, "notes.txt"), "w") as f:
+                f.write("volume of a sphere, and more\n")
+            self.assertEqual(len(SearchIndex(tmp_dir).candidates("volume")), 2)
+            # and before every search, without reloading the shared index
+            with open(os.path.join(tmp_dir, "notes.txt"), "w") as f:
+                f.write("density of a sphere\n")
+            self.assertIn("notes.txt:1: density of a sphere", search_code(tmp_dir, "density"))
+
+            # the index is JSON, and anything else in its place is ignored and rebuilt
+            index_path = os.path.join(tmp_dir, ".agent_cache", "search_index.json")
+            with open(index_path, "r") as f:
+                self.assertIn("postings", json.load(f))
+            for garbage in ("not json", '{"version": 2, "files": [1], "postings": {}, "next_id": "x"}'):
+                with open(index_path, "w") as f:
+                    f.write(garbage)
+                self.assertEqual(SearchIndex(tmp_dir).candidates("density"), ["notes.txt"])
+
+    def test_prefetcher(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for name, content in [("small.py", "x = 1\n"), ("notes.txt", "a" * 3000), ("big.txt", "b" * 50000)]:
+                with open(os.path.join(tmp_dir, name), "w") as f:
+                    f.write(content)
+            os.makedirs(os.path.join(tmp_dir, "pkg"))
+            prefetcher = Prefetcher(max_file_bytes=20000)
+
+            def wait_for(count):
+                deadline = time.time() + 5
+                while prefetcher.stats()["prefetched"] < count and time.time() < deadline:
+                    time.sleep(0.01)
+
+            # small files of the listing are read in the background; directories and large files are not
+            prefetcher.schedule(tmp_dir, ".", get_files_info(tmp_dir, "."))
+            wait_for(2)
+            self.assertEqual(prefetcher.stats()["entries"], 2)
+            self.assertEqual(prefetcher.get(tmp_dir, "small.py"), get_file_content(tmp_dir, "small.py"))
+            self.assertEqual(prefetcher.get(tmp_dir, "./notes.txt"), "a" * 3000)
+            self.assertIsNone(prefetcher.get(tmp_dir, "big.txt"))
+            self.assertIsNone(prefetcher.get(tmp_dir, "../outside.py"))
+
+            # modified and written files are never served stale
+            with open(os.path.join(tmp_dir, "small.py"), "w") as f:
+                f.write("x = 22\n")
+            self.assertIsNone(prefetcher.get(tmp_dir, "small.py"))
+            prefetcher.schedule(tmp_dir, None, get_files_info(tmp_dir, "."))
+            wait_for(3)
+            prefetcher.invalidate(tmp_dir, "notes.txt")
+            self.assertIsNone(prefetcher.get(tmp_dir, "notes.txt"))
+            stats = prefetcher.stats()
+            self.assertEqual((stats["hits"], stats["misses"]), (2, 4))
+
+            # the memory bound evicts the least recently used files; mentioned files are read first
+            max_bytes = sys.getsizeof("a" * 3000) + 10
+            bounded = Prefetcher(max_bytes=max_bytes, max_files=1)
+            bounded.mention("Please look at notes.txt")
+            bounded.schedule(tmp_dir, ".", get_files_info(tmp_dir, "."))
+            prefetcher = bounded
+            wait_for(1)
+            self.assertIsNotNone(bounded.get(tmp_dir, "notes.txt"))
+            bounded.max_files = 2
+            bounded.schedule(tmp_dir, ".", get_files_info(tmp_dir, "."))
+            wait_for(2)
+            stats = bounded.stats()
+            self.assertLessEqual(stats["peak_bytes"], max_bytes)
+            self.assertEqual(stats["entries"], 1)
+            self.assertIsNotNone(bounded.get(tmp_dir, "small.py"))
+            self.assertIsNone(bounded.get(tmp_dir, "notes.txt"))
+            bounded.shutdown()
+
+    def test_tool_executor(self):
+        from tool_executor import get_access
+        edit = lambda *paths: SimpleNamespace(name="edit_files", args={"edits": [{"file_path": path} for path in paths]})
+        self.assertEqual(get_access(edit("a.py", "./a.py")), ("write", "a.py"))
+        self.assertEqual(get_access(edit("a.py", "b.py")), ("write", None))
+
+        events = []
+        lock = threading.Lock()
+
+        def fake_call_function(function_call, verbose=False):
+            with lock:
+                events.append(("start", function_call.args["file_path"]))
+            time.sleep(0.05)
+            with lock:
+                events.append(("end", function_call.args["file_path"]))
+            return function_call.args["file_path"]
+
+        calls = [
+            SimpleNamespace(name="get_file_content", args={"file_path": "a.py"}),
+            SimpleNamespace(name="get_file_content", args={"file_path": "b.py"}),
+            SimpleNamespace(name="write_file", args={"file_path": "a.py", "content": ""}),
+            SimpleNamespace(name="get_file_content", args={"file_path": "a.py"}),
+        ]
+        executor = ToolExecutor(fake_call_function, max_workers=4)
+        start = time.perf_counter()
+        results = executor.run(calls)
+        elapsed = time.perf_counter() - start
+        executor.shutdown()
+
+        # results come back in call order
+        self.assertEqual(results, ["a.py", "b.py", "a.py", "a.py"])
+        # the two leading reads overlap, and the write runs between the reads of a.py
+        self.assertLess(elapsed, 0.2)
+        a_events = [event for event in events if event[1] == "a.py"]
+        self.assertEqual(a_events, [("start", "a.py"), ("end", "a.py")] * 3)
+
+    def test_async_agent_runner(self):
+        from google.genai import types
+        from async_agent import AsyncAgentRunner
+
+        def chunk(*parts):
+            return types.GenerateContentResponse(
+                candidates=[types.Candidate(content=types.Content(role="model", parts=list(parts)))]
+            )
+
+        class FakeAsyncModels:
+            # Stands in for client.aio.models: streams scripted chunks with a delay between them.
+            def __init__(self, turns):
+                self.turns = turns
+
+            async def generate_content_stream(self, model, contents, config=None):
+                chunks = self.turns.pop(0)
+
+                async def stream():
+                    for item in chunks:
+                        await asyncio.sleep(0.05)
+                        events.append(("chunk", item.text))
+                        yield item
+                return stream()
+
+        events = []
+
+        def fake_call_function(function_call, verbose=False):
+            events.append(("tool", function_call.name))
+            return types.Content(
+                role="tool",
+                parts=[types.Part.from_function_response(name=function_call.name, response={"result": "ok"})],
+            )
+
+        turns = [
+            [
+                chunk(types.Part.from_function_call(name="get_files_info", args={"directory": "."})),
+                chunk(types.Part.from_text(text="Listing")),
+                chunk(types.Part.from_text(text=" files")),
+            ],
+            [chunk(types.Part.from_text(text="All")), chunk(types.Part.from_text(text=" done"))],
+        ]
+        client = SimpleNamespace(aio=SimpleNamespace(models=FakeAsyncModels(turns)))
+        tracer = Tracer()
+        runner = AsyncAgentRunner(client, fake_call_function, model="fake", config=None, tracer=tracer)
+        messages = [types.Content(role="user", parts=[types.Part.from_text(text="list files")])]
+        final_text = asyncio.run(runner.run(messages, iter_limit=5))
+
+        self.assertEqual(final_text, "All done")
+        # the function call started while the rest of the first response was still streaming
+        self.assertLess(events.index(("tool", "get_files_info")), events.index(("chunk", " files")))
+        # user prompt, assistant turn, tool response, final assistant turn
+        self.assertEqual(len(messages), 4)
+        self.assertEqual(messages[1].parts[1].text, "Listing files")
+        self.assertEqual(messages[2].parts[0].function_response.response, {"result": "ok"})
+        span_names = [span["name"] for span in tracer.spans]
+        self.assertEqual(span_names.count("generate_content_stream"), 2)
+        self.assertEqual(span_names.count("history_append"), 3)
+        self.assertEqual(tracer.spans[0]["attributes"]["function_calls"], 1)
+
+    def test_tracer(self):
+        from google.genai import types
+
+        tracer = Tracer()
+        with tracer.span("generate_content", "model") as attributes:
+            time.sleep(0.01)
+            record_usage(attributes, SimpleNamespace(usage_metadata=SimpleNamespace(
+                prompt_token_count=100, candidates_token_count=20, total_token_count=120)))
+        messages = []
+        append_message(tracer, messages, types.Content(role="user", parts=[types.Part.from_text(text="x" * 40)]))
+        with self.assertRaises(ValueError):
+            with tracer.span("tool:write_file", "tool"):
+                raise ValueError("boom")
+
+        model_span, append_span, tool_span = tracer.spans
+        self.assertGreaterEqual(model_span["duration_ms"], 10)
+        self.assertEqual(model_span["attributes"]["prompt_tokens"], 100)
+        self.assertEqual(append_span["attributes"], {"role": "user", "estimated_tokens": 10, "history_messages": 1})
+        self.assertEqual(tool_span["attributes"]["error"], "ValueError: boom")
+
+        summary = tracer.summary().splitlines()
+        self.assertTrue(summary[2].startswith("generate_content"))
+        self.assertIn(" 100 ", summary[2])
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tracer.export(os.path.join(tmp_dir, "trace.jsonl"))
+            with open(os.path.join(tmp_dir, "trace.jsonl")) as f:
+                self.assertEqual([json.loads(line)["name"] for line in f], ["generate_content", "history_append", "tool:write_file"])
+            tracer.export(os.path.join(tmp_dir, "trace.json"))
+            with open(os.path.join(tmp_dir, "trace.json")) as f:
+                events = json.load(f)["traceEvents"]
+            self.assertEqual(events[0]["ph"], "X")
+            self.assertGreaterEqual(events[0]["dur"], 10000)
+
+    def test_batch(self):
+        from google.genai import types
+        from batch import load_tasks, run_batch
+
+        class FakeAsyncModels:
+            # Asks every task to write its own prompt to out.txt, then answers.
+            def __init__(self):
+                self.running = 0
+                self.max_running = 0
+
+            async def generate_content_stream(self, model, contents, config=None):
+                prompt = contents[0].parts[0].text
+                if contents[-1].role == "user":
+                    part = types.Part.from_function_call(name="write_file", args={"file_path": "out.txt", "content": prompt})
+                else:
+                    part = types.Part.from_text(text=f"done: {prompt}")
+
+                async def stream():
+                    self.running += 1
+                    self.max_running = max(self.max_running, self.running)
+                    await asyncio.sleep(0.02)
+                    self.running -= 1
+                    yield types.GenerateContentResponse(
+                        candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))],
+                        usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=10, candidates_token_count=2),
+                    )
+                return stream()
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            input_path = os.path.join(tmp_dir, "prompts.jsonl")
+            output_path = os.path.join(tmp_dir, "results.jsonl")
+            with open(input_path, "w") as f:
+                for i in range(5):
+                    f.write(json.dumps({"prompt": f"task {i}"}) + "\n")
+                f.write("\n")
+            tasks = load_tasks(input_path)
+            self.assertEqual([task["id"] for task in tasks], ["1", "2", "3", "4", "5"])
+
+            models = FakeAsyncModels()
+            client = SimpleNamespace(aio=SimpleNamespace(models=models))
+            workspace = os.path.join(tmp_dir, "runs")
+            for i in range(5):
+                # indexes a task's tools may have built
+                os.makedirs(os.path.join(workspace, str(i + 1)))
+                get_path_index(os.path.join(workspace, str(i + 1)))
+                get_search_index(os.path.join(workspace, str(i + 1)))
+            results = asyncio.run(run_batch(client, tasks, output_path, concurrency=2, workspace=workspace))
+
+            self.assertEqual(models.max_running, 2)
+            self.assertEqual([result["response"] for result in results], [f"done: task {i}" for i in range(5)])
+            result = results[0]
+            self.assertEqual((result["status"], result["model_calls"], result["tool_calls"], result["prompt_tokens"]), ("ok", 2, 1, 20))
+            # every task wrote into its own working directory
+            for i in range(5):
+                with open(os.path.join(workspace, str(i + 1), "out.txt")) as f:
+                    self.assertEqual(f.read(), f"task {i}")
+                # and its indexes are released once it is done
+                self.assertIsNone(get_path_index(os.path.join(workspace, str(i + 1)), create=False))
+                self.assertIsNone(get_search_index(os.path.join(workspace, str(i + 1)), create=False))
+            with open(output_path) as f:
+                self.assertEqual(sorted(json.loads(line)["id"] for line in f), ["1", "2", "3", "4", "5"])
+
+    def test_model_backend(self):
+        import functools
+        from google.genai import types
+        import main
+        from model_backend import RecordingBackend, ReplayBackend
+
+        def model_response(part):
+            return types.GenerateContentResponse(
+                candidates=[types.Candidate(content=types.Content(role="model", parts=[part]))],
+                usage_metadata=types.GenerateContentResponseUsageMetadata(prompt_token_count=7),
+            )
+
+        class ScriptedBackend:
+            def __init__(self):
+                self.responses = [
+                    model_response(types.Part.from_function_call(name="write_file", args={"file_path": "out.txt", "content": "recorded"})),
+                    model_response(types.Part.from_text(text="done")),
+                ]
+
+            def generate_content(self, model, contents, config=None):
+                return self.responses.pop(0)
+
+        previous_backend = main.model_backend
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                recording_path = os.path.join(tmp_dir, "recording.jsonl")
+                tool_executor = ToolExecutor(functools.partial(main.call_function, working_directory=tmp_dir, cache=None))
+                messages = [types.Content(role="user", parts=[types.Part.from_text(text="write it")])]
+                main.model_backend = RecordingBackend(ScriptedBackend(), recording_path)
+                self.assertEqual(main.run_agent(messages, tool_executor=tool_executor), "done")
+
+                # the replayed run executes the same calls and builds the same history, without any backend
+                os.remove(os.path.join(tmp_dir, "out.txt"))
+                main.model_backend = ReplayBackend(recording_path)
+                replayed_messages = [types.Content(role="user", parts=[types.Part.from_text(text="write it")])]
+                self.assertEqual(main.run_agent(replayed_messages, tool_executor=tool_executor), "done")
+                self.assertEqual(
+                    [message.model_dump() for message in replayed_messages],
+                    [message.model_dump() for message in messages],
+                )
+                with open(os.path.join(tmp_dir, "out.txt")) as f:
+                    self.assertEqual(f.read(), "recorded")
+                self.assertRaises(RuntimeError, main.model_backend.generate_content, "model", [])
+                main.model_backend.rewind()
+                self.assertEqual(main.model_backend.generate_content("model", []).usage_metadata.prompt_token_count, 7)
+                tool_executor.shutdown()
+        finally:
+            main.model_backend = previous_backend
+
+    def test_lazy_imports(self):
+        import subprocess
+        import sys
+        # main.py and the tool modules must not import the genai SDK until a model call happens
+        check = "import sys, main; main.sys.argv = ['main.py', '--help']; main.main(); print('google.genai' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, env={**os.environ, "GEMINI_API_KEY": ""})
+        self.assertTrue(result.stdout.startswith("usage: python main.py"))
+        self.assertEqual(result.stdout.splitlines()[-1], "False")
+
+        import main
+        # the tool schemas and config are built once and shared by every model call
+        self.assertIs(main.get_generate_content_config(), main.get_generate_content_config())
+
+    def test_tool_cache(self):
+        with tempfile.TemporaryDirectory() as tmp_dir, tempfile.TemporaryDirectory() as cache_dir:
+            with open(os.path.join(tmp_dir, "notes.txt"), "w") as f:
+                f.write("first")
+            calls = []
+
+            def read(cache):
+                return cache.get_or_call(
+                    "get_file_content",
+                    {"file_path": "notes.txt"},
+                    lambda: calls.append("read") or get_file_content(tmp_dir, "notes.txt"),
+                )
+
+            cache = ToolCache(tmp_dir, cache_dir=cache_dir)
+            self.assertEqual(read(cache), "first")
+            self.assertEqual(read(cache), "first")
+            self.assertEqual(len(calls), 1)
+            self.assertEqual(cache.stats()["hits"], 1)
+
+            # listings are invalidated by writes below them
+            cache.get_or_call("get_files_info", {}, lambda: calls.append("list") or "listing")
+            write_file(tmp_dir, "notes.txt", "second!")
+            cache.invalidate("notes.txt")
+            self.assertEqual(cache.stats()["entries"], 0)
+            self.assertEqual(read(cache), "second!")
+
+            # a new cache (a new main.py run) is served from the on-disk layer
+            fresh_cache = ToolCache(tmp_dir, cache_dir=cache_dir)
+            self.assertEqual(read(fresh_cache), "second!")
+            self.assertEqual(fresh_cache.stats()["disk_hits"], 1)
+            self.assertEqual(calls, ["read", "list", "read"])
+
+            # evicted entries do not stay in the per-path bookkeeping
+            small_cache = ToolCache(tmp_dir, max_entries=1)
+            for i in range(3):
+                with open(os.path.join(tmp_dir, f"file{i}.txt"), "w") as f:
+                    f.write(str(i))
+                small_cache.get_or_call("get_file_content", {"file_path": f"file{i}.txt"}, lambda: "content")
+            self.assertEqual(small_cache.stats()["entries"], 1)
+            self.assertEqual(list(small_cache._keys_by_path), ["file2.txt"])
+
+    def test_history_manager(self):
+        from google.genai import types
+        from history import HistoryManager, estimate_tokens
+
+        def turn(name, args, result):
+            return [
+                types.Content(role="model", parts=[types.Part.from_function_call(name=name, args=args)]),
+                types.Content(role="tool", parts=[types.Part.from_function_response(name=name, response={"result": result})]),
+            ]
+
+        messages = [types.Content(role="user", parts=[types.Part.from_text(text="refactor main.py")])]
+        messages += turn("get_file_content", {"file_path": "main.py"}, "x" * 4000)
+        messages += turn("get_file_content", {"file_path": "main.py"}, "x" * 4000)
+        messages += turn("write_file", {"file_path": "out.py", "content": "y" * 4000}, "ok")
+        messages += turn("get_file_content", {"file_path": "out.py"}, "y" * 4000)
+        messages += turn("write_file", {"file_path": "out.py", "content": "z" * 4000}, "ok")
+        message_count = len(messages)
+
+        manager = HistoryManager(token_budget=100000)
+        stats = manager.compact(messages)
+        self.assertEqual(len(messages), message_count)
+        self.assertLess(stats["tokens_after"], stats["tokens_before"])
+        # the repeated read keeps only its latest response
+        self.assertIn("[compacted]", messages[2].parts[0].function_response.response["result"])
+        self.assertEqual(messages[4].parts[0].function_response.response["result"], "x" * 4000)
+        # the overwritten write and the read in between are dropped, the latest write is kept
+        self.assertIn("[compacted]", messages[5].parts[0].function_call.args["content"])
+        self.assertIn("[compacted]", messages[8].parts[0].function_response.response["result"])
+        self.assertEqual(messages[9].parts[0].function_call.args["content"], "z" * 4000)
+
+        # compaction is idempotent
+        self.assertEqual(manager.compact(messages)["tokens_after"], stats["tokens_after"])
+
+        # over budget, old tool responses are summarized but the recent iterations are kept
+        manager = HistoryManager(token_budget=1500, keep_recent=1)
+        manager.compact(messages)
+        self.assertIn("characters omitted", messages[4].parts[0].function_response.response["result"])
+        self.assertLessEqual(estimate_tokens(messages), 1500)
+
+        # a multi-file read is outdated once one of the files it returned is written
+        files = {"files": [{"path": "a.py", "content": "a" * 4000}], "errors": [], "omitted": [], "total_chars": 4000}
+        messages = turn("get_files_content", {"pattern": "*.py"}, files)
+        messages += turn("edit_files", {"edits": [{"file_path": "a.py", "search": "a", "replace": "b"}]}, "ok")
+        HistoryManager(token_budget=100000).compact(messages)
+        self.assertIn("[compacted]", messages[1].parts[0].function_response.response["result"])
+
 if __name__ == "__main__":
     unittest.main()
     
@@ -0,0 +1,197 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable
+from functions.path_index import get_path_index
+
+# Read-only functions whose results only depend on their arguments and the files they read.
+CACHEABLE_FUNCTIONS = {"get_file_content", "get_files_info", "read_file_range", "get_file_outline"}
+# Functions whose results are also stored in the optional on-disk layer.
+PERSISTENT_FUNCTIONS = {"get_file_content", "read_file_range", "get_file_outline"}
+
+
+class ToolCache:
+    """
+    A cache of read-only tool results keyed by function name, arguments and a fingerprint of the file or
+    directory they read.
+
+    Results live in an in-memory LRU. Results of file reads can also be stored as JSON files in cache_dir so
+    they survive between main.py invocations. The fingerprint is (path, mtime, size) for files, optionally
+    extended with a sha256 of the content, and (path, mtime) for directories. A directory's mtime does not
+    change when a file inside it grows, so listings are invalidated explicitly: write_file invalidates the
+    written file and the listings of its ancestors, and run_python_file invalidates every listing.
+    """
+
+    def __init__(
+            self,
+            working_directory: str = ".",
+            max_entries: int = 256,
+            cache_dir: str | None = None,
+            use_hash: bool = False):
+        self.working_directory = working_directory
+        self.root = os.path.normpath(os.path.abspath(working_directory))
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.use_hash = use_hash
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[tuple, Any]] = OrderedDict()
+        self._keys_by_path: dict[str, set[tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get_or_call(self, function_name: str, function_args: dict, call: Callable[[], Any]) -> Any:
+        """
+        Return the cached result of a tool call, or run it and cache its result.
+        Args:
+            function_name: The name of the function.
+            function_args: The arguments of the call, without the working directory.
+            call: Runs the tool; only called on a cache miss.
+        Returns:
+            The tool result.
+        """
+        target = self._get_target(function_name, function_args)
+        if target is None:
+            return call()
+        rel_path, is_dir = target
+        fingerprint = self._fingerprint(rel_path, is_dir)
+        if fingerprint is None:
+            return call()
+        key = (function_name, json.dumps(function_args, sort_keys=True))
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+        if function_name in PERSISTENT_FUNCTIONS:
+            found, result = self._read_disk(key, fingerprint)
+            if found:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._store(key, rel_path, fingerprint, result)
+                return result
+
+        result = call()
+        with self._lock:
+            self.misses += 1
+            self._store(key, rel_path, fingerprint, result)
+        if function_name in PERSISTENT_FUNCTIONS:
+            self._write_disk(key, fingerprint, result)
+        return result
+
+    def invalidate(self, file_path: str) -> None:
+        """
+        Drop the cached results that depend on a written file: its own reads and the listings of its ancestors.
+        Args:
+            file_path: The written path, relative to the working directory.
+        """
+        rel_path = os.path.relpath(os.path.normpath(os.path.join(self.root, file_path)), self.root)
+        with self._lock:
+            self._drop_path(rel_path)
+            while rel_path not in ("", "."):
+                rel_path = os.path.dirname(rel_path)
+                self._drop_path(rel_path or ".")
+
+    def invalidate_listings(self) -> None:
+        """
+        Drop every cached directory listing, e.g. after running a script that may have changed file sizes.
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == "get_files_info"]:
+                self._entries.pop(key)
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
+
+    def _get_target(self, function_name: str, function_args: dict) -> tuple[str, bool] | None:
+        if function_name not in CACHEABLE_FUNCTIONS:
+            return None
+        if function_name == "get_files_info":
+            directory = function_args.get("directory") or "."
+            abs_dir = os.path.normpath(os.path.join(self.root, directory))
+            if abs_dir != self.root and not abs_dir.startswith(self.root + os.sep):
+                return None
+            return os.path.relpath(abs_dir, self.root), True
+        file_path = function_args.get("file_path")
+        if not file_path:
+            return None
+        rel_path = get_path_index(self.working_directory).resolve(file_path)
+        if rel_path is None:
+            return None
+        return rel_path, False
+
+    def _fingerprint(self, rel_path: str, is_dir: bool) -> tuple | None:
+        abs_path = os.path.join(self.root, rel_path)
+        try:
+            info = os.stat(abs_path)
+        except OSError:
+            return None
+        if is_dir:
+            return (rel_path, info.st_mtime_ns)
+        fingerprint = (rel_path, info.st_mtime_ns, info.st_size)
+        if self.use_hash:
+            sha256 = hashlib.sha256()
+            with open(abs_path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    sha256.update(block)
+            fingerprint += (sha256.hexdigest(),)
+        return fingerprint
+
+    def _store(self, key: tuple[str, str], rel_path: str, fingerprint: tuple, result: Any) -> None:
+        self._entries[key] = (fingerprint, result)
+        self._entries.move_to_end(key)
+        self._keys_by_path.setdefault(rel_path, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, (evicted_fingerprint, _) = self._entries.popitem(last=False)
+            # Fingerprints start with the path they were taken of.
+            evicted_keys = self._keys_by_path.get(evicted_fingerprint[0])
+            if evicted_keys is not None:
+                evicted_keys.discard(evicted_key)
+                if not evicted_keys:
+                    del self._keys_by_path[evicted_fingerprint[0]]
+
+    def _drop_path(self, rel_path: str) -> None:
+        for key in self._keys_by_path.pop(rel_path, set()):
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def _disk_path(self, key: tuple[str, str], fingerprint: tuple) -> str:
+        digest = hashlib.sha256(json.dumps([self.root, *key, *fingerprint]).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _read_disk(self, key: tuple[str, str], fingerprint: tuple) -> tuple[bool, Any]:
+        if not self.cache_dir:
+            return False, None
+        try:
+            with open(self._disk_path(key, fingerprint), "r") as f:
+                return True, json.load(f)["result"]
+        except (OSError, ValueError, KeyError):
+            return False, None
+
+    def _write_disk(self, key: tuple[str, str], fingerprint: tuple, result: Any) -> None:
+        if not self.cache_dir:
+            return
+        disk_path = self._disk_path(key, fingerprint)
+        tmp_path = f"{disk_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"function": key[0], "args": key[1], "result": result}, f)
+            os.replace(tmp_path, disk_path)
+        except (OSError, TypeError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
@@ -0,0 +1,126 @@
+import os
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable
+
+# Functions that only read the workspace and can run alongside each other.
+READ_ONLY_FUNCTIONS = {
+    "get_files_info", "get_file_content", "get_files_content", "read_file_range", "get_file_outline", "get_files_tree", "search_code"
+}
+# Functions that modify the paths given in their arguments (see get_written_paths).
+WRITE_FUNCTIONS = {"write_file", "edit_files"}
+
+
+class ToolExecutor:
+    """
+    Runs the function calls of a single model turn on a thread pool.
+
+    Read-only calls run concurrently. A call that writes a path waits for every earlier call
+    touching that path, and every later call touching it waits for the write. run_python_file
+    (and any unknown function) is ordered after earlier writes and other runs, but not after
+    reads: scripts are assumed not to modify files the model reads in the same turn.
+    Results are always returned in the original call order.
+    """
+
+    def __init__(self, call_function: Callable, max_workers: int = 4):
+        self.call_function = call_function
+        self.max_workers = max_workers
+        self._pool: ThreadPoolExecutor | None = None
+
+    def run(self, function_calls: list, verbose: bool = False) -> list:
+        """
+        Execute function calls and collect their results.
+        Args:
+            function_calls: The FunctionCall parts requested by the model, in order.
+            verbose: Whether to print verbose output.
+        Returns:
+            The tool response of every call, in the same order as function_calls.
+        """
+        if self.max_workers <= 1 or len(function_calls) <= 1:
+            return [self.call_function(fc, verbose=verbose) for fc in function_calls]
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tool")
+        futures: list[Future] = []
+        accesses: list[tuple[str, str | None]] = []
+        for fc in function_calls:
+            access = get_access(fc)
+            # Dependencies are always submitted earlier, so waiting on them cannot starve the pool.
+            dependencies = [future for future, other in zip(futures, accesses) if conflicts(access, other)]
+            futures.append(self._pool.submit(self._run_after, dependencies, fc, verbose))
+            accesses.append(access)
+        return [future.result() for future in futures]
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    def _run_after(self, dependencies: list[Future], fc, verbose: bool):
+        wait(dependencies)
+        return self.call_function(fc, verbose=verbose)
+
+
+def get_access(function_call) -> tuple[str, str | None]:
+    """
+    Classify how a function call touches the workspace.
+    Args:
+        function_call: The FunctionCall part.
+    Returns:
+        A (mode, path) tuple where mode is "read", "write" or "exec".
+    """
+    args = dict(function_call.args or {})
+    if function_call.name in WRITE_FUNCTIONS:
+        paths = {os.path.normpath(path) for path in get_written_paths(function_call.name, args) if path}
+        # A call writing several files conflicts with every other read and write.
+        return "write", paths.pop() if len(paths) == 1 else None
+    path = args.get("file_path", args.get("directory"))
+    if path is not None:
+        path = os.path.normpath(path)
+    if function_call.name in READ_ONLY_FUNCTIONS:
+        return "read", path or "."
+    return "exec", None
+
+
+def get_written_paths(function_name: str, function_args: dict) -> list[str]:
+    """
+    Get the paths a write function modifies.
+    Args:
+        function_name: The name of the function.
+        function_args: The arguments of the call.
+    Returns:
+        The written paths as given in the arguments, empty for functions that do not write.
+    """
+    if function_name == "edit_files":
+        return [edit.get("file_path") for edit in function_args.get("edits") or [] if isinstance(edit, dict)]
+    if function_name in WRITE_FUNCTIONS:
+        return [function_args.get("file_path")]
+    return []
+
+
+def conflicts(access: tuple[str, str | None], other: tuple[str, str | None]) -> bool:
+    """
+    Check whether two calls must keep their relative order.
+    Args:
+        access: The (mode, path) of the later call.
+        other: The (mode, path) of the earlier call.
+    Returns:
+        True if the later call has to wait for the earlier one, False otherwise.
+    """
+    modes = {access[0], other[0]}
+    if modes == {"read"}:
+        return False
+    if "exec" in modes:
+        return "read" not in modes
+    return paths_overlap(access[1], other[1])
+
+
+def paths_overlap(path: str | None, other: str | None) -> bool:
+    """
+    Conservatively check whether two paths may refer to the same file or tree.
+    get_file_content also resolves bare file names anywhere in the tree, so equal basenames count as overlapping.
+    """
+    if path is None or other is None or path == "." or other == ".":
+        return True
+    if path == other or os.path.basename(path) == os.path.basename(other):
+        return True
+    return path.startswith(other + os.sep) or other.startswith(path + os.sep)
@@ -0,0 +1,147 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from history import estimate_tokens
+
+
+class Tracer:
+    """
+    Records timed spans of the agent loop: model calls, tool executions, history appends and compactions.
+
+    A span has a name, a category, a start time and duration measured with time.perf_counter_ns, the thread
+    it ran on, and free-form attributes (token counts, payload sizes, ...) that can be set while it is open.
+    Spans are kept in memory in the order they finish; they can be exported as JSONL (one span per line) or
+    as a Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev), and summarized as a table.
+    """
+
+    def __init__(self):
+        self.spans: list[dict] = []
+        self._origin_ns = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, category: str = "agent", **attributes):
+        """
+        Time the enclosed block as a span.
+        Args:
+            name: The span name, e.g. "generate_content" or "tool:get_file_content".
+            category: The span category, e.g. "model", "tool" or "history".
+            attributes: Initial attributes of the span.
+        Yields:
+            The attribute dict of the span; values added to it inside the block are recorded.
+        """
+        start_ns = time.perf_counter_ns()
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            end_ns = time.perf_counter_ns()
+            record = {
+                "name": name,
+                "category": category,
+                "start_ms": (start_ns - self._origin_ns) / 1e6,
+                "duration_ms": (end_ns - start_ns) / 1e6,
+                "thread": threading.current_thread().name,
+                "thread_id": threading.get_ident(),
+                "attributes": attributes,
+            }
+            with self._lock:
+                self.spans.append(record)
+
+    def export_jsonl(self, path: str) -> None:
+        """
+        Write every span as one JSON object per line.
+        """
+        with open(path, "w") as f:
+            for record in self._snapshot():
+                f.write(json.dumps(record, default=str) + "\n")
+
+    def export_chrome(self, path: str) -> None:
+        """
+        Write every span as a complete ("X") event of the Chrome trace event format.
+        """
+        pid = os.getpid()
+        events = [
+            {
+                "name": record["name"],
+                "cat": record["category"],
+                "ph": "X",
+                "ts": record["start_ms"] * 1000,
+                "dur": record["duration_ms"] * 1000,
+                "pid": pid,
+                "tid": record["thread_id"],
+                "args": record["attributes"],
+            }
+            for record in self._snapshot()
+        ]
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+
+    def export(self, path: str) -> None:
+        """
+        Export the trace to path: JSONL if it ends with .jsonl, a Chrome trace otherwise.
+        """
+        if path.endswith(".jsonl"):
+            self.export_jsonl(path)
+        else:
+            self.export_chrome(path)
+
+    def summary(self) -> str:
+        """
+        Summarize the spans per name: call count, total/mean/max duration and the summed token counts.
+        Returns:
+            A plain-text table, slowest total first.
+        """
+        rows: dict[str, dict] = {}
+        for record in self._snapshot():
+            row = rows.setdefault(record["name"], {"count": 0, "total": 0.0, "max": 0.0, "prompt": 0, "response": 0})
+            row["count"] += 1
+            row["total"] += record["duration_ms"]
+            row["max"] = max(row["max"], record["duration_ms"])
+            row["prompt"] += record["attributes"].get("prompt_tokens") or 0
+            row["response"] += record["attributes"].get("response_tokens") or 0
+
+        header = f"{'span':<32} {'count':>6} {'total ms':>10} {'mean ms':>9} {'max ms':>9} {'prompt tok':>11} {'resp tok':>9}"
+        lines = [header, "-" * len(header)]
+        for name, row in sorted(rows.items(), key=lambda item: item[1]["total"], reverse=True):
+            lines.append(
+                f"{name:<32} {row['count']:>6} {row['total']:>10.1f} {row['total'] / row['count']:>9.1f} "
+                f"{row['max']:>9.1f} {row['prompt']:>11} {row['response']:>9}"
+            )
+        return "\n".join(lines)
+
+    def _snapshot(self) -> list[dict]:
+        with self._lock:
+            return list(self.spans)
+
+
+def record_usage(attributes: dict, response) -> None:
+    """
+    Copy the token counts of a model response into span attributes.
+    Args:
+        attributes: The attribute dict of an open span.
+        response: A GenerateContentResponse (or the last chunk of a stream).
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    attributes["prompt_tokens"] = usage.prompt_token_count
+    attributes["response_tokens"] = usage.candidates_token_count
+    attributes["total_tokens"] = usage.total_token_count
+
+
+def append_message(tracer: Tracer, messages: list, content) -> None:
+    """
+    Append a content to the conversation, recorded as a "history_append" span.
+    Args:
+        tracer: The tracer.
+        messages: The conversation.
+        content: The types.Content to append.
+    """
+    with tracer.span("history_append", "history", role=content.role, estimated_tokens=estimate_tokens([content])) as attributes:
+        messages.append(content)
+        attributes["history_messages"] = len(messages)